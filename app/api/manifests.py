@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from uuid import UUID
+from app.core.plan import PlanError
 from app.db import crud, schemas
 from app.db.session import get_db
 from typing import List
@@ -42,5 +43,8 @@ def replace_steps(manifest_id: UUID, steps_in: List[schemas.ManifestStepCreate],
     manifest = crud.get_manifest(db, manifest_id)
     if not manifest:
         raise HTTPException(status_code=404, detail="Manifest not found.")
-    steps = crud.replace_manifest_steps(db, manifest_id, steps_in)
+    try:
+        steps = crud.replace_manifest_steps(db, manifest_id, steps_in)
+    except PlanError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     return steps
@@ -1,31 +1,195 @@
-from datetime import datetime, timezone
-import uuid
+import base64
+from datetime import datetime
+import os
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select, text
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import exists, func, select, tuple_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.core.runner import execute_manifest, resume_run
+from app.core.attestations import Attestation, attest_steps, unblocked_runs
+from app.core.events import TERMINAL_RUN_STATUSES
+from app.core.ledger import iter_ledger_range, iter_run_ledger
+from app.core.plan import PlanError
+from app.core.run_events_stream import iter_run_event_stream
+from app.core.run_queue import (
+    batch_progress,
+    enqueue_batch,
+    enqueue_run,
+    pending_resumes,
+    queue_depth,
+    request_resume,
+)
+from app.core.runner import compile_run, execute_manifest, resume_run
 from app.db import models, schemas
-from app.db.session import get_db
+from app.db.session import SessionLocal, get_db
 import json
 
 router = APIRouter()
 
 
+def _submission_mode() -> str:
+    return os.getenv("RUN_SUBMISSION_MODE", "inline").strip().lower()
+
+
+def _max_batch_size() -> int:
+    try:
+        return max(1, int(os.getenv("RUN_BATCH_MAX_SIZE", "10000")))
+    except ValueError:
+        return 10000
+
+
+def _max_bulk_attestations() -> int:
+    try:
+        return max(1, int(os.getenv("ATTEST_BULK_MAX_ITEMS", "5000")))
+    except ValueError:
+        return 5000
+
+
+def _require_runnable_manifest(db: Session, manifest_id: UUID) -> None:
+    """404 for an unknown manifest, 422 if its plan or task prompt templates do not compile."""
+    if not db.get(models.Manifest, manifest_id):
+        raise HTTPException(404, "manifest not found")
+    try:
+        compile_run(db, manifest_id)
+    except PlanError as e:
+        raise HTTPException(422, str(e))
+
+
 @router.post("/runs")
 def run_manifest(body: dict, db: Session = Depends(get_db)):
     manifest_id = UUID(body["manifest_id"])
     initiated_by = body.get("initiated_by")
-    run_id = execute_manifest(manifest_id, db, initiated_by)
+    run_params = body.get("run_params")
+    if run_params is not None and not isinstance(run_params, dict):
+        raise HTTPException(422, "run_params must be an object")
+
+    if _submission_mode() == "queue":
+        _require_runnable_manifest(db, manifest_id)
+        run_id = enqueue_run(db, manifest_id, initiated_by, run_params)
+        return {"run_id": str(run_id), "status": "queued"}
+
+    try:
+        run_id = execute_manifest(manifest_id, db, initiated_by, run_params=run_params)
+    except PlanError as e:
+        raise HTTPException(422, str(e))
     return {"run_id": str(run_id)}
 
 
+@router.post("/runs/batch", status_code=202)
+def submit_run_batch(body: schemas.RunBatchIn, db: Session = Depends(get_db)):
+    """
+    Queue one run per run_params entry, whatever RUN_SUBMISSION_MODE is; queue workers
+    execute them concurrently. run_ids are in run_params order.
+    """
+    if len(body.run_params) > _max_batch_size():
+        raise HTTPException(413, f"batch exceeds RUN_BATCH_MAX_SIZE ({_max_batch_size()})")
+    _require_runnable_manifest(db, body.manifest_id)
+
+    batch_id, run_ids = enqueue_batch(db, body.manifest_id, body.run_params, body.initiated_by)
+    return {
+        "batch_id": str(batch_id),
+        "size": len(run_ids),
+        "status": "queued",
+        "run_ids": [str(r) for r in run_ids],
+    }
+
+
+@router.get("/runs/batches/{batch_id}")
+def get_run_batch(batch_id: UUID, db: Session = Depends(get_db)):
+    batch = db.get(models.RunBatch, batch_id)
+    if not batch:
+        raise HTTPException(404, "run batch not found")
+
+    by_status = batch_progress(db, batch_id)
+    finished = sum(by_status.get(s, 0) for s in TERMINAL_RUN_STATUSES)
+    return {
+        "batch_id": str(batch.id),
+        "manifest_id": str(batch.manifest_id),
+        "initiated_by": batch.initiated_by,
+        "created_at": batch.created_at,
+        "size": batch.size,
+        "by_status": by_status,
+        "finished": finished,
+        "complete": finished == batch.size,
+    }
+
+
+@router.get("/runs/queue")
+def get_run_queue(db: Session = Depends(get_db)):
+    return {"depth": queue_depth(db), "pending_resumes": pending_resumes(db)}
+
+
+def _encode_runs_cursor(created_at: datetime, run_id: UUID) -> str:
+    raw = json.dumps([created_at.isoformat(), str(run_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_runs_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        created_at, run_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), UUID(run_id)
+    except Exception:
+        raise HTTPException(400, "invalid cursor")
+
+
 @router.get("/runs")
-def list_runs(db: Session = Depends(get_db)):
-    runs = db.scalars(select(models.DagRun)).all()
+def list_runs(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    status: str | None = None,
+    manifest_id: UUID | None = None,
+    initiated_by: str | None = None,
+    batch_id: UUID | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+    include_total: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Runs newest first, keyset-paginated on (created_at, id).
+
+    The body stays a plain list. When more rows exist, X-Next-Cursor carries the cursor
+    for the next page; X-Total-Count is set only when include_total=true, because
+    counting a large filtered ledger costs more than fetching a page.
+    """
+    filters = []
+    if status is not None:
+        filters.append(models.DagRun.status == status)
+    if manifest_id is not None:
+        filters.append(models.DagRun.manifest_id == manifest_id)
+    if initiated_by is not None:
+        filters.append(models.DagRun.initiated_by == initiated_by)
+    if batch_id is not None:
+        filters.append(models.DagRun.batch_id == batch_id)
+    if created_after is not None:
+        filters.append(models.DagRun.created_at >= created_after)
+    if created_before is not None:
+        filters.append(models.DagRun.created_at < created_before)
+
+    query = select(models.DagRun).where(*filters)
+    if cursor is not None:
+        cursor_created_at, cursor_id = _decode_runs_cursor(cursor)
+        query = query.where(
+            tuple_(models.DagRun.created_at, models.DagRun.id) < tuple_(cursor_created_at, cursor_id)
+        )
+
+    # One extra row tells us whether another page exists without a count query.
+    runs = db.scalars(
+        query.order_by(models.DagRun.created_at.desc(), models.DagRun.id.desc()).limit(limit + 1)
+    ).all()
+
+    if len(runs) > limit:
+        runs = runs[:limit]
+        response.headers["X-Next-Cursor"] = _encode_runs_cursor(runs[-1].created_at, runs[-1].id)
+
+    if include_total:
+        total = db.scalar(select(func.count()).select_from(models.DagRun).where(*filters))
+        response.headers["X-Total-Count"] = str(total)
+
     return [
         {
             "id": str(r.id),
@@ -37,6 +201,26 @@ def list_runs(db: Session = Depends(get_db)):
     ]
 
 
+def _stream_ledger(produce):
+    # The stream outlives the request's dependency-managed session, so it owns its own.
+    db = SessionLocal()
+    try:
+        yield from produce(db)
+    finally:
+        db.close()
+
+
+@router.get("/runs/ledger")
+def export_ledger_range(
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+):
+    return StreamingResponse(
+        _stream_ledger(lambda db: iter_ledger_range(db, created_after, created_before)),
+        media_type="application/x-ndjson",
+    )
+
+
 @router.get("/runs/{run_id}")
 def get_run(run_id: UUID, db: Session = Depends(get_db)):
     run = db.get(models.DagRun, run_id)
@@ -49,6 +233,12 @@ def get_run(run_id: UUID, db: Session = Depends(get_db)):
         "created_at": run.created_at,
         "ended_at": run.ended_at,
         "initiated_by": run.initiated_by,
+        "trace_id": run.trace_id,
+        "batch_id": str(run.batch_id) if run.batch_id else None,
+        "run_params": run.run_params,
+        "resume_requested_at": run.resume_requested_at,
+        "claimed_by": run.claimed_by,
+        "heartbeat_at": run.heartbeat_at,
     }
 
 
@@ -65,110 +255,130 @@ def get_run_steps(run_id: UUID, db: Session = Depends(get_db)):
             "decision_rationale": s.decision_rationale,
             "execution_policy_report": s.execution_policy_report,
             "canonical_output": s.canonical_output,
+            "timings": s.timings,
             "error": s.error,
         }
         for s in step_runs
     ]
 
 
-@router.post("/runs/{run_id}/steps/{step_run_id}/attest")
-def attest_compute_step(
+@router.get("/runs/{run_id}/ledger")
+def export_run_ledger(run_id: UUID, db: Session = Depends(get_db)):
+    if not db.get(models.DagRun, run_id):
+        raise HTTPException(404, "dag_run not found")
+
+    return StreamingResponse(
+        _stream_ledger(lambda ledger_db: iter_run_ledger(ledger_db, run_id)),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/runs/{run_id}/events")
+def stream_run_events(
     run_id: UUID,
-    step_run_id: UUID,
-    body: schemas.ComputeAttestIn,
+    last_event_id: int | None = Query(None),
+    last_event_id_header: str | None = Header(None, alias="Last-Event-ID"),
     db: Session = Depends(get_db),
 ):
+    """
+    Server-Sent Events for run and step status transitions. Replays events after
+    Last-Event-ID (header or query parameter), then pushes new ones as they commit.
+    The stream ends after the run reaches `success` or `error`. A run that has ended
+    with no events left after Last-Event-ID gets 204, which stops EventSource from
+    reconnecting.
+    """
     dag_run = db.get(models.DagRun, run_id)
     if not dag_run:
         raise HTTPException(404, "dag_run not found")
 
-    step_run = db.get(models.DagStepRun, step_run_id)
-    if not step_run:
-        raise HTTPException(404, "dag_step_run not found")
-
-    if step_run.dag_run_id != run_id:
-        raise HTTPException(409, "dag_step_run does not belong to dag_run")
+    after_id = last_event_id
+    if last_event_id_header:
+        try:
+            after_id = int(last_event_id_header)
+        except ValueError:
+            raise HTTPException(400, "invalid Last-Event-ID")
 
-    if step_run.status != "WAITING_FOR_ATTESTATION":
-        raise HTTPException(409, "dag_step_run is not WAITING_FOR_ATTESTATION")
-
-    existing = db.execute(
-        text("select 1 from compute_attestations where step_run_id = :step_run_id"),
-        {"step_run_id": step_run_id},
-    ).scalar_one_or_none()
-    if existing is not None:
-        raise HTTPException(409, "compute attestation already exists for this step_run_id")
+    if dag_run.status in TERMINAL_RUN_STATUSES and not db.scalar(
+        select(
+            exists().where(models.RunEvent.dag_run_id == run_id, models.RunEvent.id > (after_id or 0))
+        )
+    ):
+        return Response(status_code=204)
+
+    # The stream reads on its own short checkouts; don't hold this session's
+    # connection for as long as the client stays connected.
+    db.close()
+    return StreamingResponse(
+        iter_run_event_stream(run_id, after_id or 0),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _attestation(run_id: UUID, step_run_id: UUID, body: schemas.ComputeAttestIn) -> Attestation:
+    return Attestation(
+        run_id=run_id,
+        step_run_id=step_run_id,
+        attested_by=body.attested_by,
+        outcome=body.outcome,
+        notes=body.notes,
+        artifacts=[a.dict() for a in body.artifacts],
+    )
+
+
+@router.post("/runs/attestations:bulk")
+def attest_compute_steps_bulk(body: schemas.BulkAttestIn, db: Session = Depends(get_db)):
+    """
+    Record many compute attestations in one transaction. Each item is validated like
+    the single-step endpoint and reported in `results` (in request order) with its own
+    status_code; valid items commit even when others are rejected. With resume=true,
+    every run left with no step WAITING_FOR_ATTESTATION gets a resume request for the
+    workers, as under AUTO_RESUME_ON_ATTEST, and is listed in `requested`.
+    """
+    if len(body.items) > _max_bulk_attestations():
+        raise HTTPException(413, f"request exceeds ATTEST_BULK_MAX_ITEMS ({_max_bulk_attestations()})")
 
-    contract_snapshot = db.execute(
-        text("select compute_contract from manifest_steps where id = :manifest_step_id"),
-        {"manifest_step_id": step_run.manifest_step_id},
-    ).scalar_one_or_none()
+    try:
+        results = attest_steps(db, [_attestation(i.run_id, i.step_run_id, i) for i in body.items])
+    except IntegrityError:
+        raise HTTPException(409, "a compute attestation was recorded concurrently; retry the request")
+
+    requested = []
+    if body.resume:
+        run_ids = unblocked_runs(db, results)
+        if run_ids:
+            dag_runs = db.scalars(
+                select(models.DagRun)
+                .where(models.DagRun.id.in_(run_ids))
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            ).all()
+            request_resume(db, dag_runs)
+            # A worker may have resumed a run since unblocked_runs read it.
+            requested = [str(r.id) for r in dag_runs if r.status == "waiting"]
+            db.commit()
 
-    if isinstance(contract_snapshot, dict) or isinstance(contract_snapshot, list):
-        contract_snapshot = json.dumps(contract_snapshot)
-    elif contract_snapshot is not None and not isinstance(contract_snapshot, str):
-        contract_snapshot = json.dumps(contract_snapshot)
+    return {
+        "accepted": sum(1 for r in results if r.ok),
+        "rejected": sum(1 for r in results if not r.ok),
+        "results": [r.to_json() for r in results],
+        "requested": requested,
+    }
 
-    attestation_id = uuid.uuid4()
-    now = datetime.now(timezone.utc)
 
+@router.post("/runs/{run_id}/steps/{step_run_id}/attest")
+def attest_compute_step(
+    run_id: UUID,
+    step_run_id: UUID,
+    body: schemas.ComputeAttestIn,
+    db: Session = Depends(get_db),
+):
     try:
-        db.execute(
-            text(
-                """
-                insert into compute_attestations
-                (id, step_run_id, attested_by, attested_at, outcome, notes, contract_snapshot)
-                values
-                (:id, :step_run_id, :attested_by, :attested_at, :outcome, :notes, (:contract_snapshot)::jsonb)
-                """
-            ),
-            {
-                "id": attestation_id,
-                "step_run_id": step_run_id,
-                "attested_by": body.attested_by,
-                "attested_at": now,
-                "outcome": body.outcome,
-                "notes": body.notes,
-                "contract_snapshot": contract_snapshot,
-            },
-        )
-
-        for a in body.artifacts:
-            db.execute(
-                text(
-                    """
-                    insert into compute_artifacts
-                    (id, attestation_id, name, uri, sha256, bytes, created_at)
-                    values
-                    (:id, :attestation_id, :name, :uri, :sha256, :bytes, :created_at)
-                    """
-                ),
-                {
-                    "id": uuid.uuid4(),
-                    "attestation_id": attestation_id,
-                    "name": a.name,
-                    "uri": a.uri,
-                    "sha256": a.sha256,
-                    "bytes": a.bytes,
-                    "created_at": now,
-                },
-            )
-
-        step_run.status = body.outcome
-        step_run.ended_at = now
-
-        if body.outcome == "FAIL":
-            dag_run.status = "error"
-            dag_run.ended_at = now
-
-        db.commit()
-
+        [result] = attest_steps(db, [_attestation(run_id, step_run_id, body)])
     except IntegrityError:
-        db.rollback()
         raise HTTPException(409, "compute attestation already exists for this step_run_id")
-    except Exception:
-        db.rollback()
-        raise
+    if not result.ok:
+        raise HTTPException(result.status_code, result.detail)
 
     return {"ok": True, "step_run_id": str(step_run_id), "new_status": body.outcome}
 
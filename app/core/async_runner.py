@@ -0,0 +1,182 @@
+"""
+asyncio-native run execution.
+
+Many runs share one event loop and one semaphore that bounds in-flight LLM calls
+across all of them. Each run keeps its own Session; its database phases (the same
+helpers the synchronous runner uses) run on a worker thread one at a time, so a
+Session is never used concurrently. Between phases no transaction is open, so a
+run waiting on the model does not hold a pooled connection.
+
+Steps are always grouped into dependency levels, as in the synchronous runner's
+parallel mode; the ledger rows written are the same.
+"""
+import asyncio
+import os
+import time
+from typing import Iterable, List
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.core.llm_router import allm_complete
+from app.core.metrics import track_run
+from app.core.plan import PlanError
+from app.core.runner import (
+    _PreparedStep,
+    _RunState,
+    _annotate_llm_span,
+    _complete_run,
+    _create_running_run,
+    _fail_llm_call,
+    _fail_unstartable_run,
+    _finish_task_steps,
+    _get_claimed_run,
+    _halt_at_compute_boundary,
+    _ms_since,
+    _new_run_state,
+    _needs_llm_call,
+    _record_llm_call,
+    _resume_run_state,
+    _run_trace,
+    _runner_session,
+    _start_task_steps,
+    _triage_batch,
+    compile_run,
+)
+from app.core.tracing import span
+from app.db.session import SessionLocal
+
+
+def default_max_inflight() -> int:
+    try:
+        return max(1, int(os.getenv("LLM_ASYNC_MAX_INFLIGHT", "100")))
+    except ValueError:
+        return 100
+
+
+async def execute_manifest_async(
+    manifest_id: UUID,
+    initiated_by: str | None = None,
+    semaphore: asyncio.Semaphore | None = None,
+    run_params: dict | None = None,
+) -> UUID:
+    semaphore = semaphore or asyncio.Semaphore(default_max_inflight())
+    db = SessionLocal()
+    try:
+        with _runner_session(db):
+            compiled = await asyncio.to_thread(compile_run, db, manifest_id)
+            dag_run = await asyncio.to_thread(_create_running_run, db, manifest_id, initiated_by, run_params)
+            state = await asyncio.to_thread(_new_run_state, db, dag_run, compiled)
+            return await _advance_run_async(db, state, semaphore)
+    finally:
+        db.close()
+
+
+async def execute_claimed_run_async(run_id: UUID, semaphore: asyncio.Semaphore | None = None) -> UUID:
+    semaphore = semaphore or asyncio.Semaphore(default_max_inflight())
+    db = SessionLocal()
+    try:
+        with _runner_session(db):
+            dag_run = await asyncio.to_thread(_get_claimed_run, db, run_id)
+            try:
+                state = await asyncio.to_thread(_new_run_state, db, dag_run)
+            except PlanError:
+                await asyncio.to_thread(_fail_unstartable_run, db, dag_run)
+                raise
+            return await _advance_run_async(db, state, semaphore)
+    finally:
+        db.close()
+
+
+async def resume_run_async(
+    run_id: UUID,
+    initiated_by: str | None = None,
+    semaphore: asyncio.Semaphore | None = None,
+) -> UUID:
+    semaphore = semaphore or asyncio.Semaphore(default_max_inflight())
+    db = SessionLocal()
+    try:
+        with _runner_session(db):
+            state = await asyncio.to_thread(_resume_run_state, db, run_id, initiated_by)
+            return await _advance_run_async(db, state, semaphore)
+    finally:
+        db.close()
+
+
+async def resume_claimed_run_async(
+    db: Session,
+    run_id: UUID,
+    semaphore: asyncio.Semaphore | None = None,
+    claimed_by: str | None = None,
+) -> UUID:
+    """
+    resume_run_async on the session that claimed the run's resume request, so the row
+    lock from run_queue.claim_resume_request is held until the run is `running`, under
+    the lease of claimed_by. Closes the session.
+    """
+    semaphore = semaphore or asyncio.Semaphore(default_max_inflight())
+    try:
+        with _runner_session(db):
+            state = await asyncio.to_thread(_resume_run_state, db, run_id, None, claimed_by)
+            return await _advance_run_async(db, state, semaphore)
+    finally:
+        db.close()
+
+
+async def execute_manifests_async(
+    manifest_ids: Iterable[UUID],
+    initiated_by: str | None = None,
+    max_inflight: int | None = None,
+) -> List[UUID]:
+    """
+    Execute several manifests concurrently on the current event loop, sharing one
+    in-flight LLM call limit. Results are returned in input order.
+    """
+    semaphore = asyncio.Semaphore(max_inflight or default_max_inflight())
+    return list(
+        await asyncio.gather(
+            *(execute_manifest_async(m, initiated_by, semaphore) for m in manifest_ids)
+        )
+    )
+
+
+async def _advance_run_async(db: Session, state: _RunState, semaphore: asyncio.Semaphore) -> UUID:
+    with track_run() as tracked, _run_trace(db, state):
+        run_id = await _advance_run_batches_async(db, state, semaphore)
+        tracked["status"] = state.dag_run.status
+        return run_id
+
+
+async def _advance_run_batches_async(db: Session, state: _RunState, semaphore: asyncio.Semaphore) -> UUID:
+    for batch in state.plan.levels:
+        # Skipped steps are written here, so triage runs off the event loop too.
+        ready, compute_boundary = await asyncio.to_thread(_triage_batch, db, state, batch)
+
+        if ready:
+            prepared = await asyncio.to_thread(_start_task_steps, db, state, ready)
+            await asyncio.gather(*(_acall(p, semaphore) for p in prepared if _needs_llm_call(p)))
+            await asyncio.to_thread(_finish_task_steps, db, state, prepared)
+
+        if compute_boundary is not None:
+            return await asyncio.to_thread(_halt_at_compute_boundary, db, state, compute_boundary)
+
+    return await asyncio.to_thread(_complete_run, db, state)
+
+
+async def _acall(p: _PreparedStep, semaphore: asyncio.Semaphore) -> None:
+    """
+    A call that raises fails its own step, as in the threaded runner, so one bad call
+    cannot abandon the level's other results or leave RUNNING markers behind.
+    """
+    async with semaphore:
+        llm_started = time.perf_counter()
+        try:
+            with span(p.span, "llm_complete") as llm_span:
+                p.llm_result = await allm_complete(p.rendered_prompt)
+                _annotate_llm_span(llm_span, p.llm_result)
+        except Exception as e:
+            _fail_llm_call(p, e)
+            return
+        finally:
+            p.timings["llm_ms"] = _ms_since(llm_started)
+    _record_llm_call(p)
@@ -0,0 +1,220 @@
+"""
+Compute step attestations.
+
+attest_steps records any number of attestations in one transaction. The step runs
+(row-locked, with their contract snapshots), their dag runs and any existing
+attestations are loaded with one query each; attestations, artifacts and run events
+are written with one multi-row INSERT each. Every item gets its own result: items that
+fail validation are reported and skipped, the rest commit together.
+
+Under AUTO_RESUME_ON_ATTEST a successful attestation also records a resume request on
+its run in the same transaction; a worker resumes the run once no step of it is left
+waiting (see run_queue.claim_resume_request).
+"""
+import datetime
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+from uuid import UUID
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.core.events import record_events_for_runs, run_event, step_event
+from app.core.metrics import ATTESTATION_WAIT, ATTESTATIONS
+from app.core.run_queue import auto_resume_enabled, request_resume
+from app.db import models
+
+WAITING_STATUS = "WAITING_FOR_ATTESTATION"
+
+
+@dataclass
+class Attestation:
+    run_id: UUID
+    step_run_id: UUID
+    attested_by: str
+    outcome: str  # "SUCCESS" or "FAIL"
+    notes: str | None = None
+    artifacts: List[Dict[str, Any]] = field(default_factory=list)  # name, uri, sha256, bytes
+
+
+@dataclass
+class AttestationResult:
+    run_id: UUID
+    step_run_id: UUID
+    ok: bool
+    status_code: int
+    detail: str | None = None
+    new_status: str | None = None
+
+    def to_json(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "run_id": str(self.run_id),
+            "step_run_id": str(self.step_run_id),
+            "ok": self.ok,
+            "status_code": self.status_code,
+        }
+        if self.ok:
+            out["new_status"] = self.new_status
+        else:
+            out["detail"] = self.detail
+        return out
+
+
+def _rejected(item: Attestation, status_code: int, detail: str) -> AttestationResult:
+    return AttestationResult(item.run_id, item.step_run_id, False, status_code, detail=detail)
+
+
+def attest_steps(db: Session, items: List[Attestation]) -> List[AttestationResult]:
+    """
+    Validate and record attestations; returns one result per item, in order.
+
+    The checks match the single-step endpoint (404 for an unknown run or step run, 409
+    for a step of another run, one not WAITING_FOR_ATTESTATION, or one already
+    attested), plus 409 for a step run attested twice in the same call. A FAIL outcome
+    errors its run. Commits once; an IntegrityError from a concurrent writer that slipped
+    past the row locks propagates after rollback.
+    """
+    if not items:
+        return []
+
+    step_run_ids = {item.step_run_id for item in items}
+    rows = db.execute(
+        select(models.DagStepRun, models.ManifestStep.compute_contract)
+        .join(models.ManifestStep, models.ManifestStep.id == models.DagStepRun.manifest_step_id)
+        .where(models.DagStepRun.id.in_(step_run_ids))
+        .order_by(models.DagStepRun.id)
+        .with_for_update(of=models.DagStepRun)
+    ).all()
+    step_runs = {sr.id: (sr, contract) for sr, contract in rows}
+    dag_runs = {
+        r.id: r
+        for r in db.scalars(select(models.DagRun).where(models.DagRun.id.in_({item.run_id for item in items})))
+    }
+    attested = set(
+        db.scalars(
+            select(models.ComputeAttestation.step_run_id).where(
+                models.ComputeAttestation.step_run_id.in_(step_run_ids)
+            )
+        )
+    )
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    results: List[AttestationResult] = []
+    attestation_rows: List[Dict[str, Any]] = []
+    artifact_rows: List[Dict[str, Any]] = []
+    events_by_run: Dict[UUID, List[Dict[str, Any]]] = {}
+    waits: List[tuple[str, float | None]] = []  # (outcome, seconds waited), read before commit expires rows
+    seen: set[UUID] = set()
+    succeeded: Dict[UUID, models.DagRun] = {}
+
+    for item in items:
+        dag_run = dag_runs.get(item.run_id)
+        if dag_run is None:
+            results.append(_rejected(item, 404, "dag_run not found"))
+            continue
+        if item.step_run_id not in step_runs:
+            results.append(_rejected(item, 404, "dag_step_run not found"))
+            continue
+        step_run, contract_snapshot = step_runs[item.step_run_id]
+        if step_run.dag_run_id != item.run_id:
+            results.append(_rejected(item, 409, "dag_step_run does not belong to dag_run"))
+            continue
+        if item.step_run_id in seen:
+            results.append(_rejected(item, 409, "dag_step_run attested more than once in this request"))
+            continue
+        seen.add(item.step_run_id)
+        if step_run.status != WAITING_STATUS:
+            results.append(_rejected(item, 409, f"dag_step_run is not {WAITING_STATUS}"))
+            continue
+        if item.step_run_id in attested:
+            results.append(_rejected(item, 409, "compute attestation already exists for this step_run_id"))
+            continue
+
+        attestation_id = uuid.uuid4()
+        attestation_rows.append(
+            {
+                "id": attestation_id,
+                "step_run_id": item.step_run_id,
+                "attested_by": item.attested_by,
+                "attested_at": now,
+                "outcome": item.outcome,
+                "notes": item.notes,
+                "contract_snapshot": contract_snapshot,
+            }
+        )
+        artifact_rows.extend(
+            {
+                "id": uuid.uuid4(),
+                "attestation_id": attestation_id,
+                "name": a["name"],
+                "uri": a["uri"],
+                "sha256": a.get("sha256"),
+                "bytes": a.get("bytes"),
+                "created_at": now,
+            }
+            for a in item.artifacts
+        )
+
+        step_run.status = item.outcome
+        step_run.ended_at = now
+        events = events_by_run.setdefault(item.run_id, [])
+        events.append(step_event(step_run.id, step_run.manifest_step_id, None, item.outcome))
+        if item.outcome == "FAIL" and dag_run.status != "error":
+            dag_run.status = "error"
+            dag_run.ended_at = now
+            events.append(run_event("error"))
+        elif item.outcome == "SUCCESS":
+            succeeded[item.run_id] = dag_run
+
+        waited = (now - step_run.started_at).total_seconds() if step_run.started_at is not None else None
+        waits.append((item.outcome, waited))
+        results.append(AttestationResult(item.run_id, item.step_run_id, True, 200, new_status=item.outcome))
+
+    if not waits:
+        db.rollback()  # release the row locks
+        return results
+
+    try:
+        db.execute(insert(models.ComputeAttestation), attestation_rows)
+        if artifact_rows:
+            db.execute(insert(models.ComputeArtifact), artifact_rows)
+        # Run events go last so a step's `error` run event follows its step event.
+        for events in events_by_run.values():
+            events.sort(key=lambda e: e["kind"] == "run")
+        record_events_for_runs(db, events_by_run)
+        if auto_resume_enabled():
+            request_resume(db, succeeded.values())
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    for outcome, waited in waits:
+        ATTESTATIONS.labels(outcome).inc()
+        if waited is not None:
+            ATTESTATION_WAIT.labels(outcome).observe(waited)
+    return results
+
+
+def unblocked_runs(db: Session, results: List[AttestationResult]) -> List[UUID]:
+    """
+    Runs that an attest_steps call left resumable: still `waiting`, with no step left
+    WAITING_FOR_ATTESTATION. In first-seen order.
+    """
+    run_ids = list(dict.fromkeys(r.run_id for r in results if r.ok and r.new_status == "SUCCESS"))
+    if not run_ids:
+        return []
+    waiting = set(
+        db.scalars(
+            select(models.DagRun.id).where(models.DagRun.id.in_(run_ids), models.DagRun.status == "waiting")
+        )
+    )
+    blocked = set(
+        db.scalars(
+            select(models.DagStepRun.dag_run_id)
+            .where(models.DagStepRun.dag_run_id.in_(waiting), models.DagStepRun.status == WAITING_STATUS)
+            .distinct()
+        )
+    )
+    return [run_id for run_id in run_ids if run_id in waiting and run_id not in blocked]
@@ -0,0 +1,211 @@
+"""
+Content-addressed, compressed storage for large artifact payloads.
+
+Payloads at or above ARTIFACT_BLOB_THRESHOLD_BYTES are written once, zstd-compressed,
+under the sha256 of their uncompressed bytes; the artifact row keeps only that hash
+and the uncompressed size. Identical payloads across runs share one blob. Blobs are
+immutable: a write for an existing hash is a no-op, and every read is verified
+against its hash.
+
+Offloading is enabled by setting ARTIFACT_BLOB_DIR (local directory backend). Without
+it, payloads stay inline in Postgres as before.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Tuple
+
+import zstandard
+
+from app.core.json_utils import canonical_json
+
+ZSTD_LEVEL = 3
+
+
+class BlobIntegrityError(ValueError):
+    """A blob's content does not match the hash it is stored under."""
+
+
+class BlobStore(ABC):
+    """
+    Storage backend for compressed blobs keyed by the sha256 of their uncompressed
+    content. Implementations must make write idempotent and never overwrite a blob.
+    """
+
+    @abstractmethod
+    def exists(self, sha256: str) -> bool: ...
+
+    @abstractmethod
+    def write(self, sha256: str, compressed: bytes) -> None: ...
+
+    @abstractmethod
+    def read(self, sha256: str) -> bytes:
+        """Returns the compressed bytes; raises FileNotFoundError if absent."""
+
+
+class LocalDirBlobStore(BlobStore):
+    """Blobs as <root>/<aa>/<bb>/<sha256>.zst, written atomically via rename."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], f"{sha256}.zst")
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self._path(sha256))
+
+    def write(self, sha256: str, compressed: bytes) -> None:
+        path = self._path(sha256)
+        if os.path.exists(path):
+            return
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(compressed)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def read(self, sha256: str) -> bytes:
+        with open(self._path(sha256), "rb") as f:
+            return f.read()
+
+
+def _threshold_bytes() -> int:
+    try:
+        return max(1, int(os.getenv("ARTIFACT_BLOB_THRESHOLD_BYTES", "65536")))
+    except ValueError:
+        return 65536
+
+
+def _read_cache_entries() -> int:
+    try:
+        return max(0, int(os.getenv("ARTIFACT_BLOB_CACHE_ENTRIES", "128")))
+    except ValueError:
+        return 128
+
+
+_store: BlobStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore | None:
+    global _store
+    if _store is None:
+        root = os.getenv("ARTIFACT_BLOB_DIR", "").strip()
+        if not root:
+            return None
+        with _store_lock:
+            if _store is None:
+                _store = LocalDirBlobStore(root)
+    return _store
+
+
+def set_blob_store(store: BlobStore | None) -> None:
+    """Install another backend (or None to keep payloads inline)."""
+    global _store
+    with _store_lock:
+        _store = store
+    with _cache_lock:
+        _cache.clear()
+
+
+# zstd contexts are not thread-safe; keep one pair per thread.
+_local = threading.local()
+
+
+def _compressor() -> zstandard.ZstdCompressor:
+    c = getattr(_local, "compressor", None)
+    if c is None:
+        c = _local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return c
+
+
+def _decompressor() -> zstandard.ZstdDecompressor:
+    d = getattr(_local, "decompressor", None)
+    if d is None:
+        d = _local.decompressor = zstandard.ZstdDecompressor()
+    return d
+
+
+def put_blob(data: bytes) -> Tuple[str, int]:
+    """Store data (if not already present) and return (sha256, uncompressed size)."""
+    store = get_blob_store()
+    if store is None:
+        raise RuntimeError("ARTIFACT_BLOB_DIR is not configured")
+    sha256 = hashlib.sha256(data).hexdigest()
+    if not store.exists(sha256):
+        store.write(sha256, _compressor().compress(data))
+    return sha256, len(data)
+
+
+_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_blob(sha256: str) -> bytes:
+    """Read, decompress and verify a blob, through a small LRU of recent reads."""
+    with _cache_lock:
+        data = _cache.get(sha256)
+        if data is not None:
+            _cache.move_to_end(sha256)
+            return data
+
+    store = get_blob_store()
+    if store is None:
+        raise RuntimeError("ARTIFACT_BLOB_DIR is not configured")
+    data = _decompressor().decompress(store.read(sha256))
+    if hashlib.sha256(data).hexdigest() != sha256:
+        raise BlobIntegrityError(f"blob {sha256} failed hash verification")
+
+    max_entries = _read_cache_entries()
+    if max_entries:
+        with _cache_lock:
+            _cache[sha256] = data
+            while len(_cache) > max_entries:
+                _cache.popitem(last=False)
+    return data
+
+
+def offload_text(value: str | None) -> Tuple[str | None, str | None, int | None]:
+    """
+    Returns (inline value, sha256, size). Large values go to the blob store and come
+    back with inline value None; small ones, or all when offloading is off, stay inline.
+    """
+    if value is None or get_blob_store() is None:
+        return value, None, None
+    data = value.encode("utf-8")
+    if len(data) < _threshold_bytes():
+        return value, None, None
+    sha256, size = put_blob(data)
+    return None, sha256, size
+
+
+def offload_json(value: Any) -> Tuple[Any, str | None, int | None]:
+    """As offload_text, for JSON values; blobs hold their canonical JSON encoding."""
+    if value is None or get_blob_store() is None:
+        return value, None, None
+    data = canonical_json(value).encode("utf-8")
+    if len(data) < _threshold_bytes():
+        return value, None, None
+    sha256, size = put_blob(data)
+    return None, sha256, size
+
+
+def load_text(sha256: str) -> str:
+    return get_blob(sha256).decode("utf-8")
+
+
+def load_json(sha256: str) -> Any:
+    return json.loads(get_blob(sha256))
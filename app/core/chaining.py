@@ -0,0 +1,117 @@
+"""
+Field-level projection of upstream canonical output.
+
+ManifestStep.chaining maps an upstream step key to the JSON Pointers (RFC 6901) the
+step consumes from that dependency's canonical_output:
+
+    {"extract": ["/company/name", "/metrics/0/value"]}
+
+Only the listed fields chain forward, as {pointer: value}. Dependencies not listed in
+chaining chain their full canonical_output, as before.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+_MISSING = object()
+
+
+@lru_cache(maxsize=4096)
+def parse_pointer(pointer: str) -> Tuple[str, ...]:
+    if pointer == "":
+        return ()
+    if not pointer.startswith("/"):
+        raise ValueError(f"JSON pointer must be empty or start with '/': {pointer!r}")
+    tokens = []
+    for raw in pointer[1:].split("/"):
+        if "~" in raw.replace("~0", "").replace("~1", ""):
+            raise ValueError(f"invalid '~' escape in JSON pointer: {pointer!r}")
+        tokens.append(raw.replace("~1", "/").replace("~0", "~"))
+    return tuple(tokens)
+
+
+def resolve_pointer(document: Any, pointer: str) -> Any:
+    """
+    Returns the referenced value, or _MISSING if the pointer does not resolve.
+    """
+    current = document
+    for token in parse_pointer(pointer):
+        if isinstance(current, dict):
+            if token not in current:
+                return _MISSING
+            current = current[token]
+        elif isinstance(current, list):
+            if not token.isdigit() or (len(token) > 1 and token[0] == "0"):
+                return _MISSING
+            index = int(token)
+            if index >= len(current):
+                return _MISSING
+            current = current[index]
+        else:
+            return _MISSING
+    return current
+
+
+def validate_chaining(step_key: str, chaining: Any, depends_on: Tuple[str, ...]) -> List[str]:
+    """
+    Static checks run when a manifest is compiled. Returns error messages.
+    """
+    if chaining is None:
+        return []
+    if not isinstance(chaining, dict):
+        return [f"step '{step_key}': chaining must be an object mapping dependency keys to JSON pointers"]
+
+    errors: List[str] = []
+    for dep in sorted(chaining):
+        pointers = chaining[dep]
+        if dep not in depends_on:
+            errors.append(f"step '{step_key}': chaining references '{dep}', which is not in depends_on")
+            continue
+        if not isinstance(pointers, list) or any(not isinstance(p, str) for p in pointers):
+            errors.append(f"step '{step_key}': chaining['{dep}'] must be a list of JSON pointers")
+            continue
+        for p in pointers:
+            try:
+                parse_pointer(p)
+            except ValueError as e:
+                errors.append(f"step '{step_key}': chaining['{dep}']: {e}")
+    return errors
+
+
+def project_upstream(
+    chaining: Any,
+    depends_on: Tuple[str, ...],
+    canonical_by_step_key: Dict[str, Any],
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Build upstream_canonical for a step.
+
+    Returns (upstream, report). report maps each projected dependency to its pointers and
+    the pointers that did not resolve; any missing pointer must fail the step.
+    """
+    chaining = chaining or {}
+    upstream: Dict[str, Any] = {}
+    report: Dict[str, Any] = {}
+
+    for dep in depends_on:
+        output = canonical_by_step_key.get(dep)
+        if dep not in chaining:
+            upstream[dep] = output
+            continue
+
+        projected: Dict[str, Any] = {}
+        missing: List[str] = []
+        for pointer in chaining[dep]:
+            value = resolve_pointer(output, pointer)
+            if value is _MISSING:
+                missing.append(pointer)
+            else:
+                projected[pointer] = value
+
+        upstream[dep] = projected
+        report[dep] = {"pointers": list(chaining[dep]), "missing": missing}
+
+    return upstream, report
+
+
+def missing_projections(report: Dict[str, Any]) -> Dict[str, List[str]]:
+    return {dep: r["missing"] for dep, r in report.items() if r["missing"]}
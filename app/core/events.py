@@ -0,0 +1,103 @@
+"""
+Run progress events.
+
+Every run and step status transition is appended to `run_events` in the same
+transaction as the transition itself, followed by `pg_notify('run_events', <run id>)`.
+Postgres delivers the notification only when that transaction commits, so a listener
+never sees an event whose status change was rolled back.
+
+The table is the durable source (and gives SSE clients a resume point via the event
+id); NOTIFY is only a wake-up signal.
+"""
+from typing import Any, Dict, List
+from uuid import UUID
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app.db import models
+
+RUN_EVENTS_CHANNEL = "run_events"
+TERMINAL_RUN_STATUSES = {"success", "error"}
+
+
+def run_event(status: str) -> Dict[str, Any]:
+    return {"kind": "run", "status": status}
+
+
+def step_event(step_run_id: UUID, manifest_step_id: UUID, step_key: str | None, status: str) -> Dict[str, Any]:
+    return {
+        "kind": "step",
+        "status": status,
+        "step_run_id": step_run_id,
+        "manifest_step_id": manifest_step_id,
+        "step_key": step_key,
+    }
+
+
+def record_run_events(db: Session, dag_run_id: UUID, events: List[Dict[str, Any]]) -> None:
+    """
+    Append events for one run in the caller's transaction and signal listeners on commit.
+    """
+    if not events:
+        return
+
+    db.execute(
+        insert(models.RunEvent),
+        [
+            {
+                "dag_run_id": dag_run_id,
+                "kind": e["kind"],
+                "status": e["status"],
+                "step_run_id": e.get("step_run_id"),
+                "manifest_step_id": e.get("manifest_step_id"),
+                "step_key": e.get("step_key"),
+            }
+            for e in events
+        ],
+    )
+    db.execute(
+        text("select pg_notify(:channel, :payload)"),
+        {"channel": RUN_EVENTS_CHANNEL, "payload": str(dag_run_id)},
+    )
+
+
+def record_queued_runs(db: Session, dag_run_ids: List[UUID]) -> None:
+    """
+    Append a `queued` run event for each of many newly created runs in one statement.
+    No NOTIFY is sent: nobody can be following a run created in this transaction.
+    """
+    if not dag_run_ids:
+        return
+
+    db.execute(
+        insert(models.RunEvent),
+        [{"dag_run_id": run_id, **run_event("queued")} for run_id in dag_run_ids],
+    )
+
+
+def record_events_for_runs(db: Session, events_by_run: Dict[UUID, List[Dict[str, Any]]]) -> None:
+    """
+    Append events for many runs in one INSERT and signal each run's listeners on commit,
+    with a single NOTIFY statement for all of them.
+    """
+    rows = [
+        {
+            "dag_run_id": dag_run_id,
+            "kind": e["kind"],
+            "status": e["status"],
+            "step_run_id": e.get("step_run_id"),
+            "manifest_step_id": e.get("manifest_step_id"),
+            "step_key": e.get("step_key"),
+        }
+        for dag_run_id, events in events_by_run.items()
+        for e in events
+    ]
+    if not rows:
+        return
+
+    db.execute(insert(models.RunEvent), rows)
+    db.execute(
+        text("select pg_notify(:channel, run_id) from unnest(cast(:run_ids as text[])) as run_id"),
+        {"channel": RUN_EVENTS_CHANNEL, "run_ids": [str(run_id) for run_id in events_by_run]},
+    )
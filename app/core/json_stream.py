@@ -0,0 +1,236 @@
+"""
+Incremental JSON prefix validation.
+
+JsonPrefixValidator is fed text as it arrives and reports the first character at which
+the text stops being a prefix of any valid JSON document: prose where a JSON object
+should start, a bare word inside an object, a second value after the first. It does
+not build values; json.loads parses the complete text as before.
+
+Whatever the chunking, the same text fails at the same offset with the same reason, so
+an abort is reproducible. Runs of plain string characters are skipped with one regex
+match, so the per-character loop only runs over structure.
+"""
+import re
+
+_WHITESPACE = frozenset(" \t\n\r")
+_DIGITS = frozenset("0123456789")
+_HEX = frozenset("0123456789abcdefABCDEF")
+_ESCAPES = frozenset('"\\/bfnrtu')
+_LITERALS = {"t": "true", "f": "false", "n": "null"}
+_STRING_RUN = re.compile(r'[^"\\\x00-\x1f]+')
+
+# Parser states.
+_VALUE = 0         # a value must start here
+_VALUE_OR_END = 1  # just after '[': a value or ']'
+_KEY_OR_END = 2    # just after '{': a key or '}'
+_KEY = 3           # after ',' in an object: a key
+_COLON = 4         # after a key
+_AFTER_VALUE = 5   # after a value: ',' or the closing bracket, or only whitespace at top level
+_STRING = 6
+_ESCAPE = 7
+_UNICODE = 8
+_NUMBER = 9
+_LITERAL = 10
+_DONE = 11         # top-level value complete; only whitespace may follow
+
+# Number sub-states; the accepting ones are where a number may end.
+_N_START, _N_MINUS, _N_ZERO, _N_INT, _N_DOT, _N_FRAC, _N_EXP, _N_EXP_SIGN, _N_EXP_INT = range(9)
+_N_ACCEPTING = frozenset({_N_ZERO, _N_INT, _N_FRAC, _N_EXP_INT})
+
+
+class JsonPrefixValidator:
+    """
+    feed() returns False once the text can no longer be valid JSON; error and
+    error_offset (0-based, into all text fed so far) then say why and where, and
+    further feeds are ignored. With require_object, the document must be an object,
+    as JSON-mode completions are.
+    """
+
+    def __init__(self, require_object: bool = True):
+        self.require_object = require_object
+        self.error: str | None = None
+        self.error_offset: int | None = None
+        self._offset = 0
+        self._state = _VALUE
+        self._stack: list[str] = []  # "{" / "["
+        self._string_is_key = False
+        self._unicode_left = 0
+        self._number = _N_START
+        self._literal = ""
+        self._literal_pos = 0
+        self._started = False
+
+    @property
+    def complete(self) -> bool:
+        """True when a whole top-level value has been seen (and nothing invalid after it)."""
+        if self.error is not None:
+            return False
+        if self._state == _NUMBER:
+            return not self._stack and self._number in _N_ACCEPTING
+        return self._state == _DONE
+
+    def _fail(self, index: int, reason: str) -> bool:
+        self.error = reason
+        self.error_offset = self._offset + index
+        return False
+
+    def feed(self, text: str) -> bool:
+        if self.error is not None:
+            return False
+
+        i = 0
+        n = len(text)
+        while i < n:
+            state = self._state
+            ch = text[i]
+
+            if state == _STRING:
+                run = _STRING_RUN.match(text, i)
+                if run is not None:
+                    i = run.end()
+                    continue
+                if ch == '"':
+                    self._state = _COLON if self._string_is_key else self._after_value()
+                elif ch == "\\":
+                    self._state = _ESCAPE
+                else:
+                    return self._fail(i, "control character in string")
+                i += 1
+                continue
+
+            if state == _ESCAPE:
+                if ch not in _ESCAPES:
+                    return self._fail(i, f"invalid escape '\\{ch}'")
+                if ch == "u":
+                    self._state = _UNICODE
+                    self._unicode_left = 4
+                else:
+                    self._state = _STRING
+                i += 1
+                continue
+
+            if state == _UNICODE:
+                if ch not in _HEX:
+                    return self._fail(i, "invalid \\u escape")
+                self._unicode_left -= 1
+                if not self._unicode_left:
+                    self._state = _STRING
+                i += 1
+                continue
+
+            if state == _NUMBER:
+                if self._number_char(ch):
+                    i += 1
+                    continue
+                if self._number not in _N_ACCEPTING:
+                    return self._fail(i, "incomplete number")
+                self._state = self._after_value()
+                continue  # the character ends the number; handle it in the new state
+
+            if state == _LITERAL:
+                if ch != self._literal[self._literal_pos]:
+                    return self._fail(i, f"invalid literal, expected '{self._literal}'")
+                self._literal_pos += 1
+                if self._literal_pos == len(self._literal):
+                    self._state = self._after_value()
+                i += 1
+                continue
+
+            if ch in _WHITESPACE:
+                i += 1
+                continue
+
+            if state in (_VALUE, _VALUE_OR_END):
+                if state == _VALUE_OR_END and ch == "]":
+                    self._stack.pop()
+                    self._state = self._after_value()
+                elif not self._start_value(ch):
+                    return self._fail(i, self._unexpected(ch, "a JSON value"))
+            elif state in (_KEY_OR_END, _KEY):
+                if ch == '"':
+                    self._state = _STRING
+                    self._string_is_key = True
+                elif state == _KEY_OR_END and ch == "}":
+                    self._stack.pop()
+                    self._state = self._after_value()
+                else:
+                    return self._fail(i, self._unexpected(ch, "an object key"))
+            elif state == _COLON:
+                if ch != ":":
+                    return self._fail(i, self._unexpected(ch, "':'"))
+                self._state = _VALUE
+            elif state == _AFTER_VALUE:
+                top = self._stack[-1]
+                if ch == ",":
+                    self._state = _KEY if top == "{" else _VALUE
+                elif (ch == "}" and top == "{") or (ch == "]" and top == "["):
+                    self._stack.pop()
+                    self._state = self._after_value()
+                else:
+                    expected = "',' or '}'" if top == "{" else "',' or ']'"
+                    return self._fail(i, self._unexpected(ch, expected))
+            else:  # _DONE
+                return self._fail(i, self._unexpected(ch, "end of document"))
+            i += 1
+
+        self._offset += n
+        return True
+
+    def _after_value(self) -> int:
+        return _AFTER_VALUE if self._stack else _DONE
+
+    def _start_value(self, ch: str) -> bool:
+        if not self._started:
+            self._started = True
+            if self.require_object and ch != "{":
+                return False
+        if ch == "{":
+            self._stack.append("{")
+            self._state = _KEY_OR_END
+        elif ch == "[":
+            self._stack.append("[")
+            self._state = _VALUE_OR_END
+        elif ch == '"':
+            self._state = _STRING
+            self._string_is_key = False
+        elif ch == "-" or ch in _DIGITS:
+            self._state = _NUMBER
+            self._number = _N_START
+            self._number_char(ch)
+        elif ch in _LITERALS:
+            self._state = _LITERAL
+            self._literal = _LITERALS[ch]
+            self._literal_pos = 1
+        else:
+            return False
+        return True
+
+    def _number_char(self, ch: str) -> bool:
+        """Advance the number sub-state; False when ch cannot continue the number."""
+        s = self._number
+        if ch in _DIGITS:
+            if s in (_N_START, _N_MINUS):
+                s = _N_ZERO if ch == "0" else _N_INT
+            elif s == _N_ZERO:
+                return False  # no leading zeros
+            elif s == _N_DOT:
+                s = _N_FRAC
+            elif s in (_N_EXP, _N_EXP_SIGN):
+                s = _N_EXP_INT
+        elif ch == "-" and s == _N_START:
+            s = _N_MINUS
+        elif ch == "." and s in (_N_ZERO, _N_INT):
+            s = _N_DOT
+        elif ch in "eE" and s in (_N_ZERO, _N_INT, _N_FRAC):
+            s = _N_EXP
+        elif ch in "+-" and s == _N_EXP:
+            s = _N_EXP_SIGN
+        else:
+            return False
+        self._number = s
+        return True
+
+    def _unexpected(self, ch: str, expected: str) -> str:
+        if not self._stack and self._state == _VALUE and self.require_object:
+            return f"expected '{{' to start a JSON object, got {ch!r}"
+        return f"expected {expected}, got {ch!r}"
@@ -1,3 +1,4 @@
+import hashlib
 import json
 
 def safe_json_loads(text):
@@ -5,3 +6,13 @@ def safe_json_loads(text):
         return json.loads(text), None
     except Exception as e:
         return None, str(e)
+
+def canonical_json(obj) -> str:
+    """
+    Deterministic JSON encoding: sorted keys, no insignificant whitespace.
+    Equal values always encode to the same string, so the output is safe to hash.
+    """
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def sha256_hex(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,158 @@
+"""
+NDJSON export of the run ledger.
+
+Every row that belongs to a run is emitted as one line:
+
+    {"record": "<kind>", "data": {<column>: <value>, ...}}
+
+Records are emitted run first, then step runs, prompts, model calls, parsed outputs,
+compute attestations, compute artifacts and run events, each ordered deterministically. Queries
+use server-side cursors (yield_per), so memory stays flat regardless of artifact size.
+
+Payloads offloaded to the blob store are resolved (and hash-verified) back into their
+inline column; the row's *_sha256 / *_bytes columns are kept alongside.
+"""
+import datetime
+import json
+from typing import Iterator
+from uuid import UUID
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.core.blobstore import load_json, load_text
+from app.db import models
+
+LEDGER_YIELD_PER = 200
+_RUN_ID_PAGE = 1000
+
+
+# record -> (inline column, hash column, loader) for each payload that may be offloaded.
+_BLOB_FIELDS = {
+    "prompt_artifact": (
+        ("rendered_prompt", "rendered_prompt_sha256", load_text),
+        ("context", "context_sha256", load_json),
+    ),
+    "llm_call_artifact": (("response_json", "response_sha256", load_json),),
+    "parsed_output_artifact": (("output_text", "output_text_sha256", load_text),),
+}
+
+
+def _resolve_blob(record: str, row):
+    data = row
+    for column, sha_column, load in _BLOB_FIELDS[record]:
+        if row[sha_column] is None or row[column] is not None:
+            continue
+        if data is row:
+            data = dict(row)
+        data[column] = load(row[sha_column])
+    return data
+
+
+def _line(record: str, data) -> str:
+    return json.dumps({"record": record, "data": dict(data)}, default=str, separators=(",", ":")) + "\n"
+
+
+def _stream(db: Session, stmt, params=None):
+    return db.execute(stmt, params or {}, execution_options={"yield_per": LEDGER_YIELD_PER}).mappings()
+
+
+def iter_run_ledger(db: Session, run_id: UUID) -> Iterator[str]:
+    dag_runs = models.DagRun.__table__
+    step_runs = models.DagStepRun.__table__
+
+    for row in _stream(db, select(dag_runs).where(dag_runs.c.id == run_id)):
+        yield _line("dag_run", row)
+
+    for row in _stream(
+        db,
+        select(step_runs)
+        .where(step_runs.c.dag_run_id == run_id)
+        .order_by(step_runs.c.started_at, step_runs.c.id),
+    ):
+        yield _line("dag_step_run", row)
+
+    for record, model in (
+        ("prompt_artifact", models.PromptArtifact),
+        ("llm_call_artifact", models.LLMCallArtifact),
+        ("parsed_output_artifact", models.ParsedOutputArtifact),
+    ):
+        table = model.__table__
+        stmt = (
+            select(table)
+            .join(step_runs, step_runs.c.id == table.c.step_run_id)
+            .where(step_runs.c.dag_run_id == run_id)
+            .order_by(step_runs.c.started_at, table.c.step_run_id, table.c.id)
+        )
+        for row in _stream(db, stmt):
+            yield _line(record, _resolve_blob(record, row))
+
+    for row in _stream(
+        db,
+        text(
+            """
+            select ca.*
+            from compute_attestations ca
+            join dag_step_runs sr on sr.id = ca.step_run_id
+            where sr.dag_run_id = :run_id
+            order by ca.attested_at, ca.id
+            """
+        ),
+        {"run_id": run_id},
+    ):
+        yield _line("compute_attestation", row)
+
+    for row in _stream(
+        db,
+        text(
+            """
+            select cf.*
+            from compute_artifacts cf
+            join compute_attestations ca on ca.id = cf.attestation_id
+            join dag_step_runs sr on sr.id = ca.step_run_id
+            where sr.dag_run_id = :run_id
+            order by ca.attested_at, cf.attestation_id, cf.created_at, cf.id
+            """
+        ),
+        {"run_id": run_id},
+    ):
+        yield _line("compute_artifact", row)
+
+    run_events = models.RunEvent.__table__
+    for row in _stream(db, select(run_events).where(run_events.c.dag_run_id == run_id).order_by(run_events.c.id)):
+        yield _line("run_event", row)
+
+
+def iter_ledger_range(
+    db: Session,
+    created_after: datetime.datetime | None,
+    created_before: datetime.datetime | None,
+) -> Iterator[str]:
+    """
+    Ledgers of every run created in [created_after, created_before), oldest first.
+    Run ids are fetched in keyset pages so no cursor stays open across runs.
+    """
+    filters = []
+    if created_after is not None:
+        filters.append(models.DagRun.created_at >= created_after)
+    if created_before is not None:
+        filters.append(models.DagRun.created_at < created_before)
+
+    last = None
+    while True:
+        query = select(models.DagRun.created_at, models.DagRun.id).where(*filters)
+        if last is not None:
+            query = query.where(
+                (models.DagRun.created_at > last[0])
+                | ((models.DagRun.created_at == last[0]) & (models.DagRun.id > last[1]))
+            )
+        page = db.execute(
+            query.order_by(models.DagRun.created_at, models.DagRun.id).limit(_RUN_ID_PAGE)
+        ).all()
+        if not page:
+            return
+
+        for _, run_id in page:
+            yield from iter_run_ledger(db, run_id)
+
+        last = page[-1]
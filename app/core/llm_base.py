@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 
 class LLMClient(ABC):
@@ -11,5 +12,33 @@ class LLMClient(ABC):
                 "raw_text": str,           # the raw text from the LLM
                 "parsed_json": dict|None,  # dict if raw_text is JSON parsable, else None
             }
+            Clients should also report call metadata where they can: "provider", "model",
+            "request_json", "response_json", "usage" (provider token counts),
+            "latency_ms" (wall clock including connection wait), "connect_wait_ms",
+            "request_ms" and "parse_ms". llm_router fills provider, model and latency_ms
+            for clients that do not.
         """
         pass
+
+    async def acomplete(self, prompt: str) -> dict:
+        """
+        Async variant of complete() with the same return shape.
+
+        The default runs complete() on a worker thread. Clients with a native async
+        transport should override it so in-flight calls do not each hold a thread.
+        """
+        return await asyncio.to_thread(self.complete, prompt)
+
+    def complete_stream(self, prompt: str) -> dict:
+        """
+        complete() over a streamed response, used when LLM_STREAM is set. Same return
+        shape, plus "ttft_ms" and "tokens_per_sec" and, when the output stopped being
+        JSON part-way, "stream_abort" (see app.core.llm_stream).
+
+        The default is complete(): clients without a streaming transport still work.
+        """
+        return self.complete(prompt)
+
+    async def acomplete_stream(self, prompt: str) -> dict:
+        """Async variant of complete_stream(); the default runs it on a worker thread."""
+        return await asyncio.to_thread(self.complete_stream, prompt)
@@ -0,0 +1,145 @@
+"""
+Content-addressed cache of LLM responses.
+
+Entries are keyed by a step's input hash: the canonical encoding of the model and the
+exact rendered prompt. Only responses that passed execution policy are stored, so a
+cache hit can never turn a previously failing input into a success.
+"""
+import datetime
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.json_utils import canonical_json, sha256_hex
+from app.db import models
+
+# Result keys that describe the response itself; transport timings are per call.
+CACHED_RESULT_KEYS = ("raw_text", "parsed_json", "provider", "model", "response_json")
+
+_EVICT_EVERY_N_STORES = 100
+_stores_since_evict = 0
+_stores_lock = threading.Lock()
+
+
+def cache_enabled_globally() -> bool:
+    return os.getenv("LLM_CACHE_ENABLED", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def _ttl_seconds() -> int:
+    try:
+        return max(0, int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))))
+    except ValueError:
+        return 7 * 24 * 3600
+
+
+def _max_entries() -> int:
+    try:
+        return max(1, int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000")))
+    except ValueError:
+        return 100000
+
+
+def _now_utc() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def compute_input_hash(model: str, rendered_prompt: str) -> str:
+    return sha256_hex(canonical_json({"model": model, "rendered_prompt": rendered_prompt}))
+
+
+def cache_lookup(db: Session, input_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the cached llm result for input_hash, or None. Expired entries are misses.
+    The hit is recorded on the entry but not committed; it rides on the caller's commit.
+    """
+    entry = db.get(models.LLMResponseCacheEntry, input_hash)
+    if entry is None:
+        return None
+
+    ttl = _ttl_seconds()
+    now = _now_utc()
+    if ttl and entry.created_at < now - datetime.timedelta(seconds=ttl):
+        return None
+
+    db.execute(
+        update(models.LLMResponseCacheEntry)
+        .where(models.LLMResponseCacheEntry.input_hash == input_hash)
+        .values(
+            last_hit_at=now,
+            hit_count=models.LLMResponseCacheEntry.hit_count + 1,
+        )
+    )
+    return dict(entry.response)
+
+
+def cache_store(db: Session, input_hash: str, step_run_id, llm_result: Dict[str, Any]) -> None:
+    """
+    Write a cache entry in the caller's transaction. A live entry for the same hash is
+    left untouched (including one written concurrently by another worker): the first
+    policy-passing response wins. An expired one is replaced, so the input is a hit again
+    without waiting for an eviction pass.
+    """
+    global _stores_since_evict
+
+    entry = models.LLMResponseCacheEntry
+    now = _now_utc()
+    stmt = pg_insert(entry).values(
+        input_hash=input_hash,
+        response={k: llm_result.get(k) for k in CACHED_RESULT_KEYS},
+        source_step_run_id=step_run_id,
+        created_at=now,
+        hit_count=0,
+    )
+    ttl = _ttl_seconds()
+    if ttl:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["input_hash"],
+            set_={
+                "response": stmt.excluded.response,
+                "source_step_run_id": stmt.excluded.source_step_run_id,
+                "created_at": stmt.excluded.created_at,
+                "last_hit_at": None,
+                "hit_count": 0,
+            },
+            where=entry.created_at < now - datetime.timedelta(seconds=ttl),
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["input_hash"])
+    db.execute(stmt)
+
+    # Runner worker threads store concurrently.
+    with _stores_lock:
+        _stores_since_evict += 1
+        evict = _stores_since_evict >= _EVICT_EVERY_N_STORES
+        if evict:
+            _stores_since_evict = 0
+    if evict:
+        evict_llm_cache(db)
+
+
+def evict_llm_cache(db: Session) -> None:
+    """
+    Drop expired entries, then the least recently used entries beyond
+    LLM_CACHE_MAX_ENTRIES, where an entry was last used when it was last hit or, if
+    never hit, when it was stored. Runs in the caller's transaction.
+    """
+    entry = models.LLMResponseCacheEntry
+
+    ttl = _ttl_seconds()
+    if ttl:
+        db.execute(
+            delete(entry)
+            .where(entry.created_at < _now_utc() - datetime.timedelta(seconds=ttl))
+            .execution_options(synchronize_session=False)
+        )
+
+    overflow = (
+        select(entry.input_hash)
+        .order_by(func.coalesce(entry.last_hit_at, entry.created_at).desc())
+        .offset(_max_entries())
+    )
+    db.execute(delete(entry).where(entry.input_hash.in_(overflow)).execution_options(synchronize_session=False))
@@ -0,0 +1,336 @@
+"""
+Multiple provider endpoints behind one LLMClient.
+
+LLM_ROUTER_CONFIG lists OpenAI-compatible endpoints (gateways, API keys with separate
+rate limits) that serve one model:
+
+    {
+      "model": "gpt-4o-mini",
+      "endpoints": [
+        {"name": "primary", "base_url": "https://api.openai.com/v1", "api_key_env": "OPENAI_KEY_A",
+         "weight": 2, "max_inflight": 20},
+        {"name": "gateway", "base_url": "https://llm-gw.internal/v1", "api_key_env": "GW_KEY",
+         "model": "gpt-4o-mini-2024-07-18", "max_inflight": 8}
+      ]
+    }
+
+The value is the JSON itself or a path to a file holding it. api_key_env names the
+variable with the key (api_key may hold it inline instead); model on an endpoint is
+the provider-side name when it differs. Cache keys use the top-level model, so a
+response cached from one endpoint is served for all of them.
+
+Each call goes to the least-loaded endpoint: the lowest in-flight count relative to
+weight, among endpoints under their max_inflight. Ties, as when the pool is idle, go
+by smooth weighted round robin, so light traffic is split by weight too. When all are
+full, callers wait for a slot. LLM_ENDPOINT_EJECT_AFTER consecutive failures (a
+transport error, an exception, HTTP 429 or 5xx) eject an endpoint for
+LLM_ENDPOINT_EJECT_SECONDS. Once that has passed it takes calls again, and one more
+failure ejects it again. If every endpoint is ejected, the one due back first still
+serves, so calls degrade to that endpoint's errors rather than stopping. An exception
+from an endpoint's client is returned as an error result, in the shape of the client's
+own transport errors, so it fails the step rather than the run. The serving endpoint's
+name is returned as "endpoint" and stored on the LLM call artifact.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.core.llm_base import LLMClient
+from app.core.llm_openai_compat import OpenAICompatLLMClient
+from app.core.metrics import LLM_ENDPOINT_EJECTIONS, LLM_ENDPOINT_INFLIGHT
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class EndpointConfig:
+    name: str
+    base_url: str
+    api_key: str
+    model: str
+    weight: float = 1.0
+    max_inflight: int = 10
+
+
+def parse_router_config(raw: str) -> Tuple[str, List[EndpointConfig]]:
+    """
+    (model, endpoints) from LLM_ROUTER_CONFIG: inline JSON or a file path. Raises
+    ValueError on anything malformed, naming the offending endpoint.
+    """
+    text = raw.strip()
+    if not text.startswith("{"):
+        with open(text, encoding="utf-8") as f:
+            text = f.read()
+    try:
+        config = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"LLM_ROUTER_CONFIG is not valid JSON: {e}") from e
+    if not isinstance(config, dict) or not isinstance(config.get("endpoints"), list) or not config["endpoints"]:
+        raise ValueError("LLM_ROUTER_CONFIG must be an object with a non-empty 'endpoints' list")
+
+    model = config.get("model") or os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+    endpoints: List[EndpointConfig] = []
+    for i, entry in enumerate(config["endpoints"]):
+        if not isinstance(entry, dict):
+            raise ValueError(f"endpoint {i}: must be an object")
+        name = entry.get("name") or f"endpoint-{i}"
+        if any(e.name == name for e in endpoints):
+            raise ValueError(f"endpoint {name!r}: duplicate name")
+        api_key = entry.get("api_key") or (os.getenv(entry["api_key_env"]) if entry.get("api_key_env") else None)
+        if not api_key:
+            raise ValueError(f"endpoint {name!r}: no API key (set api_key_env to a variable holding it)")
+        if not entry.get("base_url"):
+            raise ValueError(f"endpoint {name!r}: base_url is required")
+        try:
+            weight = float(entry.get("weight", 1.0))
+            max_inflight = int(entry.get("max_inflight", 10))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"endpoint {name!r}: weight and max_inflight must be numbers") from e
+        if weight <= 0 or max_inflight < 1:
+            raise ValueError(f"endpoint {name!r}: weight must be positive and max_inflight at least 1")
+        endpoints.append(
+            EndpointConfig(
+                name=name,
+                base_url=entry["base_url"].rstrip("/"),
+                api_key=api_key,
+                model=entry.get("model") or model,
+                weight=weight,
+                max_inflight=max_inflight,
+            )
+        )
+    return model, endpoints
+
+
+class _Endpoint:
+    def __init__(self, config: EndpointConfig, client: LLMClient):
+        self.config = config
+        self.client = client
+        self.inflight = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0  # time.monotonic()
+        self.current_weight = 0.0  # smooth weighted round robin credit
+        self.inflight_gauge = LLM_ENDPOINT_INFLIGHT.labels(config.name)
+
+    def load(self) -> float:
+        return self.inflight / self.config.weight
+
+
+def _is_failure(result: Dict[str, Any]) -> bool:
+    if result.get("error") is not None:
+        return True  # transport error: no HTTP status
+    status = result.get("http_status")
+    return status is not None and (status == 429 or status >= 500)
+
+
+def _exception_result(ep: _Endpoint, error: Exception, request_started: float) -> Dict[str, Any]:
+    message = f"{type(error).__name__}: {error}"
+    request_ms = int((time.perf_counter() - request_started) * 1000)
+    return {
+        "raw_text": json.dumps({"error": {"message": message, "type": "endpoint_error"}}),
+        "parsed_json": None,
+        "provider": "openai",
+        "model": ep.config.model,
+        "response_json": None,
+        "usage": None,
+        "error": message,
+        "request_json": None,
+        "http_status": None,
+        "connect_wait_ms": 0,
+        "request_ms": request_ms,
+        "latency_ms": request_ms,
+    }
+
+
+class EndpointPool(LLMClient):
+    """
+    Shared by runner worker threads and the async runner's event loop alike; endpoint
+    state is guarded by one lock. Each endpoint's client is sized to its max_inflight,
+    so a call never queues twice.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        endpoints: List[EndpointConfig],
+        client_factory: Callable[[EndpointConfig], LLMClient] | None = None,
+    ):
+        if not endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        factory = client_factory or (
+            lambda c: OpenAICompatLLMClient(
+                base_url=c.base_url, api_key=c.api_key, model=c.model, pool_maxsize=c.max_inflight
+            )
+        )
+        self.model = model
+        self.eject_after = _env_int("LLM_ENDPOINT_EJECT_AFTER", 3)
+        self.eject_seconds = _env_float("LLM_ENDPOINT_EJECT_SECONDS", 30.0)
+        self._endpoints = [_Endpoint(c, factory(c)) for c in endpoints]
+        self._cond = threading.Condition()
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    @classmethod
+    def from_env(cls) -> "EndpointPool":
+        model, endpoints = parse_router_config(os.environ["LLM_ROUTER_CONFIG"])
+        return cls(model, endpoints)
+
+    def close(self) -> None:
+        for ep in self._endpoints:
+            close = getattr(ep.client, "close", None)
+            if close is not None:
+                close()
+
+    async def aclose(self) -> None:
+        for ep in self._endpoints:
+            aclose = getattr(ep.client, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def endpoint_states(self) -> List[Dict[str, Any]]:
+        """A snapshot for diagnostics."""
+        now = time.monotonic()
+        with self._cond:
+            return [
+                {
+                    "name": ep.config.name,
+                    "inflight": ep.inflight,
+                    "max_inflight": ep.config.max_inflight,
+                    "weight": ep.config.weight,
+                    "consecutive_failures": ep.consecutive_failures,
+                    "ejected_for_seconds": round(max(0.0, ep.ejected_until - now), 3),
+                }
+                for ep in self._endpoints
+            ]
+
+    def _pick(self) -> _Endpoint | None:
+        """The least-loaded endpoint with a free slot; call with the lock held."""
+        now = time.monotonic()
+        free = [ep for ep in self._endpoints if ep.inflight < ep.config.max_inflight]
+        if not free:
+            return None
+        healthy = [ep for ep in free if ep.ejected_until <= now]
+        if healthy:
+            least = min(ep.load() for ep in healthy)
+            chosen = _weighted_round_robin([ep for ep in healthy if ep.load() == least])
+        elif any(ep.ejected_until <= now for ep in self._endpoints):
+            return None  # a healthy endpoint is only full; wait for it
+        else:
+            chosen = min(free, key=lambda ep: ep.ejected_until)
+        chosen.inflight += 1
+        chosen.inflight_gauge.inc()
+        return chosen
+
+    def _acquire(self) -> _Endpoint:
+        with self._cond:
+            while True:
+                ep = self._pick()
+                if ep is not None:
+                    return ep
+                self._cond.wait()
+
+    async def _aacquire(self) -> _Endpoint:
+        while True:
+            with self._cond:
+                ep = self._pick()
+                if ep is not None:
+                    return ep
+                loop = asyncio.get_running_loop()
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def _release(self, ep: _Endpoint, failed: bool) -> None:
+        with self._cond:
+            ep.inflight -= 1
+            ep.inflight_gauge.dec()
+            if not failed:
+                ep.consecutive_failures = 0
+            else:
+                ep.consecutive_failures += 1
+                if ep.consecutive_failures >= self.eject_after:
+                    ep.ejected_until = time.monotonic() + self.eject_seconds
+                    LLM_ENDPOINT_EJECTIONS.labels(ep.config.name).inc()
+            self._cond.notify_all()
+            # Waiters retry the pick; the ones that lose wait again.
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    @staticmethod
+    def _annotate(result: Dict[str, Any], ep: _Endpoint, wait_ms: float) -> Dict[str, Any]:
+        result["endpoint"] = ep.config.name
+        # Waiting for an endpoint slot is connection wait, as in the client's own pool.
+        result["connect_wait_ms"] = int(wait_ms) + (result.get("connect_wait_ms") or 0)
+        if result.get("latency_ms") is not None:
+            result["latency_ms"] += int(wait_ms)
+        return result
+
+    def _call(self, method: str, prompt: str) -> dict:
+        wait_started = time.perf_counter()
+        ep = self._acquire()
+        wait_ms = (time.perf_counter() - wait_started) * 1000
+        request_started = time.perf_counter()
+        try:
+            result = getattr(ep.client, method)(prompt)
+        except Exception as e:
+            result = _exception_result(ep, e, request_started)
+        self._release(ep, failed=_is_failure(result))
+        return self._annotate(result, ep, wait_ms)
+
+    async def _acall(self, method: str, prompt: str) -> dict:
+        wait_started = time.perf_counter()
+        ep = await self._aacquire()
+        wait_ms = (time.perf_counter() - wait_started) * 1000
+        request_started = time.perf_counter()
+        try:
+            result = await getattr(ep.client, method)(prompt)
+        except asyncio.CancelledError:
+            self._release(ep, failed=False)  # not the endpoint's fault, but the slot must come back
+            raise
+        except Exception as e:
+            result = _exception_result(ep, e, request_started)
+        self._release(ep, failed=_is_failure(result))
+        return self._annotate(result, ep, wait_ms)
+
+    def complete(self, prompt: str) -> dict:
+        return self._call("complete", prompt)
+
+    def complete_stream(self, prompt: str) -> dict:
+        return self._call("complete_stream", prompt)
+
+    async def acomplete(self, prompt: str) -> dict:
+        return await self._acall("acomplete", prompt)
+
+    async def acomplete_stream(self, prompt: str) -> dict:
+        return await self._acall("acomplete_stream", prompt)
+
+
+def _weighted_round_robin(candidates: List[_Endpoint]) -> _Endpoint:
+    """nginx's smooth weighted round robin: picks in proportion to weight, interleaved."""
+    total = 0.0
+    for ep in candidates:
+        ep.current_weight += ep.config.weight
+        total += ep.config.weight
+    chosen = max(candidates, key=lambda ep: ep.current_weight)
+    chosen.current_weight -= total
+    return chosen
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
@@ -1,36 +1,283 @@
+import asyncio
 import os
+import threading
+import time
+import httpx
 import requests
 import json
+from requests.adapters import HTTPAdapter
+from app.core.json_utils import sha256_hex
 from app.core.llm_base import LLMClient
+from app.core.llm_stream import CompletionStream
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
 
 class OpenAICompatLLMClient(LLMClient):
-    def __init__(self):
-        self.base_url = os.getenv("LLM_BASE_URL", "https://api.openai.com/v1")
-        self.api_key = os.getenv("LLM_API_KEY")
-        self.model = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+    """
+    OpenAI-compatible chat completions client.
+
+    One client owns one requests.Session with a keep-alive connection pool, so steps
+    reuse TCP/TLS connections instead of paying a handshake per call. The client is
+    shared by runner worker threads: at most LLM_POOL_MAXSIZE requests are in flight,
+    and any further caller waits for a free connection slot.
+
+    acomplete() uses a separate httpx.AsyncClient, created lazily on the event loop
+    that first uses it, with LLM_ASYNC_POOL_MAXSIZE keep-alive connections.
+
+    Transport failures (connect or read timeouts, resets) are returned, not raised, in
+    the shape of an HTTP error: unparsed raw_text, parsed_json None, http_status None
+    and "error" naming the exception, so execution policy fails the step.
+
+    complete_stream() and acomplete_stream() request an SSE stream and close it as soon
+    as the output can no longer be a JSON object (see app.core.llm_stream). A closed
+    connection is not returned to the pool; the next call opens a new one.
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        model: str | None = None,
+        pool_maxsize: int | None = None,
+    ):
+        """Arguments override LLM_BASE_URL, LLM_API_KEY, LLM_MODEL and both pool sizes."""
+        self.base_url = base_url or os.getenv("LLM_BASE_URL", "https://api.openai.com/v1")
+        self.api_key = api_key or os.getenv("LLM_API_KEY")
+        self.model = model or os.getenv("LLM_MODEL", "gpt-3.5-turbo")
         if not self.api_key:
             raise RuntimeError("LLM_API_KEY is required for OpenAI-compatible LLM provider.")
 
-    def complete(self, prompt: str) -> dict:
-        url = f"{self.base_url}/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        payload = {
+        self.timeout = (
+            _env_float("LLM_CONNECT_TIMEOUT_SECONDS", 5.0),
+            _env_float("LLM_READ_TIMEOUT_SECONDS", 120.0),
+        )
+        # An explicit pool size bounds the async pool too: it is the endpoint's concurrency limit.
+        async_pool_maxsize = pool_maxsize or _env_int("LLM_ASYNC_POOL_MAXSIZE", 100)
+        pool_maxsize = pool_maxsize or _env_int("LLM_POOL_MAXSIZE", 10)
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, pool_block=True, max_retries=0)
+        self._session = requests.Session()
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers.update(
+            {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            }
+        )
+        # Mirrors the pool size so time spent waiting for a connection is measurable.
+        self._slots = threading.BoundedSemaphore(pool_maxsize)
+
+        self._async_pool_maxsize = async_pool_maxsize
+        self._async_client: httpx.AsyncClient | None = None
+        self._async_slots: asyncio.Semaphore | None = None
+
+    def close(self) -> None:
+        self._session.close()
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_slots = None
+
+    def _payload(self, prompt: str) -> dict:
+        return {
             "model": self.model,
             "messages": [
                 {"role": "user", "content": prompt}
             ],
             "response_format": {"type": "json_object"}
         }
-        response = requests.post(url, headers=headers, json=payload)
+
+    def _stream_payload(self, prompt: str) -> dict:
+        payload = self._payload(prompt)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            connect_timeout, read_timeout = self.timeout
+            self._async_client = httpx.AsyncClient(
+                headers=dict(self._session.headers),
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self._async_pool_maxsize,
+                    max_keepalive_connections=self._async_pool_maxsize,
+                ),
+            )
+            self._async_slots = asyncio.Semaphore(self._async_pool_maxsize)
+        return self._async_client
+
+    @staticmethod
+    def _request_record(payload: dict) -> dict:
+        """
+        The request as sent, minus message bodies: the prompt is already stored as the
+        step's PromptArtifact, so only its hash and length are kept here.
+        """
+        record = dict(payload)
+        record["messages"] = [
+            {
+                "role": m["role"],
+                "content_sha256": sha256_hex(m["content"]),
+                "content_chars": len(m["content"]),
+            }
+            for m in payload["messages"]
+        ]
+        return record
+
+    def _result(self, response_json, response_text: str) -> dict:
+        try:
+            body = response_json()
+        except Exception:
+            body = None
         try:
-            raw_text = response.json()["choices"][0]["message"]["content"]
+            raw_text = body["choices"][0]["message"]["content"]
         except Exception:
-            raw_text = response.text
+            raw_text = response_text
+        parse_started = time.perf_counter()
         try:
             parsed_json = json.loads(raw_text)
         except Exception:
             parsed_json = None
-        return {"raw_text": raw_text, "parsed_json": parsed_json}
+        parse_ms = (time.perf_counter() - parse_started) * 1000
+        return {
+            "raw_text": raw_text,
+            "parsed_json": parsed_json,
+            "provider": "openai",
+            "model": body.get("model", self.model) if isinstance(body, dict) else self.model,
+            "response_json": body if isinstance(body, dict) else None,
+            "usage": body.get("usage") if isinstance(body, dict) else None,
+            "parse_ms": parse_ms,
+        }
+
+    def _error_result(self, error: Exception, payload, wait_started, request_started) -> dict:
+        message = f"{type(error).__name__}: {error}"
+        result = {
+            "raw_text": json.dumps({"error": {"message": message, "type": "transport_error"}}),
+            "parsed_json": None,
+            "provider": "openai",
+            "model": self.model,
+            "response_json": None,
+            "usage": None,
+            "error": message,
+        }
+        return self._with_timings(result, payload, None, wait_started, request_started, time.perf_counter())
+
+    def complete(self, prompt: str) -> dict:
+        url = f"{self.base_url}/chat/completions"
+        payload = self._payload(prompt)
+
+        wait_started = time.perf_counter()
+        with self._slots:
+            request_started = time.perf_counter()
+            try:
+                response = self._session.post(url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                return self._error_result(e, payload, wait_started, request_started)
+            request_finished = time.perf_counter()
+
+        return self._timed_result(response, payload, wait_started, request_started, request_finished)
+
+    def _timed_result(self, response, payload, wait_started, request_started, request_finished) -> dict:
+        result = self._result(response.json, response.text)
+        return self._with_timings(result, payload, response.status_code, wait_started, request_started, request_finished)
+
+    def _with_timings(self, result, payload, http_status, wait_started, request_started, request_finished) -> dict:
+        result["request_json"] = self._request_record(payload)
+        result["http_status"] = http_status
+        result["connect_wait_ms"] = int((request_started - wait_started) * 1000)
+        result["request_ms"] = int((request_finished - request_started) * 1000)
+        result["latency_ms"] = int((request_finished - wait_started) * 1000)
+        return result
+
+    async def acomplete(self, prompt: str) -> dict:
+        url = f"{self.base_url}/chat/completions"
+        payload = self._payload(prompt)
+        client = self._get_async_client()
+
+        wait_started = time.perf_counter()
+        async with self._async_slots:
+            request_started = time.perf_counter()
+            try:
+                response = await client.post(url, json=payload)
+            except httpx.HTTPError as e:
+                return self._error_result(e, payload, wait_started, request_started)
+            request_finished = time.perf_counter()
+
+        return self._timed_result(response, payload, wait_started, request_started, request_finished)
+
+    def _stream_result(self, stream: CompletionStream, payload, wait_started, request_started, request_finished) -> dict:
+        result = stream.result()
+        result["provider"] = "openai"
+        result["model"] = stream.model or self.model
+        return self._with_timings(result, payload, 200, wait_started, request_started, request_finished)
+
+    def complete_stream(self, prompt: str) -> dict:
+        url = f"{self.base_url}/chat/completions"
+        payload = self._stream_payload(prompt)
+
+        wait_started = time.perf_counter()
+        with self._slots:
+            request_started = time.perf_counter()
+            try:
+                response = self._session.post(url, json=payload, timeout=self.timeout, stream=True)
+            except requests.RequestException as e:
+                return self._error_result(e, payload, wait_started, request_started)
+            try:
+                if response.status_code != 200:
+                    # An error body is not a stream; read it whole and report it as complete() would.
+                    response.content
+                    request_finished = time.perf_counter()
+                    return self._timed_result(response, payload, wait_started, request_started, request_finished)
+                stream = CompletionStream(request_started)
+                for line in response.iter_lines():
+                    if not stream.add_line(line.decode("utf-8")):
+                        break
+            except requests.RequestException as e:
+                # Dropped mid-stream: the partial output is not kept.
+                return self._error_result(e, payload, wait_started, request_started)
+            finally:
+                # On abort this drops the connection, which stops generation upstream.
+                response.close()
+            request_finished = time.perf_counter()
+
+        return self._stream_result(stream, payload, wait_started, request_started, request_finished)
+
+    async def acomplete_stream(self, prompt: str) -> dict:
+        url = f"{self.base_url}/chat/completions"
+        payload = self._stream_payload(prompt)
+        client = self._get_async_client()
+
+        wait_started = time.perf_counter()
+        async with self._async_slots:
+            request_started = time.perf_counter()
+            try:
+                async with client.stream("POST", url, json=payload) as response:
+                    if response.status_code != 200:
+                        await response.aread()
+                        request_finished = time.perf_counter()
+                        return self._timed_result(response, payload, wait_started, request_started, request_finished)
+                    stream = CompletionStream(request_started)
+                    async for line in response.aiter_lines():
+                        if not stream.add_line(line):
+                            break
+            except httpx.HTTPError as e:
+                return self._error_result(e, payload, wait_started, request_started)
+            request_finished = time.perf_counter()
+
+        return self._stream_result(stream, payload, wait_started, request_started, request_finished)
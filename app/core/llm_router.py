@@ -1,6 +1,8 @@
 import os
-from app.core.stub_llm import stub_llm
+import time
+from app.core.stub_llm import StubLLMClient, StubProfile, astub_llm, stub_llm
 from app.core.llm_openai_compat import OpenAICompatLLMClient
+from app.core.llm_endpoints import EndpointPool
 from app.core.llm_base import LLMClient
 
 _llm_client = None
@@ -10,20 +12,79 @@ provider = os.getenv("LLM_PROVIDER", "stub").lower()
 
 if provider == "openai":
     try:
-        _llm_client = OpenAICompatLLMClient()
+        # LLM_ROUTER_CONFIG spreads calls over several endpoints; otherwise LLM_BASE_URL alone.
+        _llm_client = EndpointPool.from_env() if os.getenv("LLM_ROUTER_CONFIG") else OpenAICompatLLMClient()
     except Exception as e:
         _llm_client = None
         # Fallback will be stub_llm below
+elif provider == "stub":
+    # STUB_LLM_* settings turn the instant stub into a latency/failure simulator.
+    _stub_profile = StubProfile.from_env()
+    if not _stub_profile.is_default():
+        _llm_client = StubLLMClient(_stub_profile)
+
+def set_llm_client(client: LLMClient | None, provider_name: str | None = None) -> LLMClient | None:
+    """
+    Replace the process-wide client (None selects the built-in stub). Returns the
+    previous client. For benchmarks and tooling; the service configures itself from
+    LLM_PROVIDER at import.
+    """
+    global _llm_client, provider
+    previous = _llm_client
+    _llm_client = client
+    if provider_name is not None:
+        provider = provider_name
+    return previous
+
+def llm_model_name() -> str:
+    """
+    Identifies the model that will answer llm_complete, for cache keys and artifacts.
+    """
+    if _llm_client:
+        return f"{provider}:{_llm_client.model}"
+    return "stub"
+
+def llm_stream_enabled() -> bool:
+    """
+    LLM_STREAM=1 makes calls use the client's streaming transport, which records time
+    to first token and aborts as soon as the output can no longer be JSON.
+    """
+    return os.getenv("LLM_STREAM", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+def _with_call_metadata(result: dict, started: float) -> dict:
+    """
+    Every call records who answered it and how long it took, whatever the client
+    reports itself.
+    """
+    result.setdefault("provider", provider if _llm_client else "stub")
+    result.setdefault("model", _llm_client.model if _llm_client else "stub")
+    result.setdefault("latency_ms", int((time.perf_counter() - started) * 1000))
+    return result
 
 # Wrapper. Accepts prompt:str, returns dict as LLMClient.complete.
 def llm_complete(prompt: str) -> dict:
     global _llm_client
+    started = time.perf_counter()
     if _llm_client:
-        return _llm_client.complete(prompt)
+        call = _llm_client.complete_stream if llm_stream_enabled() else _llm_client.complete
+        return _with_call_metadata(call(prompt), started)
     # Default deterministic stub
     raw = stub_llm(prompt)
     # Compose into LLMClient interface output:
-    return {
+    return _with_call_metadata({
+        "raw_text": str(raw),
+        "parsed_json": raw
+    }, started)
+
+
+# Async wrapper with the same contract as llm_complete.
+async def allm_complete(prompt: str) -> dict:
+    started = time.perf_counter()
+    if _llm_client:
+        call = _llm_client.acomplete_stream if llm_stream_enabled() else _llm_client.acomplete
+        return _with_call_metadata(await call(prompt), started)
+    raw = await astub_llm(prompt)
+    return _with_call_metadata({
         "raw_text": str(raw),
         "parsed_json": raw
-    }
+    }, started)
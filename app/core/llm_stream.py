@@ -0,0 +1,181 @@
+"""
+Streamed chat completions.
+
+CompletionStream accumulates the content deltas of an OpenAI-style SSE stream. It
+records time to first token and throughput, and feeds every delta to a
+JsonPrefixValidator. add() returns False at the first character that cannot be part of
+a JSON object. The caller then closes the response, so the provider stops generating
+and billing for the rest.
+
+An aborted stream produces a normal client result. raw_text is the partial text cut
+just after the offending character, parsed_json is None, and stream_abort and
+json_errors say why. Execution policy fails the step on stream_abort, and json_errors
+lands in the step's ParsedOutputArtifact.extraction_report.
+"""
+import json
+import time
+from typing import Any, Dict, List
+
+from app.core.json_stream import JsonPrefixValidator
+
+DONE = "[DONE]"
+
+
+class SseDecoder:
+    """
+    Server-sent events, one line at a time (without its line ending). line() returns
+    the data of an event when the blank line ending it arrives, else None. Comments and
+    fields other than data are ignored.
+    """
+
+    def __init__(self):
+        self._data: List[str] = []
+
+    def line(self, line: str) -> str | None:
+        if not line:
+            return self.flush()
+        if line.startswith(":"):
+            return None
+        name, _, value = line.partition(":")
+        if name == "data":
+            self._data.append(value[1:] if value.startswith(" ") else value)
+        return None
+
+    def flush(self) -> str | None:
+        """The data of an event left unterminated at end of stream, if any."""
+        if not self._data:
+            return None
+        data = "\n".join(self._data)
+        self._data = []
+        return data
+
+
+class CompletionStream:
+    """
+    Feed it the body with add_line() (or decoded chunks with add_event()) until that
+    returns False or the body ends, then take result(). started is the perf_counter()
+    reading when the request was sent; time to first token is measured from it.
+    """
+
+    def __init__(self, started: float | None = None):
+        self.started = time.perf_counter() if started is None else started
+        self.first_token_at: float | None = None
+        self.last_token_at: float | None = None
+        self.chunks = 0
+        self.model: str | None = None
+        self.usage: Dict[str, Any] | None = None
+        self.finish_reason: str | None = None
+        self.done = False
+        self._parts: List[str] = []
+        self._validator = JsonPrefixValidator()
+        self._sse = SseDecoder()
+
+    @property
+    def aborted(self) -> bool:
+        return self._validator.error is not None
+
+    def add(self, delta: str) -> bool:
+        """Append a content delta; False once the text can no longer be a JSON object."""
+        if not delta:
+            return not self.aborted
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.last_token_at = now
+        self.chunks += 1
+        self._parts.append(delta)
+        return self._validator.feed(delta)
+
+    def add_event(self, data: str) -> bool:
+        """
+        Apply one SSE data payload (a chat.completion.chunk). Payloads that are not
+        JSON are skipped; returns add()'s verdict for the content delta.
+        """
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            return True
+        if not isinstance(chunk, dict):
+            return True
+        self.model = chunk.get("model") or self.model
+        if chunk.get("usage"):
+            self.usage = chunk["usage"]
+        for choice in chunk.get("choices") or []:
+            if choice.get("index", 0) != 0:
+                continue
+            if choice.get("finish_reason"):
+                self.finish_reason = choice["finish_reason"]
+            delta = choice.get("delta") or {}
+            if not self.add(delta.get("content") or ""):
+                return False
+        return True
+
+    def add_line(self, line: str) -> bool:
+        """
+        Apply one line of the SSE body; False once the stream has sent [DONE] or the
+        output stopped being JSON, either way the caller should stop reading.
+        """
+        data = self._sse.line(line)
+        if data is None:
+            return True
+        if data == DONE:
+            self.done = True
+            return False
+        return self.add_event(data)
+
+    def _tokens_per_sec(self) -> float | None:
+        if self.first_token_at is None or self.last_token_at is None:
+            return None
+        seconds = self.last_token_at - self.first_token_at
+        if seconds <= 0:
+            return None
+        # Provider token counts when reported; otherwise chunks, about a token each.
+        tokens = (self.usage or {}).get("completion_tokens") or self.chunks
+        return round(tokens / seconds, 3)
+
+    def result(self) -> dict:
+        """The client result for what has been received so far."""
+        if not self.done and not self.aborted:
+            tail = self._sse.flush()
+            if tail is not None and tail != DONE:
+                self.add_event(tail)
+        raw_text = "".join(self._parts)
+        out: Dict[str, Any] = {
+            "usage": self.usage,
+            "ttft_ms": (
+                round((self.first_token_at - self.started) * 1000, 3) if self.first_token_at is not None else None
+            ),
+            "tokens_per_sec": self._tokens_per_sec(),
+        }
+
+        validator = self._validator
+        if validator.error is not None:
+            raw_text = raw_text[: validator.error_offset + 1]
+            out["parsed_json"] = None
+            out["parse_ms"] = 0.0
+            out["stream_abort"] = {"reason": validator.error, "offset": validator.error_offset}
+            out["json_errors"] = {"error": validator.error, "offset": validator.error_offset, "aborted": True}
+        else:
+            parse_started = time.perf_counter()
+            try:
+                out["parsed_json"] = json.loads(raw_text)
+            except ValueError:
+                out["parsed_json"] = None
+            out["parse_ms"] = (time.perf_counter() - parse_started) * 1000
+
+        out["raw_text"] = raw_text
+        # Stored as the call's response_json, in the shape of a non-streamed response.
+        out["response_json"] = {
+            "object": "chat.completion",
+            "model": self.model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": raw_text},
+                    "finish_reason": "aborted" if self.aborted else self.finish_reason,
+                }
+            ],
+            "usage": self.usage,
+            "stream": {"chunks": self.chunks, "aborted": self.aborted},
+        }
+        return out
@@ -0,0 +1,192 @@
+"""
+Prometheus metrics.
+
+Metrics live in the default prometheus_client registry of each process. The API serves
+them at GET /metrics; a worker serves its own on RUN_WORKER_METRICS_PORT. Recording is
+a lock-protected increment per event, cheap enough for the runner hot path.
+
+Cache hit rate is reckoning_llm_cache_lookups_total{result="hit"} over all lookups.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Runs and steps span milliseconds (cache hits) to many minutes (slow models).
+_LONG_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+_SHORT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+RUN_DURATION = Histogram(
+    "reckoning_run_duration_seconds",
+    "Time a runner spent advancing a run, by the status it left the run in.",
+    ["status"],
+    buckets=_LONG_BUCKETS,
+)
+STEP_DURATION = Histogram(
+    "reckoning_step_duration_seconds",
+    "Task step duration from RUNNING to its final status.",
+    ["status"],
+    buckets=_LONG_BUCKETS,
+)
+LLM_LATENCY = Histogram(
+    "reckoning_llm_call_duration_seconds",
+    "Wall-clock latency of model calls, including connection wait.",
+    ["provider", "model"],
+    buckets=_LONG_BUCKETS,
+)
+LLM_TTFT = Histogram(
+    "reckoning_llm_time_to_first_token_seconds",
+    "Time from sending a streamed model call to its first content token.",
+    ["provider", "model"],
+    buckets=_SHORT_BUCKETS,
+)
+LLM_STREAM_ABORTS = Counter(
+    "reckoning_llm_stream_aborts_total",
+    "Streamed model calls closed early because the output could no longer be JSON.",
+    ["provider", "model"],
+)
+LLM_ENDPOINT_INFLIGHT = Gauge(
+    "reckoning_llm_endpoint_inflight",
+    "Model calls in flight per LLM_ROUTER_CONFIG endpoint.",
+    ["endpoint"],
+)
+LLM_ENDPOINT_EJECTIONS = Counter(
+    "reckoning_llm_endpoint_ejections_total",
+    "Times an LLM_ROUTER_CONFIG endpoint was ejected after consecutive failures.",
+    ["endpoint"],
+)
+LLM_CACHE_LOOKUPS = Counter(
+    "reckoning_llm_cache_lookups_total",
+    "LLM response cache lookups by result.",
+    ["result"],
+)
+DB_COMMIT_DURATION = Histogram(
+    "reckoning_db_commit_duration_seconds",
+    "Session commit latency, including the flush it triggers.",
+    buckets=_SHORT_BUCKETS,
+)
+ACTIVE_RUNS = Gauge(
+    "reckoning_active_runs",
+    "Runs currently being advanced by this process.",
+)
+ATTESTATIONS = Counter(
+    "reckoning_compute_attestations_total",
+    "Compute attestations recorded, by outcome.",
+    ["outcome"],
+)
+ATTESTATION_WAIT = Histogram(
+    "reckoning_compute_attestation_wait_seconds",
+    "Time a compute step waited for its attestation.",
+    ["outcome"],
+    buckets=(60, 300, 900, 3600, 4 * 3600, 12 * 3600, 24 * 3600, 72 * 3600, 7 * 24 * 3600),
+)
+API_REQUEST_DURATION = Histogram(
+    "reckoning_api_request_duration_seconds",
+    "API request latency by route template.",
+    ["method", "route", "status"],
+    buckets=_SHORT_BUCKETS,
+)
+
+
+@contextmanager
+def track_run() -> Iterator[dict]:
+    """
+    Counts the run as active for the duration of the block and records its duration
+    under the status the caller stores in the yielded dict ("status").
+    """
+    outcome = {"status": "raised"}
+    started = time.perf_counter()
+    ACTIVE_RUNS.inc()
+    try:
+        yield outcome
+    finally:
+        ACTIVE_RUNS.dec()
+        RUN_DURATION.labels(outcome["status"]).observe(time.perf_counter() - started)
+
+
+def observe_llm_call(provider: str | None, model: str | None, latency_ms: float | None) -> None:
+    if latency_ms is not None:
+        LLM_LATENCY.labels(provider or "unknown", model or "unknown").observe(latency_ms / 1000)
+
+
+def observe_llm_stream(llm_result: dict) -> None:
+    """Time to first token and aborts of a streamed call; a no-op for other calls."""
+    labels = (llm_result.get("provider") or "unknown", llm_result.get("model") or "unknown")
+    if llm_result.get("ttft_ms") is not None:
+        LLM_TTFT.labels(*labels).observe(llm_result["ttft_ms"] / 1000)
+    if llm_result.get("stream_abort") is not None:
+        LLM_STREAM_ABORTS.labels(*labels).inc()
+
+
+_COMMIT_STARTED = "metrics_commit_started"
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session: Session) -> None:
+    session.info[_COMMIT_STARTED] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    started = session.info.pop(_COMMIT_STARTED, None)
+    if started is not None:
+        DB_COMMIT_DURATION.observe(time.perf_counter() - started)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_COMMIT_STARTED, None)
+
+
+class _QueueDepthCollector:
+    """Reads queue depth from the database at scrape time rather than tracking it."""
+
+    def collect(self):
+        from app.core.run_queue import queue_depth
+        from app.db.session import SessionLocal
+
+        family = GaugeMetricFamily("reckoning_run_queue_depth", "Runs waiting in the queue.")
+        db = SessionLocal()
+        try:
+            family.add_metric([], queue_depth(db))
+        except Exception:
+            return  # a scrape must not fail because the database is unavailable
+        finally:
+            db.close()
+        yield family
+
+
+_queue_collector_registered = False
+_queue_collector_lock = threading.Lock()
+
+
+def register_queue_depth_collector() -> None:
+    global _queue_collector_registered
+    with _queue_collector_lock:
+        if not _queue_collector_registered:
+            REGISTRY.register(_QueueDepthCollector())
+            _queue_collector_registered = True
+
+
+def render_latest() -> tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def start_worker_metrics_server() -> int | None:
+    """Serve /metrics from a worker process when RUN_WORKER_METRICS_PORT is set."""
+    from prometheus_client import start_http_server
+
+    try:
+        port = int(os.getenv("RUN_WORKER_METRICS_PORT", "0"))
+    except ValueError:
+        port = 0
+    if port <= 0:
+        return None
+    start_http_server(port)
+    return port
@@ -0,0 +1,213 @@
+"""
+Compiled manifest execution plans.
+
+A plan is an immutable, validated view of a manifest's steps: topological order,
+dependency levels, reverse dependencies, compute boundaries and a content hash.
+It is compiled when steps are written (so malformed graphs are rejected there) and
+cached in process keyed on that hash, so runs do not re-derive it.
+"""
+import heapq
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.chaining import validate_chaining
+from app.core.json_utils import canonical_json, sha256_hex
+from app.core.tokens import validate_token_budget
+from app.db import models
+
+PLAN_CACHE_MAX_ENTRIES = 256
+
+
+class PlanError(ValueError):
+    """The manifest's steps do not form a valid DAG."""
+
+
+@dataclass(frozen=True)
+class PlanStep:
+    id: UUID
+    step_key: str
+    task_id: UUID | None
+    depends_on: Tuple[str, ...]
+    chaining: Any
+    config: Any
+    order_index: int | None
+    step_type: str
+    compute_contract: Any
+
+
+@dataclass(frozen=True)
+class ManifestPlan:
+    manifest_id: UUID
+    content_hash: str
+    steps: Tuple[PlanStep, ...]               # topological order, order_index breaks ties
+    levels: Tuple[Tuple[PlanStep, ...], ...]  # each level depends only on earlier levels
+    dependents: Mapping[str, Tuple[str, ...]]
+    compute_step_keys: frozenset
+    step_by_key: Mapping[str, PlanStep]
+    step_by_id: Mapping[UUID, PlanStep]
+
+
+def _plan_step(raw: Mapping[str, Any]) -> PlanStep:
+    depends_on = raw.get("depends_on") or []
+    if not isinstance(depends_on, list) or any(not isinstance(d, str) for d in depends_on):
+        raise PlanError(f"step '{raw.get('step_key')}': depends_on must be a list of step keys")
+
+    return PlanStep(
+        id=raw["id"],
+        step_key=raw["step_key"],
+        task_id=raw.get("task_id"),
+        depends_on=tuple(depends_on),
+        chaining=raw.get("chaining"),
+        config=raw.get("config") or {},
+        order_index=raw.get("order_index"),
+        step_type=(raw.get("step_type") or "task").strip().lower(),
+        compute_contract=raw.get("compute_contract"),
+    )
+
+
+def compile_plan(manifest_id: UUID, raw_steps: Iterable[Mapping[str, Any]]) -> ManifestPlan:
+    """
+    Validate and compile steps (mappings with ManifestStep column names) into a plan.
+    Raises PlanError for duplicate keys, unknown or self dependencies, cycles,
+    chaining projections that do not match depends_on, and invalid token budgets.
+    """
+    steps = [_plan_step(raw) for raw in raw_steps]
+
+    position: Dict[str, int] = {}
+    for i, step in enumerate(steps):
+        if step.step_key in position:
+            raise PlanError(f"duplicate step_key '{step.step_key}'")
+        position[step.step_key] = i
+
+    dependents: Dict[str, List[str]] = {s.step_key: [] for s in steps}
+    for step in steps:
+        for dep in step.depends_on:
+            if dep == step.step_key:
+                raise PlanError(f"step '{step.step_key}' depends on itself")
+            if dep not in position:
+                raise PlanError(f"step '{step.step_key}' depends on unknown step '{dep}'")
+            dependents[dep].append(step.step_key)
+
+        step_errors = validate_chaining(step.step_key, step.chaining, step.depends_on)
+        step_errors += validate_token_budget(step.step_key, step.config)
+        if step_errors:
+            raise PlanError("; ".join(step_errors))
+
+    def sort_key(step: PlanStep):
+        return (step.order_index is None, step.order_index or 0, position[step.step_key])
+
+    # Kahn's algorithm; among ready steps the lowest order_index goes first, so a
+    # manifest whose order_index already respects its dependencies keeps that order.
+    remaining = {s.step_key: len(set(s.depends_on)) for s in steps}
+    by_key = {s.step_key: s for s in steps}
+    heap = [(sort_key(s), s.step_key) for s in steps if remaining[s.step_key] == 0]
+    heapq.heapify(heap)
+
+    ordered: List[PlanStep] = []
+    while heap:
+        _, key = heapq.heappop(heap)
+        ordered.append(by_key[key])
+        for child in dict.fromkeys(dependents[key]):
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                heapq.heappush(heap, (sort_key(by_key[child]), child))
+
+    if len(ordered) != len(steps):
+        cyclic = sorted(k for k, n in remaining.items() if n > 0)
+        raise PlanError(f"dependency cycle among steps: {', '.join(cyclic)}")
+
+    level_by_key: Dict[str, int] = {}
+    levels: List[List[PlanStep]] = []
+    for step in ordered:
+        level = 1 + max((level_by_key[d] for d in step.depends_on), default=-1)
+        level_by_key[step.step_key] = level
+        while len(levels) <= level:
+            levels.append([])
+        levels[level].append(step)
+
+    content_hash = sha256_hex(
+        canonical_json(
+            [
+                {
+                    "id": str(s.id),
+                    "step_key": s.step_key,
+                    "task_id": str(s.task_id) if s.task_id else None,
+                    "depends_on": list(s.depends_on),
+                    "chaining": s.chaining,
+                    "config": s.config,
+                    "order_index": s.order_index,
+                    "step_type": s.step_type,
+                    "compute_contract": s.compute_contract,
+                }
+                for s in ordered
+            ]
+        )
+    )
+
+    return ManifestPlan(
+        manifest_id=manifest_id,
+        content_hash=content_hash,
+        steps=tuple(ordered),
+        levels=tuple(tuple(level) for level in levels),
+        dependents={k: tuple(v) for k, v in dependents.items()},
+        compute_step_keys=frozenset(s.step_key for s in ordered if s.step_type == "compute"),
+        step_by_key={s.step_key: s for s in ordered},
+        step_by_id={s.id: s for s in ordered},
+    )
+
+
+_plan_cache: "OrderedDict[UUID, ManifestPlan]" = OrderedDict()
+_plan_cache_lock = threading.Lock()
+
+
+def cache_plan(plan: ManifestPlan) -> None:
+    with _plan_cache_lock:
+        _plan_cache[plan.manifest_id] = plan
+        _plan_cache.move_to_end(plan.manifest_id)
+        while len(_plan_cache) > PLAN_CACHE_MAX_ENTRIES:
+            _plan_cache.popitem(last=False)
+
+
+def get_plan(db: Session, manifest: models.Manifest) -> ManifestPlan:
+    """
+    Return the plan for a manifest, compiling it only when the cached plan's hash does
+    not match manifests.plan_hash (steps replaced, possibly by another process).
+    """
+    if manifest.plan_hash:
+        with _plan_cache_lock:
+            cached = _plan_cache.get(manifest.id)
+            if cached is not None and cached.content_hash == manifest.plan_hash:
+                _plan_cache.move_to_end(manifest.id)
+                return cached
+
+    steps = db.scalars(
+        select(models.ManifestStep)
+        .filter_by(manifest_id=manifest.id)
+        .order_by(models.ManifestStep.order_index)
+    ).all()
+    plan = compile_plan(manifest.id, (_step_columns(s) for s in steps))
+
+    # Only a plan that matches the stored hash is safe to serve to later runs.
+    if plan.content_hash == manifest.plan_hash:
+        cache_plan(plan)
+    return plan
+
+
+def _step_columns(step: models.ManifestStep) -> Dict[str, Any]:
+    return {
+        "id": step.id,
+        "step_key": step.step_key,
+        "task_id": step.task_id,
+        "depends_on": step.depends_on,
+        "chaining": step.chaining,
+        "config": step.config,
+        "order_index": step.order_index,
+        "step_type": step.step_type,
+        "compute_contract": step.compute_contract,
+    }
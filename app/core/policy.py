@@ -1,11 +1,37 @@
 from typing import Any, Tuple, Dict, Optional, List
 from app.core.decision_rationale import validate_decision_rationale
+from app.core.schema_validation import SchemaValidator
 
+# Schema violations beyond this many are counted in error_count but not listed.
+MAX_REPORTED_SCHEMA_ERRORS = 50
 
-def evaluate_policy(step: Any, output_json: Any, decision_rationale: Any) -> Tuple[str, Dict[str, Any]]:
+
+def evaluate_policy(
+    step: Any,
+    output_json: Any,
+    decision_rationale: Any,
+    output_validator: Optional[SchemaValidator] = None,
+    stream_abort: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, Dict[str, Any]]:
     """
     Returns ("PASS"|"FAIL") and a deterministic execution policy report.
+
+    output_validator is the compiled extract_schema of the step's task, if it has one;
+    output_json is only checked against it once it is a non-empty object.
+
+    stream_abort is set when a streamed completion was cut off because its output could
+    no longer be JSON. The step then fails on that alone: nothing was parsed, so the
+    other rules would only restate it.
     """
+    if stream_abort is not None:
+        violation = {
+            "rule": "output_is_json",
+            "outcome": "fail",
+            "detail": stream_abort.get("reason"),
+            "offset": stream_abort.get("offset"),
+        }
+        return "FAIL", {"outcome": "FAIL", "violations": [violation]}
+
     violations: List[Dict[str, Any]] = []
 
     ok_dr, dr_errors = validate_decision_rationale(decision_rationale)
@@ -16,8 +42,33 @@ def evaluate_policy(step: Any, output_json: Any, decision_rationale: Any) -> Tup
         violations.append({"rule": "output_json_is_object", "outcome": "fail", "detail": "output_json not a dict"})
     elif not output_json:
         violations.append({"rule": "output_json_non_empty", "outcome": "fail", "detail": "output_json empty"})
+    elif output_validator is not None:
+        violation = _schema_violation(output_validator, output_json)
+        if violation is not None:
+            violations.append(violation)
 
     if violations:
         return "FAIL", {"outcome": "FAIL", "violations": violations}
 
     return "PASS", {"outcome": "PASS", "violations": []}
+
+
+def _schema_violation(validator: SchemaValidator, output_json: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if validator.schema_error is not None:
+        return {
+            "rule": "extract_schema_valid",
+            "outcome": "fail",
+            "schema_hash": validator.schema_hash,
+            "detail": validator.schema_error,
+        }
+
+    errors = validator.validate(output_json)
+    if not errors:
+        return None
+    return {
+        "rule": "output_json_matches_schema",
+        "outcome": "fail",
+        "schema_hash": validator.schema_hash,
+        "error_count": len(errors),
+        "errors": errors[:MAX_REPORTED_SCHEMA_ERRORS],
+    }
@@ -0,0 +1,69 @@
+"""
+Prompt rendering.
+
+A task's prompt_template is plain text with `{{ name }}` placeholders. Each placeholder
+is replaced with the canonical JSON encoding (sorted keys, no insignificant whitespace)
+of the named value from the step's prompt payload, so the same inputs always render
+byte-for-byte the same prompt. `{{ input_json }}` is the whole payload.
+
+A template that uses none of PAYLOAD_PLACEHOLDERS is instructions only: on its own it
+would never show the model the step's inputs. complete_template appends PAYLOAD_SECTION
+to such a template (the default template's input and output-contract sections), both
+when a task is written and when a run loads it.
+
+Templates are compiled once into literal/placeholder segments and cached by their text,
+so each task version compiles once per process.
+"""
+import re
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+from app.core.json_utils import canonical_json
+
+PROMPT_PLACEHOLDERS = frozenset({"input_json", "step_key", "task_id", "config", "upstream_canonical", "run_params"})
+
+# Placeholders that carry the step's inputs; step_key and task_id only identify it.
+PAYLOAD_PLACEHOLDERS = frozenset({"input_json", "config", "upstream_canonical", "run_params"})
+
+PAYLOAD_SECTION = (
+    "INPUT_JSON:\n{{ input_json }}\n\n"
+    "Return STRICT JSON only with keys: decision_rationale, output_json."
+)
+
+DEFAULT_PROMPT_TEMPLATE = "Execute step.\n\n" + PAYLOAD_SECTION
+
+_PLACEHOLDER_RE = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+
+# Even indexes are literal text, odd indexes are placeholder names.
+CompiledTemplate = Tuple[str, ...]
+
+
+@lru_cache(maxsize=1024)
+def compile_template(template: str) -> CompiledTemplate:
+    """
+    Raises ValueError for placeholders outside PROMPT_PLACEHOLDERS.
+    """
+    parts = _PLACEHOLDER_RE.split(template)
+    unknown = sorted({name for name in parts[1::2] if name not in PROMPT_PLACEHOLDERS})
+    if unknown:
+        raise ValueError(f"prompt_template uses unknown placeholders: {', '.join(unknown)}")
+    return tuple(parts)
+
+
+def complete_template(template: str) -> str:
+    """template, followed by PAYLOAD_SECTION if it uses none of PAYLOAD_PLACEHOLDERS."""
+    if any(name in PAYLOAD_PLACEHOLDERS for name in _PLACEHOLDER_RE.findall(template)):
+        return template
+    return template.rstrip() + "\n\n" + PAYLOAD_SECTION
+
+
+def render_prompt(compiled: CompiledTemplate, prompt_payload: Dict[str, Any]) -> str:
+    out = []
+    for i, part in enumerate(compiled):
+        if i % 2 == 0:
+            out.append(part)
+        elif part == "input_json":
+            out.append(canonical_json(prompt_payload))
+        else:
+            out.append(canonical_json(prompt_payload.get(part)))
+    return "".join(out)
@@ -0,0 +1,173 @@
+"""
+Server-Sent Events stream over `run_events`.
+
+One listener thread per process holds the only LISTEN connection, on its own engine
+outside the application pool, and fans notifications out to the streams subscribed to
+each run. A stream is an async generator: between events it waits on the event loop,
+holding neither a database connection nor a threadpool thread, and it reads new rows
+with a short query on the shared engine when notified.
+
+A stream subscribes before its first read, so an event that commits while the backlog
+is replayed still wakes it. If the listener loses its connection it wakes every
+stream on reconnecting, so notifications missed meanwhile only cost a re-read.
+"""
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+from typing import AsyncIterator, Dict, List, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.core.events import RUN_EVENTS_CHANNEL, TERMINAL_RUN_STATUSES
+from app.db.session import engine
+
+logger = logging.getLogger("reckoning_machine.run_events")
+
+
+def _keepalive_seconds() -> float:
+    try:
+        return max(1.0, float(os.getenv("RUN_EVENTS_KEEPALIVE_SECONDS", "15")))
+    except ValueError:
+        return 15.0
+
+
+def _format_event(row) -> str:
+    data = {
+        "id": row.id,
+        "dag_run_id": str(row.dag_run_id),
+        "kind": row.kind,
+        "status": row.status,
+        "step_run_id": str(row.step_run_id) if row.step_run_id else None,
+        "manifest_step_id": str(row.manifest_step_id) if row.manifest_step_id else None,
+        "step_key": row.step_key,
+        "created_at": row.created_at.isoformat(),
+    }
+    return f"id: {row.id}\nevent: {row.kind}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+_Subscriber = Tuple[asyncio.AbstractEventLoop, asyncio.Event]
+
+
+class RunEventHub:
+    """
+    Fans `run_events` notifications out to subscribers by run id. The listener thread
+    starts with the first subscription and then runs for the life of the process.
+    """
+
+    def __init__(self, retry_seconds: float = 5.0):
+        self.retry_seconds = retry_seconds
+        self._subscribers: Dict[str, Set[_Subscriber]] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def subscribe(self, run_id: UUID) -> _Subscriber:
+        sub = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._subscribers.setdefault(str(run_id), set()).add(sub)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._listen, name="run-events-listener", daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, run_id: UUID, sub: _Subscriber) -> None:
+        with self._lock:
+            subs = self._subscribers.get(str(run_id))
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[str(run_id)]
+
+    def _wake(self, run_ids=None) -> None:
+        with self._lock:
+            if run_ids is None:
+                targets: List[_Subscriber] = [s for subs in self._subscribers.values() for s in subs]
+            else:
+                targets = [s for run_id in run_ids for s in self._subscribers.get(run_id, ())]
+        for loop, event in targets:
+            loop.call_soon_threadsafe(event.set)
+
+    def _listen(self) -> None:
+        listen_engine = create_engine(engine.url, poolclass=NullPool)
+        while True:
+            try:
+                with listen_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                    conn.exec_driver_sql(f"LISTEN {RUN_EVENTS_CHANNEL}")
+                    raw = conn.connection.dbapi_connection
+                    # Anything committed while there was no listener is re-read.
+                    self._wake()
+                    while True:
+                        readable, _, _ = select.select([raw], [], [], 60)
+                        if not readable:
+                            continue
+                        raw.poll()
+                        run_ids = {n.payload for n in raw.notifies}
+                        raw.notifies.clear()
+                        self._wake(run_ids)
+            except Exception:
+                logger.exception("run events listener lost its connection; retrying")
+                threading.Event().wait(self.retry_seconds)
+
+
+_hub = RunEventHub()
+
+
+def _run_status(run_id: UUID) -> str | None:
+    with engine.connect() as conn:
+        return conn.execute(text("select status from dag_runs where id = :run_id"), {"run_id": run_id}).scalar()
+
+
+def _fetch_events(run_id: UUID, after_id: int):
+    with engine.connect() as conn:
+        return conn.execute(
+            text(
+                """
+                select id, dag_run_id, kind, status, step_run_id, manifest_step_id, step_key, created_at
+                from run_events
+                where dag_run_id = :run_id and id > :after_id
+                order by id
+                """
+            ),
+            {"run_id": run_id, "after_id": after_id},
+        ).all()
+
+
+async def iter_run_event_stream(run_id: UUID, after_id: int) -> AsyncIterator[str]:
+    keepalive = _keepalive_seconds()
+    sub = _hub.subscribe(run_id)
+    _, notified = sub
+    try:
+        last_id = after_id
+        # Read before the first fetch: a run's final status commits with its terminal
+        # event, so a run already ended here has all its events visible to that fetch.
+        ended = await asyncio.to_thread(_run_status, run_id) in TERMINAL_RUN_STATUSES
+        while True:
+            # Cleared before the read: a notification that lands during it is kept.
+            notified.clear()
+            rows = await asyncio.to_thread(_fetch_events, run_id, last_id)
+
+            # The run had ended and nothing is left to send: the client resumed after the
+            # terminal event, or the run predates run_events. Nothing more will come.
+            if ended and not any(r.kind == "run" and r.status in TERMINAL_RUN_STATUSES for r in rows):
+                for row in rows:
+                    yield _format_event(row)
+                return
+
+            for row in rows:
+                yield _format_event(row)
+                last_id = row.id
+                if row.kind == "run" and row.status in TERMINAL_RUN_STATUSES:
+                    return
+
+            while True:
+                try:
+                    await asyncio.wait_for(notified.wait(), keepalive)
+                    break
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+    finally:
+        _hub.unsubscribe(run_id, sub)
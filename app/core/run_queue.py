@@ -0,0 +1,308 @@
+import datetime
+import logging
+import os
+import select as select_module
+import socket
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List
+from uuid import UUID
+
+from sqlalchemy import exists, func, insert, select, text, update
+from sqlalchemy.orm import Session
+
+from app.core.events import record_events_for_runs, record_queued_runs, record_run_events, run_event, step_event
+from app.db import models
+from app.db.session import engine
+
+logger = logging.getLogger("reckoning_machine.run_queue")
+
+RUN_RESUME_CHANNEL = "run_resume"
+
+
+def enqueue_run(
+    db: Session,
+    manifest_id: UUID,
+    initiated_by: str | None = None,
+    run_params: Dict[str, Any] | None = None,
+) -> UUID:
+    """
+    Record a DagRun in `queued` status. Nothing executes until a worker claims it.
+    """
+    run_id = uuid.uuid4()
+    db.add(
+        models.DagRun(
+            id=run_id,
+            manifest_id=manifest_id,
+            status="queued",
+            initiated_by=initiated_by,
+            run_params=run_params,
+        )
+    )
+    db.flush()
+    record_run_events(db, run_id, [run_event("queued")])
+    db.commit()
+    return run_id
+
+
+def enqueue_batch(
+    db: Session,
+    manifest_id: UUID,
+    run_params: List[Dict[str, Any]],
+    initiated_by: str | None = None,
+) -> tuple[UUID, List[UUID]]:
+    """
+    Record a RunBatch and one queued DagRun per run_params entry, with a single
+    multi-row INSERT each for runs and their `queued` events. Returns the batch id and
+    the run ids in run_params order. Workers then claim the runs like any other.
+    """
+    batch_id = uuid.uuid4()
+    run_ids = [uuid.uuid4() for _ in run_params]
+
+    db.add(models.RunBatch(id=batch_id, manifest_id=manifest_id, initiated_by=initiated_by, size=len(run_ids)))
+    db.flush()
+    db.execute(
+        insert(models.DagRun),
+        [
+            {
+                "id": run_id,
+                "manifest_id": manifest_id,
+                "status": "queued",
+                "initiated_by": initiated_by,
+                "run_params": params,
+                "batch_id": batch_id,
+            }
+            for run_id, params in zip(run_ids, run_params)
+        ],
+    )
+    record_queued_runs(db, run_ids)
+    db.commit()
+    return batch_id, run_ids
+
+
+def batch_progress(db: Session, batch_id: UUID) -> Dict[str, int]:
+    """Run counts of a batch by status."""
+    rows = db.execute(
+        select(models.DagRun.status, func.count())
+        .where(models.DagRun.batch_id == batch_id)
+        .group_by(models.DagRun.status)
+    ).all()
+    return {status: count for status, count in rows}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(1.0, float(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def run_lease_seconds() -> float:
+    """A claimed run whose worker has not heartbeat for this long is reclaimed."""
+    return _env_float("RUN_LEASE_SECONDS", 60.0)
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_next_run(db: Session, claimed_by: str | None = None) -> UUID | None:
+    """
+    Claim the oldest queued run, or return None when the queue is empty.
+
+    SKIP LOCKED lets any number of workers poll concurrently without claiming the same
+    run twice. The claim (queued -> running) is committed before execution starts, so a
+    run is owned by exactly one worker from that point on. The claim starts the
+    worker's lease (heartbeat_at), which the worker renews with heartbeat_runs; runs
+    whose lease expired are reclaimed first, in the same transaction.
+    """
+    reclaim_expired_runs(db)
+    dag_run = db.scalars(
+        select(models.DagRun)
+        .filter_by(status="queued")
+        .order_by(models.DagRun.created_at, models.DagRun.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).first()
+    if dag_run is None:
+        db.commit()  # any reclaims
+        return None
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    dag_run.status = "running"
+    dag_run.started_at = now
+    dag_run.claimed_by = claimed_by or worker_id()
+    dag_run.heartbeat_at = now
+    record_run_events(db, dag_run.id, [run_event("running")])
+    db.commit()
+    return dag_run.id
+
+
+def heartbeat_runs(db: Session, run_ids: Iterable[UUID], claimed_by: str | None = None) -> None:
+    """
+    Renew the lease on runs this worker is executing (only those still `running`),
+    recording the worker as their owner.
+    """
+    run_ids = list(run_ids)
+    if not run_ids:
+        return
+    db.execute(
+        update(models.DagRun)
+        .where(models.DagRun.id.in_(run_ids), models.DagRun.status == "running")
+        .values(heartbeat_at=func.now(), claimed_by=claimed_by or worker_id())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def reclaim_expired_runs(db: Session, limit: int = 100) -> int:
+    """
+    Recover runs whose worker died (SIGKILL, OOM, lost node), in the caller's
+    transaction: `running` runs with a heartbeat older than RUN_LEASE_SECONDS.
+
+    A run that recorded no step yet goes back to `queued` and is executed from the
+    start. One that did cannot be continued deterministically: its RUNNING steps are
+    failed ("worker lease expired") and the run ends in `error`, as when a worker
+    catches a crash itself. Runs executed inline by the API carry no lease.
+    """
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=run_lease_seconds())
+    runs = db.scalars(
+        select(models.DagRun)
+        .where(
+            models.DagRun.status == "running",
+            models.DagRun.heartbeat_at.is_not(None),
+            models.DagRun.heartbeat_at < cutoff,
+        )
+        .order_by(models.DagRun.heartbeat_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not runs:
+        return 0
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    run_ids = [r.id for r in runs]
+    started = set(
+        db.scalars(select(models.DagStepRun.dag_run_id).where(models.DagStepRun.dag_run_id.in_(run_ids)).distinct())
+    )
+    lost_steps = db.execute(
+        update(models.DagStepRun)
+        .where(models.DagStepRun.dag_run_id.in_(run_ids), models.DagStepRun.status == "RUNNING")
+        .values(status="FAIL", ended_at=now, error="worker lease expired")
+        .returning(models.DagStepRun.id, models.DagStepRun.dag_run_id, models.DagStepRun.manifest_step_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    events_by_run: Dict[UUID, List[Dict[str, Any]]] = {run_id: [] for run_id in run_ids}
+    for step_run_id, dag_run_id, manifest_step_id in lost_steps:
+        events_by_run[dag_run_id].append(step_event(step_run_id, manifest_step_id, None, "FAIL"))
+    for dag_run in runs:
+        logger.warning("reclaiming run %s: lease of %s expired", dag_run.id, dag_run.claimed_by)
+        dag_run.claimed_by = None
+        dag_run.heartbeat_at = None
+        if dag_run.id in started:
+            dag_run.status = "error"
+            dag_run.ended_at = now
+        else:
+            dag_run.status = "queued"
+            dag_run.started_at = None
+        events_by_run[dag_run.id].append(run_event(dag_run.status))
+    record_events_for_runs(db, events_by_run)
+    return len(runs)
+
+
+def queue_depth(db: Session) -> int:
+    return db.scalar(select(func.count()).select_from(models.DagRun).filter_by(status="queued")) or 0
+
+
+def auto_resume_enabled() -> bool:
+    return os.getenv("AUTO_RESUME_ON_ATTEST", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def request_resume(db: Session, dag_runs: Iterable[models.DagRun]) -> None:
+    """
+    Mark `waiting` runs for resumption by a worker, in the caller's transaction, and
+    wake idle workers when it commits. Requesting twice is harmless: the request is a
+    timestamp, cleared when the run resumes.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    requested = False
+    for dag_run in dag_runs:
+        if dag_run.status == "waiting":
+            dag_run.resume_requested_at = now
+            requested = True
+    if requested:
+        db.execute(text("select pg_notify(:channel, '')"), {"channel": RUN_RESUME_CHANNEL})
+
+
+def _resume_candidates():
+    still_blocked = exists().where(
+        models.DagStepRun.dag_run_id == models.DagRun.id,
+        models.DagStepRun.status == "WAITING_FOR_ATTESTATION",
+    )
+    return select(models.DagRun).where(
+        models.DagRun.status == "waiting",
+        models.DagRun.resume_requested_at.is_not(None),
+        ~still_blocked,
+    )
+
+
+def claim_resume_request(db: Session) -> UUID | None:
+    """
+    Lock the run with the oldest resume request that has no step left waiting for
+    attestation, or return None when there is none.
+
+    Unlike claim_next_run this does not commit: the row lock stays held until
+    resume_run, on the same session, commits the waiting -> running transition (and
+    clears the request). Other workers skip the locked row, and a manual resume blocks
+    on it and then finds the run no longer waiting, so each request resumes its run once.
+    """
+    dag_run = db.scalars(
+        _resume_candidates()
+        .order_by(models.DagRun.resume_requested_at, models.DagRun.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).first()
+    if dag_run is None:
+        db.rollback()
+        return None
+    return dag_run.id
+
+
+def drop_resume_request(db: Session, run_id: UUID) -> None:
+    """Clear a request that could not be honoured so it is not retried forever."""
+    db.rollback()
+    db.execute(
+        update(models.DagRun)
+        .where(models.DagRun.id == run_id, models.DagRun.status == "waiting")
+        .values(resume_requested_at=None)
+    )
+    db.commit()
+
+
+def pending_resumes(db: Session) -> int:
+    return db.scalar(select(func.count()).select_from(_resume_candidates().subquery())) or 0
+
+
+def listen_for_resume_requests(stop: threading.Event, wake: threading.Event, retry_seconds: float = 5.0) -> None:
+    """
+    Set `wake` whenever a resume request commits, until `stop` is set. Runs on its own
+    autocommit connection; workers still poll, so a lost connection only costs latency.
+    """
+    while not stop.is_set():
+        try:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.exec_driver_sql(f"LISTEN {RUN_RESUME_CHANNEL}")
+                raw = conn.connection.dbapi_connection
+                while not stop.is_set():
+                    readable, _, _ = select_module.select([raw], [], [], 1.0)
+                    if not readable:
+                        continue
+                    raw.poll()
+                    if raw.notifies:
+                        raw.notifies.clear()
+                        wake.set()
+                conn.exec_driver_sql("UNLISTEN *")
+        except Exception:
+            logger.exception("resume listener failed; reconnecting in %.0fs", retry_seconds)
+            stop.wait(retry_seconds)
@@ -1,189 +1,268 @@
 import datetime
-from typing import Any, Dict
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 
-from app.core.llm_router import llm_complete
+from app.core.blobstore import offload_json, offload_text
+from app.core.chaining import missing_projections, project_upstream
+from app.core.events import record_run_events, run_event, step_event
+from app.core.llm_cache import cache_enabled_globally, cache_lookup, cache_store, compute_input_hash
+from app.core.llm_router import llm_complete, llm_model_name
+from app.core.metrics import LLM_CACHE_LOOKUPS, STEP_DURATION, observe_llm_call, observe_llm_stream, track_run
+from app.core.plan import ManifestPlan, PlanError, PlanStep, get_plan
+from app.core.prompting import (
+    DEFAULT_PROMPT_TEMPLATE,
+    CompiledTemplate,
+    compile_template,
+    complete_template,
+    render_prompt,
+)
 from app.core.policy import evaluate_policy
+from app.core.schema_validation import SchemaValidator, get_validator
+from app.core.tokens import estimate_tokens, prompt_token_budget
+from app.core.tracing import (
+    Span,
+    end_span,
+    new_trace_id,
+    span,
+    start_span,
+    start_trace,
+    traced_session,
+    tracing_enabled,
+)
 from app.db import models
 
 
+TERMINAL_STEP_STATUSES = {"SUCCESS", "FAIL", "SKIPPED"}
+
+
 def _now_utc() -> datetime.datetime:
     return datetime.datetime.now(datetime.timezone.utc)
 
 
-def execute_manifest(manifest_id: UUID, db: Session, initiated_by: str | None = None) -> UUID:
+def _ms_since(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
+@contextmanager
+def _runner_session(db: Session):
+    """
+    Committing expires every loaded instance by default, so each commit would be followed
+    by a SELECT per DagRun and DagStepRun touched afterwards. The runner is the only
+    writer of these rows while it advances a run, so its in-memory state is authoritative.
+    """
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        yield db
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+
+def _default_max_workers() -> int:
+    try:
+        return max(1, int(os.getenv("RUNNER_MAX_WORKERS", "1")))
+    except ValueError:
+        return 1
+
+
+@dataclass
+class _RunState:
+    """
+    Everything the run loop needs to advance a run from its current ledger state.
     """
-    Execute a manifest sequentially with deterministic gating + audit logging.
+    dag_run: models.DagRun
+    plan: ManifestPlan
+    use_cache: bool
+    templates: dict[UUID, CompiledTemplate] = field(default_factory=dict)
+    output_validators: dict[UUID, SchemaValidator] = field(default_factory=dict)
+    existing_by_step_key: dict[str, models.DagStepRun] = field(default_factory=dict)
+    canonical_by_step_key: dict[str, dict] = field(default_factory=dict)
+    step_status: dict[str, str] = field(default_factory=dict)
+    error_found: bool = False
+    trace: Span | None = None
+
+
+def execute_manifest(
+    manifest_id: UUID,
+    db: Session,
+    initiated_by: str | None = None,
+    max_workers: int | None = None,
+    run_params: Dict[str, Any] | None = None,
+) -> UUID:
+    """
+    Execute a manifest with deterministic gating + audit logging.
 
     Principles:
     - Only canonical_output chains forward.
     - execution_policy_report is authoritative.
     - decision_rationale is stored as an explanatory artifact and may be validated by policy.
+
+    Steps run sequentially in plan order (topological, ties broken by order_index) unless max_workers (or RUNNER_MAX_WORKERS)
+    is greater than 1. In that case steps are grouped into dependency levels and the LLM
+    calls of each level run on a bounded thread pool; all ledger writes still happen on
+    this thread, in plan order, so the recorded rows are the same as sequential.
+    """
+    with _runner_session(db):
+        # A manifest that does not compile raises PlanError before any row is written.
+        compiled = compile_run(db, manifest_id)
+        dag_run = _create_running_run(db, manifest_id, initiated_by, run_params)
+        state = _new_run_state(db, dag_run, compiled)
+        return _advance_run(db, state, _resolve_max_workers(max_workers))
+
+
+def execute_claimed_run(run_id: UUID, db: Session, max_workers: int | None = None) -> UUID:
+    """
+    Execute a run that a queue worker has already moved from `queued` to `running`.
     """
-    run_started = _now_utc()
+    with _runner_session(db):
+        dag_run = _get_claimed_run(db, run_id)
+        try:
+            state = _new_run_state(db, dag_run)
+        except PlanError:
+            _fail_unstartable_run(db, dag_run)
+            raise
+        return _advance_run(db, state, _resolve_max_workers(max_workers))
+
+
+def resume_run(
+    run_id: UUID,
+    db: Session,
+    initiated_by: str | None = None,
+    max_workers: int | None = None,
+    claimed_by: str | None = None,
+) -> UUID:
+    """
+    Resume a `waiting` run. A queue worker passes its id as claimed_by, so the run holds
+    the worker's lease from the moment it is `running` again.
+    """
+    with _runner_session(db):
+        state = _resume_run_state(db, run_id, initiated_by, claimed_by)
+        return _advance_run(db, state, _resolve_max_workers(max_workers))
+
+
+def _resolve_max_workers(max_workers: int | None) -> int:
+    return max_workers if max_workers is not None else _default_max_workers()
+
 
+def _create_running_run(
+    db: Session,
+    manifest_id: UUID,
+    initiated_by: str | None,
+    run_params: Dict[str, Any] | None = None,
+) -> models.DagRun:
     dag_run = models.DagRun(
+        id=uuid.uuid4(),
         manifest_id=manifest_id,
         status="running",
-        started_at=run_started,
+        started_at=_now_utc(),
         initiated_by=initiated_by,
+        run_params=run_params,
     )
     db.add(dag_run)
+    db.flush()
+    record_run_events(db, dag_run.id, [run_event("running")])
     db.commit()
-    db.refresh(dag_run)
+    return dag_run
 
-    manifest = db.get(models.Manifest, manifest_id)
-    if not manifest:
-        raise ValueError("Manifest not found")
 
-    steps = (
-        db.scalars(
-            select(models.ManifestStep)
-            .filter_by(manifest_id=manifest_id)
-            .order_by(models.ManifestStep.order_index)
-        )
-        .all()
-    )
+def _get_claimed_run(db: Session, run_id: UUID) -> models.DagRun:
+    dag_run = db.get(models.DagRun, run_id)
+    if not dag_run:
+        raise ValueError("Run not found")
 
-    canonical_by_step_key: dict[str, dict] = {}
-    step_status: dict[str, str] = {}
-    error_found = False
+    if dag_run.status != "running":
+        raise ValueError("Run not in running status")
 
-    for step in steps:
-        depends_on = step.depends_on or []
+    return dag_run
 
-        if any(step_status.get(dep) != "SUCCESS" for dep in depends_on):
-            step_status[step.step_key] = "SKIPPED"
-            _record_skipped_step(db=db, dag_run_id=dag_run.id, step=step)
-            continue
 
-        step_type = (getattr(step, "step_type", None) or "task").strip().lower()
-        if step_type == "compute":
-            step_run = models.DagStepRun(
-                dag_run_id=dag_run.id,
-                manifest_step_id=step.id,
-                status="WAITING_FOR_ATTESTATION",
-                started_at=_now_utc(),
-                ended_at=None,
-            )
-            db.add(step_run)
-            dag_run.status = "waiting"
-            db.commit()
-            return dag_run.id
-
-        upstream = {k: canonical_by_step_key.get(k) for k in depends_on}
-
-        prompt_payload: Dict[str, Any] = {
-            "step_key": step.step_key,
-            "task_id": str(step.task_id) if step.task_id else None,
-            "config": step.config or {},
-            "upstream_canonical": upstream,
-        }
-
-        rendered_prompt = (
-            "Execute step.\n\n"
-            f"INPUT_JSON:\n{prompt_payload}\n\n"
-            "Return STRICT JSON only with keys: decision_rationale, output_json."
-        )
+@dataclass(frozen=True)
+class CompiledRun:
+    manifest: models.Manifest
+    plan: ManifestPlan
+    templates: dict[UUID, CompiledTemplate]
+    output_validators: dict[UUID, SchemaValidator]
 
-        step_run = models.DagStepRun(
-            dag_run_id=dag_run.id,
-            manifest_step_id=step.id,
-            status="RUNNING",
-            started_at=_now_utc(),
-        )
-        db.add(step_run)
-        db.commit()
-        db.refresh(step_run)
-
-        llm_result = llm_complete(rendered_prompt)
-
-        db.add(
-            models.LLMCallArtifact(
-                step_run_id=step_run.id,
-                provider=llm_result.get("provider"),
-                model=llm_result.get("model"),
-                request_json=llm_result.get("request_json"),
-                response_json=llm_result.get("response_json") or {"raw_text": llm_result.get("raw_text")},
-                latency_ms=llm_result.get("latency_ms"),
-            )
-        )
-        db.commit()
-
-        parsed = llm_result.get("parsed_json") or {}
-        decision_rationale = parsed.get("decision_rationale")
-        output_json = parsed.get("output_json")
-
-        policy_status, report_json = evaluate_policy(
-            step=step,
-            output_json=output_json,
-            decision_rationale=decision_rationale,
-        )
-
-        canonical_output = output_json if policy_status == "PASS" else None
-        final_status = "SUCCESS" if policy_status == "PASS" else "FAIL"
 
-        if final_status == "FAIL":
-            error_found = True
+def compile_run(db: Session, manifest_id: UUID) -> CompiledRun:
+    """
+    Everything a run of the manifest is built from. Raises PlanError if the steps, or
+    the prompt templates of their tasks, do not compile; callers check this before
+    writing a run.
+    """
+    manifest = db.get(models.Manifest, manifest_id)
+    if not manifest:
+        raise ValueError("Manifest not found")
+    plan = get_plan(db, manifest)
+    templates, output_validators = _load_tasks(db, plan)
+    return CompiledRun(manifest, plan, templates, output_validators)
 
-        step_status[step.step_key] = final_status
 
-        db.add(
-            models.PromptArtifact(
-                step_run_id=step_run.id,
-                rendered_prompt=rendered_prompt,
-                context={"prompt_payload": prompt_payload},
-                token_estimate=None,
-            )
-        )
-        db.add(
-            models.ParsedOutputArtifact(
-                step_run_id=step_run.id,
-                output_text=llm_result.get("raw_text"),
-                output_json=output_json,
-                extraction_report=llm_result.get("json_errors"),
-            )
-        )
-
-        step_run.status = final_status
-        step_run.ended_at = _now_utc()
-        step_run.decision_rationale = decision_rationale
-        step_run.execution_policy_report = report_json
-        step_run.canonical_output = canonical_output
+def _fail_unstartable_run(db: Session, dag_run: models.DagRun) -> None:
+    """
+    End a claimed run whose manifest does not compile. It has no step runs, and left
+    `running` it would only be reclaimed into the queue and fail again.
+    """
+    db.rollback()
+    dag_run.status = "error"
+    dag_run.ended_at = _now_utc()
+    dag_run.claimed_by = None
+    dag_run.heartbeat_at = None
+    record_run_events(db, dag_run.id, [run_event("error")])
+    db.commit()
 
-        db.commit()
 
-        if final_status == "SUCCESS" and canonical_output is not None:
-            canonical_by_step_key[step.step_key] = canonical_output
+def _new_run_state(db: Session, dag_run: models.DagRun, compiled: CompiledRun | None = None) -> _RunState:
+    compiled = compiled or compile_run(db, dag_run.manifest_id)
+    dag_run.plan_hash = compiled.plan.content_hash
+    _assign_trace_id(dag_run)
 
-    dag_run.status = "error" if error_found else "success"
-    dag_run.ended_at = _now_utc()
-    db.commit()
+    return _RunState(
+        dag_run=dag_run,
+        plan=compiled.plan,
+        use_cache=cache_enabled_globally() and compiled.manifest.llm_cache_enabled,
+        templates=compiled.templates,
+        output_validators=compiled.output_validators,
+    )
 
-    return dag_run.id
 
+def _resume_run_state(
+    db: Session,
+    run_id: UUID,
+    initiated_by: str | None,
+    claimed_by: str | None = None,
+) -> _RunState:
+    """
+    Rebuild run state from the ledger and move the run from `waiting` back to `running`.
 
-def resume_run(run_id: UUID, db: Session, initiated_by: str | None = None) -> UUID:
-    dag_run = db.get(models.DagRun, run_id)
+    The run row is locked until that transition commits, so concurrent resumes of one
+    run (an operator and an auto-resume worker, say) serialize and only the first wins.
+    """
+    # populate_existing: the caller may already have the run in this session, and the
+    # status check must see the row as it is once the lock is granted.
+    dag_run = db.get(models.DagRun, run_id, with_for_update=True, populate_existing=True)
     if not dag_run:
         raise ValueError("Run not found")
 
     if dag_run.status != "waiting":
         raise ValueError("Run not in waiting status")
 
-    steps = (
-        db.scalars(
-            select(models.ManifestStep)
-            .filter_by(manifest_id=dag_run.manifest_id)
-            .order_by(models.ManifestStep.order_index)
-        )
-        .all()
-    )
+    manifest = db.get(models.Manifest, dag_run.manifest_id)
+    if not manifest:
+        raise ValueError("Manifest not found")
 
-    step_by_id: dict[UUID, models.ManifestStep] = {s.id: s for s in steps}
+    plan = get_plan(db, manifest)
+    if dag_run.plan_hash is not None and dag_run.plan_hash != plan.content_hash:
+        raise ValueError("Manifest steps changed since run started")
 
     step_runs = (
         db.scalars(
@@ -195,161 +274,572 @@ def resume_run(run_id: UUID, db: Session, initiated_by: str | None = None) -> UU
     )
 
     for sr in step_runs:
-        if sr.manifest_step_id not in step_by_id:
+        if sr.manifest_step_id not in plan.step_by_id:
             raise ValueError("Manifest steps changed since run started")
 
-    existing_by_step_key: dict[str, models.DagStepRun] = {}
+    templates, output_validators = _load_tasks(db, plan)
+    state = _RunState(
+        dag_run=dag_run,
+        plan=plan,
+        use_cache=cache_enabled_globally() and manifest.llm_cache_enabled,
+        templates=templates,
+        output_validators=output_validators,
+    )
+
     for sr in step_runs:
-        ms = step_by_id.get(sr.manifest_step_id)
+        ms = plan.step_by_id.get(sr.manifest_step_id)
         if not ms:
             continue
-        existing_by_step_key[ms.step_key] = sr
-
-    canonical_by_step_key: dict[str, dict] = {}
-    step_status: dict[str, str] = {}
-    error_found = False
+        state.existing_by_step_key[ms.step_key] = sr
 
-    for step_key, sr in existing_by_step_key.items():
+    for step_key, sr in state.existing_by_step_key.items():
         st = sr.status
         if st in {"SUCCESS", "FAIL", "SKIPPED", "WAITING_FOR_ATTESTATION"}:
-            step_status[step_key] = st
+            state.step_status[step_key] = st
         if st == "FAIL":
-            error_found = True
+            state.error_found = True
         if st == "SUCCESS" and sr.canonical_output is not None:
-            canonical_by_step_key[step_key] = sr.canonical_output
+            state.canonical_by_step_key[step_key] = sr.canonical_output
 
     dag_run.status = "running"
     dag_run.initiated_by = initiated_by if initiated_by is not None else dag_run.initiated_by
+    dag_run.resume_requested_at = None
+    # A lease from an earlier pass must not expire under this one. A resuming worker
+    # takes a fresh lease in this commit, so the run is never `running` without one.
+    dag_run.claimed_by = claimed_by
+    dag_run.heartbeat_at = _now_utc() if claimed_by is not None else None
+    _assign_trace_id(dag_run)
+    record_run_events(db, dag_run.id, [run_event("running")])
     db.commit()
 
-    for step in steps:
-        existing = existing_by_step_key.get(step.step_key)
-        if existing and existing.status in {"SUCCESS", "FAIL", "SKIPPED"}:
+    return state
+
+
+def _assign_trace_id(dag_run: models.DagRun) -> None:
+    # A resumed run continues the trace it started, so both passes share one timeline.
+    if dag_run.trace_id is None and tracing_enabled():
+        dag_run.trace_id = new_trace_id()
+
+
+def _load_tasks(
+    db: Session, plan: ManifestPlan
+) -> Tuple[dict[UUID, CompiledTemplate], dict[UUID, SchemaValidator]]:
+    """
+    Compiled prompt templates and extract_schema validators of the plan's tasks, both
+    cached process-wide (by template text and schema hash), so each run only pays the lookup.
+
+    Templates are checked when a task is written, but one stored before that check can
+    still fail to compile; that raises PlanError naming the task. A bad stored schema
+    does not raise: policy fails the task's steps with its schema_error.
+    """
+    task_ids = {s.task_id for s in plan.steps if s.task_id is not None}
+    if not task_ids:
+        return {}, {}
+    rows = db.execute(
+        select(models.Task.id, models.Task.prompt_template, models.Task.extract_schema)
+        .where(models.Task.id.in_(task_ids))
+    ).all()
+    templates: dict[UUID, CompiledTemplate] = {}
+    validators: dict[UUID, SchemaValidator] = {}
+    for task_id, template, schema in rows:
+        if template:
+            try:
+                templates[task_id] = compile_template(complete_template(template))
+            except ValueError as e:
+                raise PlanError(f"task {task_id}: {e}") from e
+        if schema is not None:
+            validators[task_id] = get_validator(schema)
+    return templates, validators
+
+
+def _step_batches(plan: ManifestPlan, max_workers: int) -> Tuple[Tuple[PlanStep, ...], ...]:
+    """
+    Sequential mode walks the plan one step per batch; parallel mode walks its
+    dependency levels, whose steps keep plan order within the level.
+    """
+    if max_workers <= 1:
+        return tuple((s,) for s in plan.steps)
+    return plan.levels
+
+
+def _advance_run(db: Session, state: _RunState, max_workers: int) -> UUID:
+    """
+    Walk the manifest from the current ledger state until the run completes or reaches
+    a compute boundary. Shared by execute_manifest (empty ledger) and resume_run.
+    """
+    with track_run() as tracked, _run_trace(db, state):
+        run_id = _advance_run_batches(db, state, max_workers)
+        tracked["status"] = state.dag_run.status
+        return run_id
+
+
+@contextmanager
+def _run_trace(db: Session, state: _RunState):
+    """Root span for one runner pass over the run; commits inside it become spans."""
+    state.trace = start_trace(
+        "dag_run",
+        state.dag_run.trace_id,
+        **{"run.id": str(state.dag_run.id), "manifest.id": str(state.dag_run.manifest_id)},
+    )
+    try:
+        with traced_session(db, state.trace):
+            yield
+    except BaseException as e:
+        end_span(state.trace, "ERROR", f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        end_span(state.trace, **{"run.status": state.dag_run.status})
+
+
+def _advance_run_batches(db: Session, state: _RunState, max_workers: int) -> UUID:
+    for batch in _step_batches(state.plan, max_workers):
+        ready, compute_boundary = _triage_batch(db, state, batch)
+
+        if ready:
+            prepared = _start_task_steps(db, state, ready)
+            _call_llm_batch(prepared, max_workers)
+            _finish_task_steps(db, state, prepared)
+
+        if compute_boundary is not None:
+            return _halt_at_compute_boundary(db, state, compute_boundary)
+
+    return _complete_run(db, state)
+
+
+def _triage_batch(
+    db: Session,
+    state: _RunState,
+    batch: Tuple[PlanStep, ...],
+) -> Tuple[List[PlanStep], Tuple[PlanStep, models.DagStepRun | None] | None]:
+    """
+    Apply gating to a batch. Returns the task steps that may run now and, if the batch
+    reaches a compute step, that step and its existing step run (if any).
+    """
+    ready: List[PlanStep] = []
+
+    for step in batch:
+        existing = state.existing_by_step_key.get(step.step_key)
+        if existing and existing.status in TERMINAL_STEP_STATUSES:
             continue
         if existing and existing.status == "RUNNING":
             raise ValueError("Run has an in-flight step; cannot resume deterministically")
 
-        depends_on = step.depends_on or []
-        if any(step_status.get(dep) != "SUCCESS" for dep in depends_on):
+        if any(state.step_status.get(dep) != "SUCCESS" for dep in step.depends_on):
             if not existing:
-                step_status[step.step_key] = "SKIPPED"
-                _record_skipped_step(db=db, dag_run_id=dag_run.id, step=step)
+                state.step_status[step.step_key] = "SKIPPED"
+                _record_skipped_step(db=db, dag_run_id=state.dag_run.id, step=step)
             continue
 
-        step_type = (getattr(step, "step_type", None) or "task").strip().lower()
-        if step_type == "compute":
-            if existing and existing.status == "WAITING_FOR_ATTESTATION":
-                dag_run.status = "waiting"
-                db.commit()
-                return dag_run.id
+        if step.step_key in state.plan.compute_step_keys:
+            # A compute step is an execution boundary: nothing ordered after it in
+            # this batch may start before it is attested.
+            return ready, (step, existing)
 
-            if not existing:
-                step_run = models.DagStepRun(
-                    dag_run_id=dag_run.id,
-                    manifest_step_id=step.id,
-                    status="WAITING_FOR_ATTESTATION",
-                    started_at=_now_utc(),
-                    ended_at=None,
-                )
-                db.add(step_run)
-                dag_run.status = "waiting"
-                db.commit()
-                return dag_run.id
-
-        upstream = {k: canonical_by_step_key.get(k) for k in depends_on}
-
-        prompt_payload: Dict[str, Any] = {
-            "step_key": step.step_key,
-            "task_id": str(step.task_id) if step.task_id else None,
-            "config": step.config or {},
-            "upstream_canonical": upstream,
-        }
-
-        rendered_prompt = (
-            "Execute step.\n\n"
-            f"INPUT_JSON:\n{prompt_payload}\n\n"
-            "Return STRICT JSON only with keys: decision_rationale, output_json."
-        )
+        ready.append(step)
+
+    return ready, None
 
+
+def _halt_at_compute_boundary(
+    db: Session,
+    state: _RunState,
+    compute_boundary: Tuple[PlanStep, models.DagStepRun | None],
+) -> UUID:
+    step, existing = compute_boundary
+    events = []
+    if not existing:
         step_run = models.DagStepRun(
-            dag_run_id=dag_run.id,
+            id=uuid.uuid4(),
+            dag_run_id=state.dag_run.id,
             manifest_step_id=step.id,
-            status="RUNNING",
+            status="WAITING_FOR_ATTESTATION",
             started_at=_now_utc(),
+            ended_at=None,
         )
         db.add(step_run)
-        db.commit()
-        db.refresh(step_run)
-
-        llm_result = llm_complete(rendered_prompt)
-
-        db.add(
-            models.LLMCallArtifact(
-                step_run_id=step_run.id,
-                provider=llm_result.get("provider"),
-                model=llm_result.get("model"),
-                request_json=llm_result.get("request_json"),
-                response_json=llm_result.get("response_json") or {"raw_text": llm_result.get("raw_text")},
-                latency_ms=llm_result.get("latency_ms"),
-            )
-        )
-        db.commit()
+        events.append(step_event(step_run.id, step.id, step.step_key, "WAITING_FOR_ATTESTATION"))
+    state.dag_run.status = "waiting"
+    events.append(run_event("waiting"))
+    record_run_events(db, state.dag_run.id, events)
+    db.commit()
+    return state.dag_run.id
 
-        parsed = llm_result.get("parsed_json") or {}
-        decision_rationale = parsed.get("decision_rationale")
-        output_json = parsed.get("output_json")
 
-        policy_status, report_json = evaluate_policy(
-            step=step,
-            output_json=output_json,
-            decision_rationale=decision_rationale,
-        )
+def _complete_run(db: Session, state: _RunState) -> UUID:
+    state.dag_run.status = "error" if state.error_found else "success"
+    state.dag_run.ended_at = _now_utc()
+    record_run_events(db, state.dag_run.id, [run_event(state.dag_run.status)])
+    db.commit()
 
-        canonical_output = output_json if policy_status == "PASS" else None
-        final_status = "SUCCESS" if policy_status == "PASS" else "FAIL"
+    return state.dag_run.id
 
-        if final_status == "FAIL":
-            error_found = True
 
-        step_status[step.step_key] = final_status
+def _render_step_prompt(state: _RunState, step: PlanStep):
+    """
+    Render from the task's prompt_template (or the default template) as canonical JSON,
+    so equal inputs produce byte-identical prompts and input hashes.
 
-        db.add(
-            models.PromptArtifact(
-                step_run_id=step_run.id,
-                rendered_prompt=rendered_prompt,
-                context={"prompt_payload": prompt_payload},
-                token_estimate=None,
-            )
+    Upstream outputs are projected through step.chaining first. Returns the payload, the
+    rendered prompt and the chaining report (dependency -> pointers and missing pointers).
+    """
+    upstream, chaining_report = project_upstream(step.chaining, step.depends_on, state.canonical_by_step_key)
+
+    prompt_payload: Dict[str, Any] = {
+        "step_key": step.step_key,
+        "task_id": str(step.task_id) if step.task_id else None,
+        "config": step.config,
+        "upstream_canonical": upstream,
+    }
+    # Only runs started with parameters carry the key, so prompts (and input hashes) of
+    # runs without them are unchanged.
+    if state.dag_run.run_params is not None:
+        prompt_payload["run_params"] = state.dag_run.run_params
+
+    compiled = state.templates.get(step.task_id) or compile_template(DEFAULT_PROMPT_TEMPLATE)
+    rendered_prompt = render_prompt(compiled, prompt_payload)
+    return prompt_payload, rendered_prompt, chaining_report
+
+
+@dataclass
+class _PreparedStep:
+    step: PlanStep
+    step_run: models.DagStepRun
+    prompt_payload: Dict[str, Any]
+    rendered_prompt: str
+    input_hash: str
+    context: Dict[str, Any] = field(default_factory=dict)
+    token_estimate: int | None = None
+    cache_status: str = "bypass"
+    llm_result: dict | None = None
+    final_status: str | None = None
+    decision_rationale: Any = None
+    output_json: Any = None
+    report_json: Dict[str, Any] | None = None
+    canonical_output: Any = None
+    span: Span | None = None
+    # Phase durations in milliseconds, stored on DagStepRun.timings.
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+def _start_task_steps(db: Session, state: _RunState, steps: List[PlanStep]) -> List[_PreparedStep]:
+    """
+    Render prompts, consult the response cache and durably record RUNNING markers (plus
+    any pending SKIPPED rows) for a batch of mutually independent task steps.
+
+    Each batch costs two transactions: this one, committed before the LLM is called so
+    resume can detect in-flight steps, and the one in _finish_task_steps that
+    bulk-inserts every artifact and final status afterwards.
+    """
+    model_name = llm_model_name()
+    started_at = _now_utc()
+
+    prepared: List[_PreparedStep] = []
+    for step in steps:
+        step_span = start_span(state.trace, f"step {step.step_key}", **{"step.key": step.step_key})
+        render_started = time.perf_counter()
+        with span(step_span, "render_prompt"):
+            prompt_payload, rendered_prompt, chaining_report = _render_step_prompt(state, step)
+            input_hash = compute_input_hash(model_name, rendered_prompt)
+            token_estimate = estimate_tokens(model_name, rendered_prompt, input_hash)
+        render_ms = _ms_since(render_started)
+
+        step_run = models.DagStepRun(
+            id=uuid.uuid4(),
+            dag_run_id=state.dag_run.id,
+            manifest_step_id=step.id,
+            status="RUNNING",
+            started_at=started_at,
+            input_hash=input_hash,
         )
-        db.add(
-            models.ParsedOutputArtifact(
-                step_run_id=step_run.id,
-                output_text=llm_result.get("raw_text"),
-                output_json=output_json,
-                extraction_report=llm_result.get("json_errors"),
+        db.add(step_run)
+
+        p = _PreparedStep(step, step_run, prompt_payload, rendered_prompt, input_hash)
+        p.token_estimate = token_estimate
+        p.span = step_span
+        p.timings["render_ms"] = render_ms
+        prepared.append(p)
+
+        if chaining_report:
+            p.context["chaining"] = chaining_report
+            missing = missing_projections(chaining_report)
+            if missing:
+                _fail_before_call(
+                    p,
+                    {
+                        "rule": "chaining_projection_resolved",
+                        "outcome": "fail",
+                        "missing": missing,
+                    },
+                )
+
+        budget = prompt_token_budget(step.config)
+        if budget is not None and p.final_status is None and p.token_estimate > budget:
+            _fail_before_call(
+                p,
+                {
+                    "rule": "prompt_token_budget",
+                    "outcome": "fail",
+                    "token_estimate": p.token_estimate,
+                    "max_prompt_tokens": budget,
+                },
             )
+
+    for p in prepared:
+        if not state.use_cache or p.final_status is not None:
+            continue
+        cache_started = time.perf_counter()
+        cached = cache_lookup(db, p.input_hash)
+        p.timings["cache_ms"] = _ms_since(cache_started)
+        if cached is not None:
+            p.cache_status = "hit"
+            p.llm_result = cached
+        else:
+            p.cache_status = "miss"
+        LLM_CACHE_LOOKUPS.labels(p.cache_status).inc()
+
+    record_run_events(
+        db,
+        state.dag_run.id,
+        [step_event(p.step_run.id, p.step.id, p.step.step_key, "RUNNING") for p in prepared],
+    )
+    db.commit()
+    return prepared
+
+
+def _fail_before_call(p: _PreparedStep, violation: Dict[str, Any]) -> None:
+    """
+    Fail a step deterministically without calling the model. Its prompt is still
+    recorded; no LLM call or parsed output artifact is written.
+    """
+    p.final_status = "FAIL"
+    p.report_json = {"outcome": "FAIL", "violations": [violation]}
+    p.cache_status = "bypass"
+
+
+def _needs_llm_call(p: _PreparedStep) -> bool:
+    return p.llm_result is None and p.final_status is None
+
+
+def _call_llm_batch(prepared: List[_PreparedStep], max_workers: int) -> None:
+    """
+    Fill llm_result for every step the cache did not answer and that has not already
+    failed. Only these calls run concurrently; the Session is never touched from worker
+    threads.
+    """
+    to_call = [p for p in prepared if _needs_llm_call(p)]
+    if max_workers > 1 and len(to_call) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(to_call))) as pool:
+            futures = [(p, pool.submit(_call_llm, p)) for p in to_call]
+        # A call that raised fails its own step; its siblings' results are kept.
+        for p, future in futures:
+            error = future.exception()
+            if error is not None:
+                _fail_llm_call(p, error)
+    else:
+        for p in to_call:
+            try:
+                _call_llm(p)
+            except Exception as e:
+                _fail_llm_call(p, e)
+
+
+def _call_llm(p: _PreparedStep) -> None:
+    llm_started = time.perf_counter()
+    try:
+        with span(p.span, "llm_complete") as llm_span:
+            p.llm_result = llm_complete(p.rendered_prompt)
+            _annotate_llm_span(llm_span, p.llm_result)
+    finally:
+        p.timings["llm_ms"] = _ms_since(llm_started)
+    _record_llm_call(p)
+
+
+def _fail_llm_call(p: _PreparedStep, error: BaseException) -> None:
+    """
+    Fail a step whose model call raised. Like _fail_before_call, only the prompt is
+    recorded, so the RUNNING marker is always replaced by a final status.
+    """
+    p.llm_result = None
+    p.final_status = "FAIL"
+    p.report_json = {
+        "outcome": "FAIL",
+        "violations": [
+            {"rule": "llm_call_completed", "outcome": "fail", "detail": f"{type(error).__name__}: {error}"}
+        ],
+    }
+
+
+def _record_llm_call(p: _PreparedStep) -> None:
+    observe_llm_call(p.llm_result.get("provider"), p.llm_result.get("model"), p.llm_result.get("latency_ms"))
+    observe_llm_stream(p.llm_result)
+    # Streamed calls only.
+    for key in ("ttft_ms", "tokens_per_sec"):
+        if p.llm_result.get(key) is not None:
+            p.timings[key] = p.llm_result[key]
+
+
+def _annotate_llm_span(llm_span: Span | None, llm_result: dict) -> None:
+    if llm_span is not None:
+        llm_span.attributes.update(
+            {
+                "llm.provider": llm_result.get("provider"),
+                "llm.model": llm_result.get("model"),
+                "llm.connect_wait_ms": llm_result.get("connect_wait_ms"),
+                "llm.endpoint": llm_result.get("endpoint"),
+            }
         )
 
-        step_run.status = final_status
-        step_run.ended_at = _now_utc()
-        step_run.decision_rationale = decision_rationale
-        step_run.execution_policy_report = report_json
-        step_run.canonical_output = canonical_output
 
-        db.commit()
+def _finish_task_steps(db: Session, state: _RunState, prepared: List[_PreparedStep]) -> None:
+    for p in prepared:
+        _evaluate_task_step(p, state.output_validators.get(p.step.task_id))
 
-        if final_status == "SUCCESS" and canonical_output is not None:
-            canonical_by_step_key[step.step_key] = canonical_output
+    _persist_task_step_results(db, state.dag_run.id, prepared)
 
-    dag_run.status = "error" if (error_found or any(v == "FAIL" for v in step_status.values())) else "success"
-    dag_run.ended_at = _now_utc()
+    for p in prepared:
+        if p.final_status == "FAIL":
+            state.error_found = True
+
+        state.step_status[p.step.step_key] = p.final_status
+
+        if p.final_status == "SUCCESS" and p.canonical_output is not None:
+            state.canonical_by_step_key[p.step.step_key] = p.canonical_output
+
+
+def _evaluate_task_step(p: _PreparedStep, output_validator: SchemaValidator | None) -> None:
+    if p.llm_result is None:
+        return  # failed before the call
+    parse_started = time.perf_counter()
+    parsed = p.llm_result.get("parsed_json") or {}
+    p.decision_rationale = parsed.get("decision_rationale")
+    p.output_json = parsed.get("output_json")
+    # Clients that decode JSON themselves report that time; it belongs to this phase.
+    p.timings["parse_ms"] = round(_ms_since(parse_started) + (p.llm_result.get("parse_ms") or 0), 3)
+
+    policy_started = time.perf_counter()
+    with span(p.span, "evaluate_policy"):
+        policy_status, p.report_json = evaluate_policy(
+            step=p.step,
+            output_json=p.output_json,
+            decision_rationale=p.decision_rationale,
+            output_validator=output_validator,
+            stream_abort=p.llm_result.get("stream_abort"),
+        )
+    p.timings["policy_ms"] = _ms_since(policy_started)
+
+    p.canonical_output = p.output_json if policy_status == "PASS" else None
+    p.final_status = "SUCCESS" if policy_status == "PASS" else "FAIL"
+
+
+def _persist_task_step_results(db: Session, dag_run_id: UUID, prepared: List[_PreparedStep]) -> None:
+    """
+    Write the artifacts and final status of every step in the batch in one transaction,
+    one multi-row INSERT per artifact table. Large payloads are written to the blob
+    store first, so a committed row never references a missing blob.
+    """
+    ended_at = _now_utc()
+    called = [p for p in prepared if p.llm_result is not None]
+
+    persist_started = time.perf_counter()
+    if called:
+        _insert_llm_artifacts(db, called)
+    db.execute(insert(models.PromptArtifact), [_prompt_artifact_row(p) for p in prepared])
+    # Artifact writes are batched, so every step of the batch shares this figure.
+    persist_ms = _ms_since(persist_started)
+
+    for p in prepared:
+        p.timings["persist_ms"] = persist_ms
+        p.step_run.timings = p.timings
+        p.step_run.status = p.final_status
+        p.step_run.ended_at = ended_at
+        p.step_run.decision_rationale = p.decision_rationale
+        p.step_run.execution_policy_report = p.report_json
+        p.step_run.canonical_output = p.canonical_output
+        STEP_DURATION.labels(p.final_status).observe((ended_at - p.step_run.started_at).total_seconds())
+
+        # Only policy-passing responses are cached, so a hit never replays a failure.
+        if p.cache_status == "miss" and p.final_status == "SUCCESS":
+            cache_store(db, p.input_hash, p.step_run.id, p.llm_result)
+
+    record_run_events(
+        db,
+        dag_run_id,
+        [step_event(p.step_run.id, p.step.id, p.step.step_key, p.final_status) for p in prepared],
+    )
     db.commit()
-    return dag_run.id
 
+    for p in prepared:
+        end_span(
+            p.span,
+            "OK" if p.final_status == "SUCCESS" else "ERROR",
+            **{"step.run_id": str(p.step_run.id), "step.status": p.final_status, "llm.cache": p.cache_status},
+        )
 
-def _record_skipped_step(db: Session, dag_run_id: UUID, step: models.ManifestStep) -> None:
+
+def _prompt_artifact_row(p: _PreparedStep) -> Dict[str, Any]:
+    rendered_prompt, prompt_sha256, prompt_bytes = offload_text(p.rendered_prompt)
+    # The payload holds the upstream outputs the prompt embeds, so it is as large as the
+    # prompt and is offloaded the same way.
+    context, context_sha256, context_bytes = offload_json({"prompt_payload": p.prompt_payload, **p.context})
+    return {
+        "step_run_id": p.step_run.id,
+        "rendered_prompt": rendered_prompt,
+        "rendered_prompt_sha256": prompt_sha256,
+        "rendered_prompt_bytes": prompt_bytes,
+        "context": context,
+        "context_sha256": context_sha256,
+        "context_bytes": context_bytes,
+        "token_estimate": p.token_estimate,
+    }
+
+
+def _insert_llm_artifacts(db: Session, called: List[_PreparedStep]) -> None:
+    llm_rows = []
+    parsed_rows = []
+    for p in called:
+        response_json, response_sha256, response_bytes = offload_json(
+            p.llm_result.get("response_json") or {"raw_text": p.llm_result.get("raw_text")}
+        )
+        llm_rows.append(
+            {
+                "step_run_id": p.step_run.id,
+                "provider": p.llm_result.get("provider"),
+                "model": p.llm_result.get("model"),
+                "request_json": p.llm_result.get("request_json"),
+                "response_json": response_json,
+                "response_sha256": response_sha256,
+                "response_bytes": response_bytes,
+                "latency_ms": p.llm_result.get("latency_ms"),
+                "connect_wait_ms": p.llm_result.get("connect_wait_ms"),
+                "usage": p.llm_result.get("usage"),
+                "cache_status": p.cache_status,
+                "endpoint": p.llm_result.get("endpoint"),
+            }
+        )
+        output_text, output_sha256, output_bytes = offload_text(p.llm_result.get("raw_text"))
+        parsed_rows.append(
+            {
+                "step_run_id": p.step_run.id,
+                "output_text": output_text,
+                "output_text_sha256": output_sha256,
+                "output_text_bytes": output_bytes,
+                "output_json": p.output_json,
+                "extraction_report": p.llm_result.get("json_errors"),
+            }
+        )
+
+    db.execute(insert(models.LLMCallArtifact), llm_rows)
+    db.execute(insert(models.ParsedOutputArtifact), parsed_rows)
+
+
+def _record_skipped_step(db: Session, dag_run_id: UUID, step: PlanStep) -> None:
+    """
+    Stage a SKIPPED step row. It is committed with the next transaction of the run
+    (the next RUNNING markers, a compute boundary, or the final run status).
+    """
     now = _now_utc()
     step_run = models.DagStepRun(
+        id=uuid.uuid4(),
         dag_run_id=dag_run_id,
         manifest_step_id=step.id,
         status="SKIPPED",
@@ -360,4 +850,4 @@ def _record_skipped_step(db: Session, dag_run_id: UUID, step: models.ManifestSte
         canonical_output=None,
     )
     db.add(step_run)
-    db.commit()
+    record_run_events(db, dag_run_id, [step_event(step_run.id, step.id, step.step_key, "SKIPPED")])
@@ -0,0 +1,571 @@
+"""
+JSON Schema validation of step outputs against Task.extract_schema.
+
+A subset of JSON Schema (2020-12 keyword semantics) is supported:
+
+    type, enum, const,
+    properties, required, additionalProperties, minProperties, maxProperties,
+    items, minItems, maxItems, uniqueItems,
+    minLength, maxLength, pattern,
+    minimum, maximum, exclusiveMinimum, exclusiveMaximum, multipleOf,
+    allOf, anyOf, oneOf, not, $ref (local: "#", "#/$defs/...", "#/definitions/...")
+
+The annotations in ANNOTATION_KEYWORDS (title, description, format, ...) are accepted
+and ignored, as the spec allows. check_schema rejects any other keyword, so a schema
+relying on one this module does not implement (patternProperties, if/then/else, ...)
+fails when it is written instead of passing every output, as well as malformed uses
+of the supported ones.
+
+compile_schema turns a schema into a tree of closures once, so validating an output does
+no keyword lookups on the schema; get_validator caches compiled validators by schema
+hash in a bounded LRU.
+
+Errors are {"path", "keyword", "message"} with path a JSON Pointer into the output,
+sorted by (path, keyword, message), so the same output always yields the same report.
+A value of the wrong type is reported once, for `type`, without its other keywords.
+"""
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
+
+from app.core.json_utils import canonical_json, sha256_hex
+
+SCHEMA_VALIDATOR_CACHE_MAX_ENTRIES = 256
+
+ValidationError = Dict[str, str]
+# (instance, path stack, errors). The path stack is shared and mutated while descending;
+# it is only turned into a pointer when an error is recorded.
+_Check = Callable[[Any, List[Any], List[ValidationError]], None]
+
+
+class SchemaError(ValueError):
+    """extract_schema is not a valid schema in the supported subset."""
+
+
+def _is_integer(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "number": _is_number,
+    "integer": _is_integer,
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def _type_name(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, str):
+        return "string"
+    if _is_integer(value):
+        return "integer"
+    return "number"
+
+
+def _pointer(path: List[Any]) -> str:
+    return "".join("/" + str(p).replace("~", "~0").replace("/", "~1") for p in path)
+
+
+def _error(errors: List[ValidationError], path: List[Any], keyword: str, message: str) -> None:
+    errors.append({"path": _pointer(path), "keyword": keyword, "message": message})
+
+
+def _finish(errors: List[ValidationError]) -> List[ValidationError]:
+    errors.sort(key=lambda e: (e["path"], e["keyword"], e["message"]))
+    return errors
+
+
+def _json_equal(a: Any, b: Any) -> bool:
+    # JSON equality: true is not 1, but 1 is 1.0.
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool) and a == b
+    if isinstance(a, dict):
+        return isinstance(b, dict) and a.keys() == b.keys() and all(_json_equal(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return isinstance(b, list) and len(a) == len(b) and all(map(_json_equal, a, b))
+    if isinstance(b, (dict, list)):
+        return False
+    return a == b
+
+
+def _freeze(value: Any) -> Any:
+    """Hashable form with JSON equality, for uniqueItems."""
+    if isinstance(value, bool):
+        return ("b", value)
+    if isinstance(value, dict):
+        return ("o", frozenset((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return ("a", tuple(_freeze(v) for v in value))
+    return ("v", value)
+
+
+def _has_duplicates(items: List[Any]) -> bool:
+    seen = set()
+    for item in items:
+        key = _freeze(item)
+        if key in seen:
+            return True
+        seen.add(key)
+    return False
+
+
+def _type_message(types: List[str], value: Any) -> str:
+    return f"expected {' or '.join(types)}, got {_type_name(value)}"
+
+
+def _types(node: Dict[str, Any]) -> List[str] | None:
+    t = node.get("type")
+    if t is None:
+        return None
+    return [t] if isinstance(t, str) else list(t)
+
+
+# --- schema checking ---------------------------------------------------------------
+
+_SUBSCHEMA_MAPS = ("properties", "$defs", "definitions")
+_SUBSCHEMA_LISTS = ("allOf", "anyOf", "oneOf")
+_SUBSCHEMAS = ("items", "additionalProperties", "not")
+_NON_NEGATIVE_INTS = ("minLength", "maxLength", "minItems", "maxItems", "minProperties", "maxProperties")
+_NUMBERS = ("minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum", "multipleOf")
+_ASSERTIONS = ("type", "enum", "const", "required", "uniqueItems", "pattern", "$ref")
+SUPPORTED_KEYWORDS = frozenset(
+    _SUBSCHEMA_MAPS + _SUBSCHEMA_LISTS + _SUBSCHEMAS + _NON_NEGATIVE_INTS + _NUMBERS + _ASSERTIONS
+)
+ANNOTATION_KEYWORDS = frozenset(
+    ("$schema", "$comment", "title", "description", "default", "examples", "deprecated",
+     "readOnly", "writeOnly", "format")
+)
+
+
+def _resolve_ref(root: Any, ref: Any) -> Any:
+    if not isinstance(ref, str) or not ref.startswith("#"):
+        raise SchemaError(f"unsupported $ref {ref!r}: only local references are supported")
+    node = root
+    for raw in [p for p in ref[1:].split("/") if p]:
+        key = raw.replace("~1", "/").replace("~0", "~")
+        if not isinstance(node, dict) or key not in node:
+            raise SchemaError(f"unresolvable $ref {ref!r}")
+        node = node[key]
+    return node
+
+
+def check_schema(schema: Any) -> None:
+    """Raises SchemaError when schema is not a valid schema in the supported subset."""
+    _check_node(schema, [], schema)
+
+
+def _check_node(node: Any, spath: List[Any], root: Any) -> None:
+    where = _pointer(spath) or "/"
+
+    def fail(problem: str) -> None:
+        raise SchemaError(f"{where}: {problem}")
+
+    if isinstance(node, bool):
+        return
+    if not isinstance(node, dict):
+        fail("schema must be an object or a boolean")
+    unsupported = sorted(k for k in node if k not in SUPPORTED_KEYWORDS and k not in ANNOTATION_KEYWORDS)
+    if unsupported:
+        fail(f"unsupported keyword(s): {', '.join(unsupported)}")
+
+    if "type" in node:
+        t = node["type"]
+        names = [t] if isinstance(t, str) else t
+        if not isinstance(names, list) or not names or any(n not in _TYPE_CHECKS for n in names):
+            fail(f"type must be one of {', '.join(_TYPE_CHECKS)} or a non-empty list of them")
+    if "enum" in node and not isinstance(node["enum"], list):
+        fail("enum must be an array")
+    if "required" in node and (
+        not isinstance(node["required"], list) or any(not isinstance(r, str) for r in node["required"])
+    ):
+        fail("required must be an array of strings")
+    if "uniqueItems" in node and not isinstance(node["uniqueItems"], bool):
+        fail("uniqueItems must be a boolean")
+    if "pattern" in node:
+        if not isinstance(node["pattern"], str):
+            fail("pattern must be a string")
+        try:
+            re.compile(node["pattern"])
+        except re.error as e:
+            fail(f"invalid pattern: {e}")
+    for key in _NON_NEGATIVE_INTS:
+        if key in node and not (_is_integer(node[key]) and node[key] >= 0):
+            fail(f"{key} must be a non-negative integer")
+    for key in _NUMBERS:
+        if key in node and not _is_number(node[key]):
+            fail(f"{key} must be a number")
+    if "multipleOf" in node and node["multipleOf"] <= 0:
+        fail("multipleOf must be greater than 0")
+    if "items" in node and isinstance(node["items"], list):
+        fail("items must be a schema (the array form is not supported)")
+    if "$ref" in node:
+        try:
+            _resolve_ref(root, node["$ref"])
+        except SchemaError as e:
+            fail(str(e))
+
+    for key in _SUBSCHEMA_MAPS:
+        if key in node:
+            if not isinstance(node[key], dict):
+                fail(f"{key} must be an object")
+            for name, sub in node[key].items():
+                _check_node(sub, spath + [key, name], root)
+    for key in _SUBSCHEMA_LISTS:
+        if key in node:
+            if not isinstance(node[key], list) or not node[key]:
+                fail(f"{key} must be a non-empty array")
+            for i, sub in enumerate(node[key]):
+                _check_node(sub, spath + [key, i], root)
+    for key in _SUBSCHEMAS:
+        if key in node:
+            _check_node(node[key], spath + [key], root)
+
+
+# --- compiled ------------------------------------------------------------------------
+
+
+def _is_multiple(value: float, divisor: float) -> bool:
+    quotient = value / divisor
+    return math.isfinite(quotient) and abs(quotient - round(quotient)) < 1e-9
+
+
+def _one_of_message(matched: int, total: int) -> str:
+    return f"matches {matched} of {total} schemas; exactly one is required"
+
+
+def _no_op(inst: Any, path: List[Any], errors: List[ValidationError]) -> None:
+    return None
+
+
+def _reject_all(inst: Any, path: List[Any], errors: List[ValidationError]) -> None:
+    _error(errors, path, "false", "no value is allowed here")
+
+
+class _Compiler:
+    def __init__(self, root: Any):
+        self.root = root
+        self.refs: Dict[str, List[_Check]] = {}
+
+    def ref(self, ref: str) -> _Check:
+        # A holder breaks the cycle of recursive schemas: the target is compiled once and
+        # looked up at call time.
+        holder = self.refs.get(ref)
+        if holder is None:
+            holder = self.refs[ref] = [_no_op]
+            holder[0] = self.compile(_resolve_ref(self.root, ref))
+        return lambda inst, path, errors: holder[0](inst, path, errors)
+
+    def compile(self, node: Any) -> _Check:
+        if node is True:
+            return _no_op
+        if node is False:
+            return _reject_all
+
+        generic: List[_Check] = []
+        object_checks: List[_Check] = []
+        array_checks: List[_Check] = []
+        string_checks: List[_Check] = []
+        number_checks: List[_Check] = []
+
+        if "$ref" in node:
+            generic.append(self.ref(node["$ref"]))
+        if "enum" in node:
+            generic.append(_enum_check(node["enum"]))
+        if "const" in node:
+            generic.append(_const_check(node["const"]))
+
+        self._object_checks(node, object_checks)
+        self._array_checks(node, array_checks)
+        _string_checks(node, string_checks)
+        _number_checks(node, number_checks)
+        self._combinator_checks(node, generic)
+
+        types = _types(node)
+        type_checks = tuple(_TYPE_CHECKS[t] for t in types) if types is not None else None
+        single_type = type_checks[0] if type_checks is not None and len(type_checks) == 1 else None
+
+        def check(inst: Any, path: List[Any], errors: List[ValidationError]) -> None:
+            if single_type is not None:
+                if not single_type(inst):
+                    _error(errors, path, "type", _type_message(types, inst))
+                    return
+            elif type_checks is not None and not any(tc(inst) for tc in type_checks):
+                _error(errors, path, "type", _type_message(types, inst))
+                return
+            if isinstance(inst, dict):
+                for c in object_checks:
+                    c(inst, path, errors)
+            elif isinstance(inst, list):
+                for c in array_checks:
+                    c(inst, path, errors)
+            elif isinstance(inst, str):
+                for c in string_checks:
+                    c(inst, path, errors)
+            elif number_checks and _is_number(inst):
+                for c in number_checks:
+                    c(inst, path, errors)
+            for c in generic:
+                c(inst, path, errors)
+
+        if type_checks is None and not (generic or object_checks or array_checks or string_checks or number_checks):
+            return _no_op
+        return check
+
+    def _object_checks(self, node: Dict[str, Any], out: List[_Check]) -> None:
+        required = tuple(node.get("required", ()))
+        if required:
+            def check_required(inst, path, errors):
+                for name in required:
+                    if name not in inst:
+                        _error(errors, path, "required", f"missing required property {name!r}")
+            out.append(check_required)
+
+        properties = tuple((name, self.compile(sub)) for name, sub in node.get("properties", {}).items())
+        if properties:
+            def check_properties(inst, path, errors):
+                for name, sub_check in properties:
+                    if name in inst:
+                        path.append(name)
+                        sub_check(inst[name], path, errors)
+                        path.pop()
+            out.append(check_properties)
+
+        additional = node.get("additionalProperties", True)
+        if additional is not True:
+            known = frozenset(node.get("properties", {}))
+            additional_check = None if additional is False else self.compile(additional)
+
+            def check_additional(inst, path, errors):
+                for name in inst:
+                    if name not in known:
+                        path.append(name)
+                        if additional_check is None:
+                            _error(errors, path, "additionalProperties", "property is not allowed")
+                        else:
+                            additional_check(inst[name], path, errors)
+                        path.pop()
+            out.append(check_additional)
+
+        out.extend(_length_checks(node, "minProperties", "maxProperties", "properties"))
+
+    def _array_checks(self, node: Dict[str, Any], out: List[_Check]) -> None:
+        if "items" in node:
+            item_check = self.compile(node["items"])
+            if item_check is not _no_op:
+                def check_items(inst, path, errors):
+                    for i, item in enumerate(inst):
+                        path.append(i)
+                        item_check(item, path, errors)
+                        path.pop()
+                out.append(check_items)
+
+        out.extend(_length_checks(node, "minItems", "maxItems", "items"))
+
+        if node.get("uniqueItems"):
+            def check_unique(inst, path, errors):
+                if _has_duplicates(inst):
+                    _error(errors, path, "uniqueItems", "items are not unique")
+            out.append(check_unique)
+
+    def _combinator_checks(self, node: Dict[str, Any], out: List[_Check]) -> None:
+        out.extend(self.compile(sub) for sub in node.get("allOf", ()))
+
+        if "anyOf" in node:
+            any_of = tuple(self.compile(sub) for sub in node["anyOf"])
+            any_of_message = f"does not match any of {len(any_of)} schemas"
+
+            def check_any_of(inst, path, errors):
+                for sub_check in any_of:
+                    if _matches(sub_check, inst, path):
+                        return
+                _error(errors, path, "anyOf", any_of_message)
+            out.append(check_any_of)
+
+        if "oneOf" in node:
+            one_of = tuple(self.compile(sub) for sub in node["oneOf"])
+
+            def check_one_of(inst, path, errors):
+                matched = sum(1 for sub_check in one_of if _matches(sub_check, inst, path))
+                if matched != 1:
+                    _error(errors, path, "oneOf", _one_of_message(matched, len(one_of)))
+            out.append(check_one_of)
+
+        if "not" in node:
+            not_check = self.compile(node["not"])
+
+            def check_not(inst, path, errors):
+                if _matches(not_check, inst, path):
+                    _error(errors, path, "not", "must not match the schema")
+            out.append(check_not)
+
+
+def _matches(check: _Check, inst: Any, path: List[Any]) -> bool:
+    trial: List[ValidationError] = []
+    check(inst, path, trial)
+    return not trial
+
+
+def _enum_check(allowed: List[Any]) -> _Check:
+    # Hashable members take a set lookup; objects and arrays fall back to comparison.
+    scalars = frozenset(_freeze(v) for v in allowed if not isinstance(v, (dict, list)))
+    compound = tuple(v for v in allowed if isinstance(v, (dict, list)))
+
+    def check_enum(inst, path, errors):
+        if isinstance(inst, (dict, list)):
+            ok = any(_json_equal(inst, v) for v in compound)
+        else:
+            ok = _freeze(inst) in scalars
+        if not ok:
+            _error(errors, path, "enum", "value is not one of the allowed values")
+    return check_enum
+
+
+def _const_check(expected: Any) -> _Check:
+    def check_const(inst, path, errors):
+        if not _json_equal(inst, expected):
+            _error(errors, path, "const", "value does not equal the required constant")
+    return check_const
+
+
+def _length_checks(node: Dict[str, Any], min_key: str, max_key: str, unit: str) -> List[_Check]:
+    checks: List[_Check] = []
+    if min_key in node:
+        low = node[min_key]
+        low_message = f"expected at least {low} {unit}"
+
+        def check_min(inst, path, errors):
+            if len(inst) < low:
+                _error(errors, path, min_key, low_message)
+        checks.append(check_min)
+    if max_key in node:
+        high = node[max_key]
+        high_message = f"expected at most {high} {unit}"
+
+        def check_max(inst, path, errors):
+            if len(inst) > high:
+                _error(errors, path, max_key, high_message)
+        checks.append(check_max)
+    return checks
+
+
+def _string_checks(node: Dict[str, Any], out: List[_Check]) -> None:
+    out.extend(_length_checks(node, "minLength", "maxLength", "characters"))
+    if "pattern" in node:
+        search = re.compile(node["pattern"]).search
+        message = f"does not match pattern {node['pattern']!r}"
+
+        def check_pattern(inst, path, errors):
+            if search(inst) is None:
+                _error(errors, path, "pattern", message)
+        out.append(check_pattern)
+
+
+def _bound_check(keyword: str, limit: float, fails: Callable[[float, float], bool], message: str) -> _Check:
+    def check_bound(inst, path, errors):
+        if fails(inst, limit):
+            _error(errors, path, keyword, message)
+    return check_bound
+
+
+def _number_checks(node: Dict[str, Any], out: List[_Check]) -> None:
+    if "minimum" in node:
+        out.append(_bound_check("minimum", node["minimum"], lambda v, m: v < m, f"must be >= {node['minimum']}"))
+    if "maximum" in node:
+        out.append(_bound_check("maximum", node["maximum"], lambda v, m: v > m, f"must be <= {node['maximum']}"))
+    if "exclusiveMinimum" in node:
+        out.append(
+            _bound_check(
+                "exclusiveMinimum", node["exclusiveMinimum"], lambda v, m: v <= m, f"must be > {node['exclusiveMinimum']}"
+            )
+        )
+    if "exclusiveMaximum" in node:
+        out.append(
+            _bound_check(
+                "exclusiveMaximum", node["exclusiveMaximum"], lambda v, m: v >= m, f"must be < {node['exclusiveMaximum']}"
+            )
+        )
+    if "multipleOf" in node:
+        out.append(
+            _bound_check(
+                "multipleOf",
+                node["multipleOf"],
+                lambda v, m: not _is_multiple(v, m),
+                f"must be a multiple of {node['multipleOf']}",
+            )
+        )
+
+
+class SchemaValidator:
+    """
+    A compiled extract_schema. schema_error is set (and validate is not usable) when the
+    schema failed check_schema, so a bad stored schema is reported rather than raised.
+    """
+
+    __slots__ = ("schema_hash", "schema_error", "_check")
+
+    def __init__(self, schema_hash: str, check: _Check | None, schema_error: str | None = None):
+        self.schema_hash = schema_hash
+        self.schema_error = schema_error
+        self._check = check
+
+    def validate(self, instance: Any) -> List[ValidationError]:
+        errors: List[ValidationError] = []
+        self._check(instance, [], errors)
+        return _finish(errors)
+
+
+def schema_hash(schema: Any) -> str:
+    return sha256_hex(canonical_json(schema))
+
+
+def compile_schema(schema: Any, schema_hash_hex: str | None = None) -> SchemaValidator:
+    """Raises SchemaError for a schema outside the supported subset."""
+    check_schema(schema)
+    return SchemaValidator(schema_hash_hex or schema_hash(schema), _Compiler(schema).compile(schema))
+
+
+_cache: "OrderedDict[str, SchemaValidator]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_validator(schema: Any) -> SchemaValidator:
+    """
+    The compiled validator for schema, from an LRU of SCHEMA_VALIDATOR_CACHE_MAX_ENTRIES
+    keyed by schema hash. Never raises for a bad schema: see SchemaValidator.schema_error.
+    """
+    key = schema_hash(schema)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    try:
+        validator = compile_schema(schema, key)
+    except SchemaError as e:
+        validator = SchemaValidator(key, None, str(e))
+
+    with _cache_lock:
+        _cache[key] = validator
+        while len(_cache) > SCHEMA_VALIDATOR_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return validator
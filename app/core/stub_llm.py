@@ -1,3 +1,36 @@
+"""
+Stub LLM adapters.
+
+stub_llm is the deterministic default: a fixed payload, returned instantly.
+
+StubLLMClient adds provider-like behaviour for load testing: a latency distribution
+(fixed, normal or long-tail) plus jitter, an error rate, a malformed-JSON rate, a rate
+of prose-before-JSON answers and a payload size. Configured with STUB_LLM_* environment
+variables (see StubProfile). Outcomes are drawn as StubSampler describes.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List
+
+from app.core.llm_base import LLMClient
+from app.core.llm_stream import CompletionStream
+
+LATENCY_DISTRIBUTIONS = ("fixed", "normal", "longtail")
+# Characters per streamed delta, roughly a token.
+STREAM_CHUNK_CHARS = 4
+# What a chatty model says before (or instead of) the JSON it was asked for.
+PROSE_PREAMBLE = "Sure! Here is the JSON you asked for:\n\n"
+# Prompts whose occurrence count StubSampler remembers; the least recently sampled go first.
+SAMPLER_MAX_PROMPTS = 10000
+
+
 def stub_llm(prompt: str) -> dict:
     """
     Deterministic stub LLM adapter.
@@ -14,3 +47,218 @@ def stub_llm(prompt: str) -> dict:
             "result": "stubbed"
         }
     }
+
+
+async def astub_llm(prompt: str) -> dict:
+    """
+    Async form of stub_llm. Returns immediately with the same fixed payload.
+    """
+    return stub_llm(prompt)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class StubProfile:
+    """
+    latency_dist: "fixed" (latency_ms), "normal" (latency_ms, latency_stddev_ms) or
+    "longtail" (Pareto with scale latency_ms and shape tail_alpha; lower alpha, heavier
+    tail). jitter_ms adds uniform [0, jitter_ms). error_rate, malformed_rate and
+    prose_rate are probabilities; a prose answer puts PROSE_PREAMBLE before the JSON.
+    payload_bytes pads output_json to about that many bytes.
+    """
+
+    latency_dist: str = "fixed"
+    latency_ms: float = 0.0
+    latency_stddev_ms: float = 0.0
+    tail_alpha: float = 2.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    malformed_rate: float = 0.0
+    prose_rate: float = 0.0
+    payload_bytes: int = 0
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_dist must be one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+        for name in ("error_rate", "malformed_rate", "prose_rate"):
+            if not 0.0 <= getattr(self, name) <= 1.0:
+                raise ValueError(f"{name} must be between 0 and 1")
+        if self.tail_alpha <= 0:
+            raise ValueError("tail_alpha must be positive")
+
+    @classmethod
+    def from_env(cls) -> "StubProfile":
+        return cls(
+            latency_dist=os.getenv("STUB_LLM_LATENCY_DIST", "fixed").strip().lower(),
+            latency_ms=_env_float("STUB_LLM_LATENCY_MS", 0.0),
+            latency_stddev_ms=_env_float("STUB_LLM_LATENCY_STDDEV_MS", 0.0),
+            tail_alpha=_env_float("STUB_LLM_TAIL_ALPHA", 2.0) or 2.0,
+            jitter_ms=_env_float("STUB_LLM_JITTER_MS", 0.0),
+            error_rate=_env_float("STUB_LLM_ERROR_RATE", 0.0),
+            malformed_rate=_env_float("STUB_LLM_MALFORMED_RATE", 0.0),
+            prose_rate=_env_float("STUB_LLM_PROSE_RATE", 0.0),
+            payload_bytes=int(_env_float("STUB_LLM_PAYLOAD_BYTES", 0)),
+            seed=int(_env_float("STUB_LLM_SEED", 0)),
+        )
+
+    def is_default(self) -> bool:
+        """True when the profile behaves exactly like stub_llm."""
+        return self == StubProfile(seed=self.seed)
+
+
+@dataclass(frozen=True)
+class StubOutcome:
+    delay_ms: float
+    kind: str  # "ok" | "error" | "malformed" | "prose"
+    content: str
+
+
+class StubSampler:
+    """
+    Draws per-call outcomes for a profile. Shared by StubLLMClient and the mock server.
+
+    With a call_key, every draw comes from an RNG seeded by (seed, prompt hash, call_key),
+    so the outcome is fixed whatever order calls arrive in. Without one, the key is how
+    many times this sampler has seen the prompt, so repeats of a prompt get fresh draws;
+    concurrent repeats of the same prompt then depend on arrival order. Counts are kept
+    for the SAMPLER_MAX_PROMPTS most recent prompts, so a long-running server stays bounded.
+    """
+
+    def __init__(self, profile: StubProfile):
+        self.profile = profile
+        self._seen: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _rng(self, prompt: str, call_key: str | None) -> random.Random:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        if call_key is None:
+            with self._lock:
+                occurrence = self._seen.pop(prompt_hash, 0)
+                self._seen[prompt_hash] = occurrence + 1
+                if len(self._seen) > SAMPLER_MAX_PROMPTS:
+                    self._seen.popitem(last=False)
+            call_key = str(occurrence)
+        return random.Random(f"{self.profile.seed}:{prompt_hash}:{call_key}")
+
+    def _delay_ms(self, rng: random.Random) -> float:
+        p = self.profile
+        if p.latency_dist == "normal":
+            delay = rng.gauss(p.latency_ms, p.latency_stddev_ms)
+        elif p.latency_dist == "longtail":
+            delay = p.latency_ms * rng.paretovariate(p.tail_alpha)
+        else:
+            delay = p.latency_ms
+        if p.jitter_ms:
+            delay += rng.uniform(0, p.jitter_ms)
+        return max(0.0, delay)
+
+    def _content(self, prompt: str) -> str:
+        payload = stub_llm(prompt)
+        if self.profile.payload_bytes:
+            base = len(json.dumps(payload))
+            payload["output_json"]["padding"] = "x" * max(0, self.profile.payload_bytes - base)
+        return json.dumps(payload)
+
+    def sample(self, prompt: str, call_key: str | None = None) -> StubOutcome:
+        rng = self._rng(prompt, call_key)
+        delay_ms = self._delay_ms(rng)
+        roll = rng.random()
+        if roll < self.profile.error_rate:
+            return StubOutcome(delay_ms, "error", "")
+        content = self._content(prompt)
+        if roll < self.profile.error_rate + self.profile.malformed_rate:
+            # Cut the JSON short, as a truncated or garbled provider response would be.
+            return StubOutcome(delay_ms, "malformed", content[: max(1, len(content) // 2)])
+        if roll < self.profile.error_rate + self.profile.malformed_rate + self.profile.prose_rate:
+            return StubOutcome(delay_ms, "prose", PROSE_PREAMBLE + content)
+        return StubOutcome(delay_ms, "ok", content)
+
+
+def stream_chunks(content: str) -> List[str]:
+    """content as the deltas a streaming provider would send."""
+    return [content[i : i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+
+
+class StubLLMClient(LLMClient):
+    """
+    LLMClient over a StubProfile. Simulated errors are returned the way
+    OpenAICompatLLMClient returns an HTTP error body: unparsed text, no parsed_json,
+    so execution policy fails the step rather than the run raising.
+
+    The streaming methods spread the sampled delay evenly over the deltas, so an early
+    abort also saves the rest of the simulated generation time.
+    """
+
+    model = "stub"
+
+    def __init__(self, profile: StubProfile | None = None):
+        self.profile = profile or StubProfile()
+        self._sampler = StubSampler(self.profile)
+
+    def _result(self, outcome: StubOutcome) -> dict:
+        if outcome.kind == "error":
+            body = {"error": {"message": "simulated provider error", "type": "stub_error"}}
+            return {"raw_text": json.dumps(body), "parsed_json": None, "http_status": 500}
+        try:
+            parsed_json = json.loads(outcome.content)
+        except ValueError:
+            parsed_json = None
+        return {"raw_text": outcome.content, "parsed_json": parsed_json, "http_status": 200}
+
+    def complete(self, prompt: str) -> dict:
+        outcome = self._sampler.sample(prompt)
+        if outcome.delay_ms:
+            time.sleep(outcome.delay_ms / 1000)
+        return self._result(outcome)
+
+    async def acomplete(self, prompt: str) -> dict:
+        outcome = self._sampler.sample(prompt)
+        if outcome.delay_ms:
+            await asyncio.sleep(outcome.delay_ms / 1000)
+        return self._result(outcome)
+
+    def _stream_result(self, stream: CompletionStream) -> dict:
+        result = stream.result()
+        result["http_status"] = 200
+        return result
+
+    def complete_stream(self, prompt: str) -> dict:
+        outcome = self._sampler.sample(prompt)
+        if outcome.kind == "error":
+            if outcome.delay_ms:
+                time.sleep(outcome.delay_ms / 1000)
+            return self._result(outcome)
+        chunks = stream_chunks(outcome.content)
+        pause = outcome.delay_ms / 1000 / max(1, len(chunks))
+        stream = CompletionStream()
+        stream.model = self.model
+        for chunk in chunks:
+            if pause:
+                time.sleep(pause)
+            if not stream.add(chunk):
+                break
+        return self._stream_result(stream)
+
+    async def acomplete_stream(self, prompt: str) -> dict:
+        outcome = self._sampler.sample(prompt)
+        if outcome.kind == "error":
+            if outcome.delay_ms:
+                await asyncio.sleep(outcome.delay_ms / 1000)
+            return self._result(outcome)
+        chunks = stream_chunks(outcome.content)
+        pause = outcome.delay_ms / 1000 / max(1, len(chunks))
+        stream = CompletionStream()
+        stream.model = self.model
+        for chunk in chunks:
+            if pause:
+                await asyncio.sleep(pause)
+            if not stream.add(chunk):
+                break
+        return self._stream_result(stream)
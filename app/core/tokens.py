@@ -0,0 +1,112 @@
+"""
+Offline prompt token estimation.
+
+Estimates are heuristic and never call a provider: they exist to record prompt sizes
+(PromptArtifact.token_estimate) and to enforce per-step budgets before a model call.
+Estimators are registered per model family ("openai", "stub", ...); the family is the
+provider prefix of llm_model_name(). Results are cached per (family, prompt hash).
+"""
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.core.json_utils import sha256_hex
+
+TOKEN_ESTIMATE_CACHE_MAX_ENTRIES = 4096
+
+TokenEstimator = Callable[[str], int]
+
+# Roughly how BPE vocabularies split text: runs of letters (with a leading space),
+# runs of up to three digits, and individual punctuation/symbol characters.
+_PIECE_RE = re.compile(r" ?[^\W\d_]+| ?\d{1,3}|\s+|[^\w\s]", re.UNICODE)
+
+
+def estimate_chars(text: str) -> int:
+    """About four characters per token; the fallback for unknown families."""
+    return math.ceil(len(text) / 4)
+
+
+def estimate_bpe(text: str) -> int:
+    """
+    Approximates cl100k/o200k-style tokenizers without their vocabularies: each piece
+    costs one token, plus one per further four characters of a long word. Non-ASCII
+    pieces are costed per UTF-8 byte pair, as byte-level BPE tends to split them.
+    """
+    count = 0
+    for piece in _PIECE_RE.findall(text):
+        if piece.isascii():
+            count += 1 + max(0, len(piece.strip()) - 1) // 4
+        else:
+            count += math.ceil(len(piece.encode("utf-8")) / 2)
+    return count
+
+
+_estimators: Dict[str, TokenEstimator] = {
+    "default": estimate_chars,
+    "openai": estimate_bpe,
+    "stub": estimate_bpe,
+}
+_estimators_lock = threading.Lock()
+
+
+def register_estimator(family: str, estimator: TokenEstimator) -> None:
+    """Register or replace the estimator for a model family."""
+    with _estimators_lock:
+        _estimators[family] = estimator
+    with _cache_lock:
+        for key in [k for k in _cache if k[0] == family]:
+            del _cache[key]
+
+
+def model_family(model_name: str) -> str:
+    return model_name.split(":", 1)[0].lower()
+
+
+def _estimator_for(family: str) -> TokenEstimator:
+    return _estimators.get(family) or _estimators["default"]
+
+
+_cache: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def estimate_tokens(model_name: str, text: str, text_hash: str | None = None) -> int:
+    """
+    Estimated token count of text for model_name. Pass text_hash (any stable digest of
+    text, e.g. the step's input_hash) to skip re-hashing on the cache path.
+    """
+    family = model_family(model_name)
+    key = (family, text_hash or sha256_hex(text))
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    estimate = _estimator_for(family)(text)
+
+    with _cache_lock:
+        _cache[key] = estimate
+        while len(_cache) > TOKEN_ESTIMATE_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return estimate
+
+
+def prompt_token_budget(config: Any) -> int | None:
+    """The step's config.max_prompt_tokens, if set."""
+    if isinstance(config, dict):
+        return config.get("max_prompt_tokens")
+    return None
+
+
+def validate_token_budget(step_key: str, config: Any) -> List[str]:
+    """Static check run when a manifest is compiled. Returns error messages."""
+    if not isinstance(config, dict) or "max_prompt_tokens" not in config:
+        return []
+    budget = config["max_prompt_tokens"]
+    if isinstance(budget, bool) or not isinstance(budget, int) or budget <= 0:
+        return [f"step '{step_key}': config.max_prompt_tokens must be a positive integer"]
+    return []
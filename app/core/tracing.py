@@ -0,0 +1,243 @@
+"""
+Span-based tracing of runs.
+
+Each DagRun gets a trace (dag_runs.trace_id). One runner pass over a run is a root
+span; every step run is a child span, with children of its own for prompt rendering,
+the model call and policy evaluation. Commits issued while a pass is running are spans
+under the root.
+
+Spans of a trace are buffered in memory and handed to the exporter together when the
+root span ends. Tracing is off unless TRACE_EXPORTER is set; the helpers then accept
+and return None. TRACE_EXPORTER=file appends OTLP/JSON (ExportTraceServiceRequest)
+lines to TRACE_FILE_PATH, which OTLP-aware tools and timeline viewers can load.
+"""
+import json
+import os
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+SERVICE_NAME = "reckoning-machine"
+
+_STATUS_CODES = {"UNSET": 0, "OK": 1, "ERROR": 2}
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    name: str
+    start_ns: int
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    end_ns: int | None = None
+    status: str = "UNSET"
+    status_message: str | None = None
+    # Shared by every span of the trace; exported when the root ends.
+    _buffer: List["Span"] = field(default_factory=list, repr=False)
+
+    def child(self, name: str, **attributes: Any) -> "Span":
+        span = Span(
+            trace_id=self.trace_id,
+            span_id=_new_span_id(),
+            parent_span_id=self.span_id,
+            name=name,
+            start_ns=time.time_ns(),
+            attributes=attributes,
+            _buffer=self._buffer,
+        )
+        return span
+
+    def end(self, status: str | None = None, message: str | None = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if status is not None:
+            self.status = status
+            self.status_message = message
+        self._buffer.append(self)
+        if self.parent_span_id is None:
+            exporter = get_exporter()
+            if exporter is not None:
+                exporter.export(list(self._buffer))
+            self._buffer.clear()
+
+
+class SpanExporter(ABC):
+    @abstractmethod
+    def export(self, spans: List[Span]) -> None:
+        """Receives every finished span of one trace, root last."""
+
+
+class JsonlFileExporter(SpanExporter):
+    """Appends one OTLP/JSON ExportTraceServiceRequest per trace to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        line = json.dumps(to_otlp_json(spans), separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+def to_otlp_json(spans: List[Span]) -> Dict[str, Any]:
+    otlp_spans = []
+    for s in spans:
+        span = {
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": _otlp_attributes(s.attributes),
+            "status": {"code": _STATUS_CODES[s.status]},
+        }
+        if s.parent_span_id:
+            span["parentSpanId"] = s.parent_span_id
+        if s.status_message:
+            span["status"]["message"] = s.status_message
+        otlp_spans.append(span)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+                "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": otlp_spans}],
+            }
+        ]
+    }
+
+
+_exporter: SpanExporter | None = None
+_exporter_configured = False
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> SpanExporter | None:
+    global _exporter, _exporter_configured
+    if not _exporter_configured:
+        with _exporter_lock:
+            if not _exporter_configured:
+                kind = os.getenv("TRACE_EXPORTER", "none").strip().lower()
+                if kind == "file":
+                    _exporter = JsonlFileExporter(os.getenv("TRACE_FILE_PATH", "traces.jsonl"))
+                _exporter_configured = True
+    return _exporter
+
+
+def set_exporter(exporter: SpanExporter | None) -> None:
+    """Install another exporter, or None to disable tracing."""
+    global _exporter, _exporter_configured
+    with _exporter_lock:
+        _exporter = exporter
+        _exporter_configured = True
+
+
+def tracing_enabled() -> bool:
+    return get_exporter() is not None
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def _new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+def start_trace(name: str, trace_id: str | None, **attributes: Any) -> Span | None:
+    """Root span of a trace; None when tracing is disabled or trace_id is unset."""
+    if trace_id is None or not tracing_enabled():
+        return None
+    return Span(
+        trace_id=trace_id,
+        span_id=_new_span_id(),
+        parent_span_id=None,
+        name=name,
+        start_ns=time.time_ns(),
+        attributes=attributes,
+    )
+
+
+def start_span(parent: Span | None, name: str, **attributes: Any) -> Span | None:
+    return parent.child(name, **attributes) if parent is not None else None
+
+
+def end_span(span: Span | None, status: str | None = None, message: str | None = None, **attributes: Any) -> None:
+    if span is not None:
+        span.attributes.update(attributes)
+        span.end(status, message)
+
+
+@contextmanager
+def span(parent: Span | None, name: str, **attributes: Any) -> Iterator[Span | None]:
+    """A child span around a block; exceptions mark it ERROR and propagate."""
+    child = start_span(parent, name, **attributes)
+    try:
+        yield child
+    except BaseException as e:
+        end_span(child, "ERROR", f"{type(e).__name__}: {e}")
+        raise
+    end_span(child)
+
+
+_SESSION_SPAN = "trace_span"
+_COMMIT_SPAN = "trace_commit_span"
+
+
+@contextmanager
+def traced_session(db: Session, parent: Span | None) -> Iterator[None]:
+    """Record a span for every commit of db issued inside the block."""
+    if parent is None:
+        yield
+        return
+    db.info[_SESSION_SPAN] = parent
+    try:
+        yield
+    finally:
+        db.info.pop(_SESSION_SPAN, None)
+        db.info.pop(_COMMIT_SPAN, None)
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session: Session) -> None:
+    parent = session.info.get(_SESSION_SPAN)
+    if parent is not None:
+        session.info[_COMMIT_SPAN] = parent.child("db.commit")
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    end_span(session.info.pop(_COMMIT_SPAN, None))
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    end_span(session.info.pop(_COMMIT_SPAN, None), "ERROR", "rolled back")
@@ -1,8 +1,10 @@
+import uuid
 from typing import List, Optional
 from uuid import UUID
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import select
+from app.core.plan import cache_plan, compile_plan
 from . import models
 from . import schemas
 
@@ -76,29 +78,42 @@ def replace_manifest_steps(
     manifest_id: UUID,
     steps_in: List[schemas.ManifestStepCreate],
 ) -> List[models.ManifestStep]:
+    """
+    Replace all steps of a manifest. The steps are compiled into an execution plan
+    first; a malformed graph raises PlanError and nothing is written.
+    """
     manifest = db.get(models.Manifest, manifest_id)
     if not manifest:
         return []
 
+    rows = []
+    for order, step_in in enumerate(steps_in):
+        data = step_in.dict()
+        data["id"] = uuid.uuid4()
+        data["manifest_id"] = manifest_id
+        data["order_index"] = data.get("order_index") if data.get("order_index") is not None else order
+        rows.append(data)
+
+    plan = compile_plan(manifest_id, rows)
+
     try:
         db.query(models.ManifestStep).filter(models.ManifestStep.manifest_id == manifest_id).delete()
 
         steps: List[models.ManifestStep] = []
-        for order, step_in in enumerate(steps_in):
-            data = step_in.dict()
-            data["manifest_id"] = manifest_id
-            data["order_index"] = data.get("order_index") if data.get("order_index") is not None else order
+        for data in rows:
             step = models.ManifestStep(**data)
             db.add(step)
             steps.append(step)
 
+        manifest.plan_hash = plan.content_hash
         db.commit()
 
         for s in steps:
             db.refresh(s)
 
-        return steps
-
     except Exception:
         db.rollback()
         raise
+
+    cache_plan(plan)
+    return steps
@@ -1,10 +1,10 @@
 import uuid
 from sqlalchemy import (
-    Column, String, Text, Integer, ForeignKey, DateTime, UniqueConstraint, Index
+    Column, String, Text, Integer, BigInteger, Boolean, ForeignKey, DateTime, UniqueConstraint, Index
 )
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from .session import Base
 
 class Task(Base):
@@ -22,6 +22,8 @@ class Manifest(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(Text, unique=True, nullable=False)
     description = Column(Text)
+    llm_cache_enabled = Column(Boolean, nullable=False, default=True, server_default=text("true"))
+    plan_hash = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -54,9 +56,43 @@ class DagRun(Base):
     ended_at = Column(DateTime(timezone=True))
     initiated_by = Column(Text)
     run_params = Column(JSONB)
-    __table_args__ = (Index('ix_dag_runs_manifest_id', 'manifest_id'),)
+    plan_hash = Column(Text)
+    # W3C/OTLP trace id (32 hex chars) of the spans exported for this run.
+    trace_id = Column(Text)
+    batch_id = Column(UUID(as_uuid=True), ForeignKey("run_batches.id"))
+    # Set by an attestation under AUTO_RESUME_ON_ATTEST; cleared when the run resumes.
+    resume_requested_at = Column(DateTime(timezone=True))
+    # Worker lease on a claimed run: renewed while the worker executes it, and a run
+    # whose heartbeat is older than RUN_LEASE_SECONDS is reclaimed (see run_queue).
+    claimed_by = Column(Text)
+    heartbeat_at = Column(DateTime(timezone=True))
+    __table_args__ = (
+        Index('ix_dag_runs_manifest_id', 'manifest_id'),
+        Index('ix_dag_runs_queued', 'created_at', 'id', postgresql_where=text("status = 'queued'")),
+        Index('ix_dag_runs_created_at_id', 'created_at', 'id'),
+        Index('ix_dag_runs_status_created_at_id', 'status', 'created_at', 'id'),
+        Index('ix_dag_runs_manifest_id_created_at_id', 'manifest_id', 'created_at', 'id'),
+        Index('ix_dag_runs_initiated_by_created_at_id', 'initiated_by', 'created_at', 'id'),
+        Index('ix_dag_runs_batch_id_status', 'batch_id', 'status'),
+        Index(
+            'ix_dag_runs_running_heartbeat', 'heartbeat_at',
+            postgresql_where=text("status = 'running' and heartbeat_at is not null"),
+        ),
+        Index(
+            'ix_dag_runs_resume_requested', 'resume_requested_at', 'id',
+            postgresql_where=text("status = 'waiting' and resume_requested_at is not null"),
+        ),
+    )
     manifest = relationship("Manifest")
 
+class RunBatch(Base):
+    __tablename__ = "run_batches"
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    manifest_id = Column(UUID(as_uuid=True), ForeignKey("manifests.id"), nullable=False)
+    initiated_by = Column(Text)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
 class DagStepRun(Base):
     __tablename__ = "dag_step_runs"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -70,6 +106,7 @@ class DagStepRun(Base):
     decision_rationale = Column(JSONB)
     execution_policy_report = Column(JSONB)
     canonical_output = Column(JSONB)
+    timings = Column(JSONB)
     __table_args__ = (Index('ix_dag_step_runs_dag_run_id', 'dag_run_id'),)
     dag_run = relationship("DagRun")
     manifest_step = relationship("ManifestStep")
@@ -79,7 +116,13 @@ class PromptArtifact(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     step_run_id = Column(UUID(as_uuid=True), ForeignKey("dag_step_runs.id", ondelete="CASCADE"), nullable=False)
     rendered_prompt = Column(Text)
+    # Set when rendered_prompt was offloaded to the blob store (rendered_prompt is NULL).
+    rendered_prompt_sha256 = Column(Text)
+    rendered_prompt_bytes = Column(Integer)
     context = Column(JSONB)
+    # Set when context was offloaded to the blob store (context is NULL).
+    context_sha256 = Column(Text)
+    context_bytes = Column(Integer)
     token_estimate = Column(Integer)
     step_run = relationship("DagStepRun")
 
@@ -91,7 +134,14 @@ class LLMCallArtifact(Base):
     model = Column(Text)
     request_json = Column(JSONB)
     response_json = Column(JSONB)
+    response_sha256 = Column(Text)
+    response_bytes = Column(Integer)
     latency_ms = Column(Integer)
+    connect_wait_ms = Column(Integer)
+    usage = Column(JSONB)
+    cache_status = Column(Text)
+    # LLM_ROUTER_CONFIG endpoint that served the call.
+    endpoint = Column(Text)
     step_run = relationship("DagStepRun")
 
 class ParsedOutputArtifact(Base):
@@ -99,6 +149,53 @@ class ParsedOutputArtifact(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     step_run_id = Column(UUID(as_uuid=True), ForeignKey("dag_step_runs.id", ondelete="CASCADE"), nullable=False)
     output_text = Column(Text)
+    output_text_sha256 = Column(Text)
+    output_text_bytes = Column(Integer)
     output_json = Column(JSONB)
     extraction_report = Column(JSONB)
     step_run = relationship("DagStepRun")
+
+class ComputeAttestation(Base):
+    __tablename__ = "compute_attestations"
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    step_run_id = Column(UUID(as_uuid=True), ForeignKey("dag_step_runs.id", ondelete="CASCADE"), nullable=False, unique=True)
+    attested_by = Column(Text, nullable=False)
+    attested_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    outcome = Column(Text, nullable=False)  # "SUCCESS" or "FAIL"
+    notes = Column(Text)
+    contract_snapshot = Column(JSONB(none_as_null=True))
+
+class ComputeArtifact(Base):
+    __tablename__ = "compute_artifacts"
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    attestation_id = Column(UUID(as_uuid=True), ForeignKey("compute_attestations.id", ondelete="CASCADE"), nullable=False)
+    name = Column(Text, nullable=False)
+    uri = Column(Text, nullable=False)
+    sha256 = Column(Text)
+    bytes = Column(BigInteger)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class LLMResponseCacheEntry(Base):
+    __tablename__ = "llm_response_cache"
+    input_hash = Column(Text, primary_key=True)
+    response = Column(JSONB, nullable=False)
+    source_step_run_id = Column(UUID(as_uuid=True), ForeignKey("dag_step_runs.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_hit_at = Column(DateTime(timezone=True))
+    hit_count = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    __table_args__ = (
+        Index('ix_llm_response_cache_created_at', 'created_at'),
+        Index('ix_llm_response_cache_last_used', func.coalesce(last_hit_at, created_at)),
+    )
+
+class RunEvent(Base):
+    __tablename__ = "run_events"
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    dag_run_id = Column(UUID(as_uuid=True), ForeignKey("dag_runs.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(Text, nullable=False)
+    status = Column(Text, nullable=False)
+    step_run_id = Column(UUID(as_uuid=True))
+    manifest_step_id = Column(UUID(as_uuid=True))
+    step_key = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    __table_args__ = (Index('ix_run_events_dag_run_id_id', 'dag_run_id', 'id'),)
@@ -1,11 +1,26 @@
 from typing import Optional, List, Union
 from uuid import UUID
 from datetime import datetime
-from pydantic import BaseModel, Field, root_validator
+from pydantic import BaseModel, Field, root_validator, validator
+
+from app.core.prompting import compile_template, complete_template
+from app.core.schema_validation import check_schema
 
 JsonType = Union[dict, list, None]
 
 # --- Task Schemas ---
+def _check_prompt_template(value: Optional[str]) -> Optional[str]:
+    # Stored completed, so the task shows the prompt that will actually be rendered.
+    if value:
+        value = complete_template(value)
+        compile_template(value)
+    return value
+
+def _check_extract_schema(value: Optional[JsonType]) -> Optional[JsonType]:
+    if value is not None:
+        check_schema(value)
+    return value
+
 class TaskBase(BaseModel):
     name: str
     description: Optional[str] = None
@@ -13,13 +28,27 @@ class TaskBase(BaseModel):
     extract_schema: Optional[JsonType] = None
 
 class TaskCreate(TaskBase):
-    pass
+    @validator("prompt_template")
+    def validate_prompt_template(cls, value):
+        return _check_prompt_template(value)
+
+    @validator("extract_schema")
+    def validate_extract_schema(cls, value):
+        return _check_extract_schema(value)
 
 class TaskUpdate(BaseModel):
     description: Optional[str] = None
     prompt_template: Optional[str] = None
     extract_schema: Optional[JsonType] = None
 
+    @validator("prompt_template")
+    def validate_prompt_template(cls, value):
+        return _check_prompt_template(value)
+
+    @validator("extract_schema")
+    def validate_extract_schema(cls, value):
+        return _check_extract_schema(value)
+
 class TaskRead(TaskBase):
     id: UUID
     created_at: datetime
@@ -32,12 +61,14 @@ class TaskRead(TaskBase):
 class ManifestBase(BaseModel):
     name: str
     description: Optional[str] = None
+    llm_cache_enabled: bool = True
 
 class ManifestCreate(ManifestBase):
     pass
 
 class ManifestUpdate(BaseModel):
     description: Optional[str] = None
+    llm_cache_enabled: Optional[bool] = None
 
 class ManifestRead(ManifestBase):
     id: UUID
@@ -132,5 +163,33 @@ class ComputeAttestIn(BaseModel):
         return values
 
 
+class BulkAttestationItem(ComputeAttestIn):
+    run_id: UUID
+    step_run_id: UUID
+
+
+class BulkAttestIn(BaseModel):
+    items: List[BulkAttestationItem]
+    resume: bool = False
+
+    @validator("items")
+    def validate_items(cls, v):
+        if not v:
+            raise ValueError("items must contain at least one attestation")
+        return v
+
+
 class ResumeRunIn(BaseModel):
     initiated_by: Optional[str] = None
+
+
+class RunBatchIn(BaseModel):
+    manifest_id: UUID
+    run_params: List[dict]
+    initiated_by: Optional[str] = None
+
+    @validator("run_params")
+    def validate_run_params(cls, v):
+        if not v:
+            raise ValueError("run_params must contain at least one object")
+        return v
@@ -1,12 +1,40 @@
+import time
 from pathlib import Path
 
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 
+from app.core.metrics import API_REQUEST_DURATION, register_queue_depth_collector, render_latest
+
 app = FastAPI(title="Reckoning Machine")
 
 
+# -----------------------------
+# Metrics
+# -----------------------------
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not raw path, so run ids do not explode cardinality.
+    route = request.scope.get("route")
+    if route is not None and hasattr(route, "path") and route.path != "/metrics":
+        API_REQUEST_DURATION.labels(request.method, route.path, str(response.status_code)).observe(
+            time.perf_counter() - started
+        )
+    return response
+
+
+register_queue_depth_collector()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+
 # -----------------------------
 # Health + version
 # -----------------------------
@@ -0,0 +1,194 @@
+"""
+Local OpenAI-compatible mock provider.
+
+Serves POST /v1/chat/completions (and /chat/completions) with the same latency,
+error, malformed-JSON, prose and payload-size knobs as StubLLMClient, so
+OpenAICompatLLMClient can be load-tested end to end without network access. Requests
+with "stream": true get an SSE stream of STREAM_CHUNK_CHARS-character deltas, with the
+sampled delay spread over them and a final usage chunk:
+
+    python -m app.mock_llm_server --port 8089 --latency-dist longtail --latency-ms 200
+    LLM_PROVIDER=openai LLM_BASE_URL=http://127.0.0.1:8089/v1 LLM_API_KEY=mock ...
+
+Defaults come from the STUB_LLM_* environment variables; flags override them. A request
+with an X-Stub-Call-Key header gets the outcome fixed by that key and its prompt (see
+StubSampler); otherwise repeats of a prompt draw in arrival order.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.core.stub_llm import LATENCY_DISTRIBUTIONS, StubOutcome, StubProfile, StubSampler, stream_chunks
+from app.core.tokens import estimate_bpe
+
+logger = logging.getLogger("reckoning_machine.mock_llm")
+
+COMPLETION_PATHS = {"/v1/chat/completions", "/chat/completions"}
+
+
+def _completion_body(model: str, prompt: str, content: str) -> dict:
+    prompt_tokens = estimate_bpe(prompt)
+    completion_tokens = estimate_bpe(content)
+    return {
+        "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _chunk_body(completion_id: str, model: str, delta: dict, finish_reason=None, usage=None) -> dict:
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [] if usage is not None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        "usage": usage,
+    }
+
+
+class MockCompletionsHandler(BaseHTTPRequestHandler):
+    sampler: StubSampler  # set on the server-specific subclass
+    protocol_version = "HTTP/1.1"  # keep-alive, as real providers
+
+    def log_message(self, fmt, *args):
+        logger.debug("%s - %s", self.address_string(), fmt % args)
+
+    def _send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_stream(self, model: str, prompt: str, outcome: StubOutcome) -> None:
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        chunks = stream_chunks(outcome.content)
+        pause = outcome.delay_ms / 1000 / max(1, len(chunks))
+        events = [_chunk_body(completion_id, model, {"role": "assistant", "content": ""})]
+        events.extend(_chunk_body(completion_id, model, {"content": c}) for c in chunks)
+        events.append(_chunk_body(completion_id, model, {}, finish_reason="stop"))
+        events.append(_chunk_body(completion_id, model, {}, usage=_completion_body(model, prompt, outcome.content)["usage"]))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, event in enumerate(events):
+                if pause and 0 < i <= len(chunks):
+                    time.sleep(pause)
+                self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client aborted the stream.
+            self.close_connection = True
+
+    def do_GET(self):
+        if self.path in {"/health", "/v1/models"}:
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length)
+        if self.path not in COMPLETION_PATHS:
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        try:
+            request = json.loads(raw)
+            prompt = "\n".join(m.get("content") or "" for m in request.get("messages") or [])
+        except (ValueError, AttributeError):
+            self._send_json(400, {"error": {"message": "invalid JSON body", "type": "invalid_request_error"}})
+            return
+
+        outcome = self.sampler.sample(prompt, self.headers.get("X-Stub-Call-Key"))
+        if request.get("stream") and outcome.kind != "error":
+            self._send_stream(request.get("model") or "mock", prompt, outcome)
+            return
+        if outcome.delay_ms:
+            time.sleep(outcome.delay_ms / 1000)
+
+        if outcome.kind == "error":
+            self._send_json(500, {"error": {"message": "simulated provider error", "type": "server_error"}})
+            return
+        self._send_json(200, _completion_body(request.get("model") or "mock", prompt, outcome.content))
+
+
+def make_server(host: str, port: int, profile: StubProfile) -> ThreadingHTTPServer:
+    handler = type("BoundMockCompletionsHandler", (MockCompletionsHandler,), {"sampler": StubSampler(profile)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None) -> None:
+    env = StubProfile.from_env()
+    parser = argparse.ArgumentParser(prog="python -m app.mock_llm_server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("MOCK_LLM_PORT", "8089")))
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default=env.latency_dist)
+    parser.add_argument("--latency-ms", type=float, default=env.latency_ms)
+    parser.add_argument("--latency-stddev-ms", type=float, default=env.latency_stddev_ms)
+    parser.add_argument("--tail-alpha", type=float, default=env.tail_alpha)
+    parser.add_argument("--jitter-ms", type=float, default=env.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=env.error_rate)
+    parser.add_argument("--malformed-rate", type=float, default=env.malformed_rate)
+    parser.add_argument("--prose-rate", type=float, default=env.prose_rate)
+    parser.add_argument("--payload-bytes", type=int, default=env.payload_bytes)
+    parser.add_argument("--seed", type=int, default=env.seed)
+    args = parser.parse_args(argv)
+
+    profile = replace(
+        env,
+        latency_dist=args.latency_dist,
+        latency_ms=args.latency_ms,
+        latency_stddev_ms=args.latency_stddev_ms,
+        tail_alpha=args.tail_alpha,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        prose_rate=args.prose_rate,
+        payload_bytes=args.payload_bytes,
+        seed=args.seed,
+    )
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(levelname)-5.5s [%(name)s] %(message)s")
+    server = make_server(args.host, args.port, profile)
+    logger.info("mock LLM provider on http://%s:%d/v1 (%s)", args.host, args.port, profile)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
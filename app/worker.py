@@ -0,0 +1,350 @@
+"""
+Background run worker.
+
+Claims queued DagRuns and executes them outside the API process:
+
+    python -m app.worker
+
+RUN_WORKER_CONCURRENCY sets the number of runs executed at once by this process.
+Start several processes to scale further; claims never overlap.
+
+RUN_WORKER_MODE=async executes claimed runs on a single asyncio event loop instead of
+one thread per run, with LLM_ASYNC_MAX_INFLIGHT bounding model calls across all of
+them. Use it when RUN_WORKER_CONCURRENCY needs to be in the hundreds.
+
+RUN_WORKER_METRICS_PORT, when set, serves this process's Prometheus metrics.
+
+Claimed runs are leased: a heartbeat thread renews heartbeat_at on every run this
+process is executing each RUN_HEARTBEAT_SECONDS, and any worker reclaims runs whose
+heartbeat is older than RUN_LEASE_SECONDS (see run_queue.reclaim_expired_runs), so a
+killed worker does not strand its runs in `running`.
+
+With AUTO_RESUME_ON_ATTEST on, workers also resume runs whose compute steps have all
+been attested, ahead of new queued runs. A LISTEN on the resume channel wakes idle
+workers as soon as an attestation commits rather than at the next poll.
+"""
+import asyncio
+import datetime
+import logging
+import os
+import signal
+import threading
+
+from app.core.async_runner import default_max_inflight, execute_claimed_run_async, resume_claimed_run_async
+from app.core.events import record_run_events, run_event
+from app.core.metrics import start_worker_metrics_server
+from app.core.run_queue import (
+    auto_resume_enabled,
+    claim_next_run,
+    claim_resume_request,
+    drop_resume_request,
+    heartbeat_runs,
+    listen_for_resume_requests,
+    run_lease_seconds,
+    worker_id,
+)
+from app.core.runner import execute_claimed_run, resume_run
+from app.db import models
+from app.db.session import SessionLocal
+
+logger = logging.getLogger("reckoning_machine.worker")
+
+WORKER_ID = worker_id()
+
+# Runs this process is executing; the heartbeat thread renews their leases.
+_owned_runs: set = set()
+_owned_lock = threading.Lock()
+
+
+def _own(run_id) -> None:
+    with _owned_lock:
+        _owned_runs.add(run_id)
+
+
+def _disown(run_id) -> None:
+    with _owned_lock:
+        _owned_runs.discard(run_id)
+
+
+def heartbeat_loop(stop: threading.Event, interval_seconds: float) -> None:
+    while not stop.wait(interval_seconds):
+        with _owned_lock:
+            run_ids = list(_owned_runs)
+        if not run_ids:
+            continue
+        db = SessionLocal()
+        try:
+            heartbeat_runs(db, run_ids, WORKER_ID)
+        except Exception:
+            logger.exception("heartbeat failed")
+        finally:
+            db.close()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def resume_once() -> bool:
+    """
+    Resume at most one run with a pending resume request. Returns False when there was none.
+    """
+    db = SessionLocal()
+    try:
+        run_id = claim_resume_request(db)
+        if run_id is None:
+            return False
+
+        logger.info("resuming run %s", run_id)
+        _own(run_id)
+        try:
+            resume_run(run_id, db, claimed_by=WORKER_ID)
+        except Exception:
+            logger.exception("run %s raised during resume", run_id)
+            _after_failed_resume(db, run_id)
+        finally:
+            _disown(run_id)
+        return True
+    finally:
+        db.close()
+
+
+def work_once() -> bool:
+    """
+    Claim and execute at most one queued run, resuming a run first when auto-resume is
+    on and one is pending. Returns False when there was nothing to do.
+    """
+    if auto_resume_enabled() and resume_once():
+        return True
+
+    db = SessionLocal()
+    try:
+        run_id = claim_next_run(db, WORKER_ID)
+        if run_id is None:
+            return False
+
+        logger.info("executing run %s", run_id)
+        _own(run_id)
+        try:
+            execute_claimed_run(run_id, db)
+        except Exception:
+            logger.exception("run %s raised during execution", run_id)
+            _mark_run_error(db, run_id)
+        finally:
+            _disown(run_id)
+        return True
+    finally:
+        db.close()
+
+
+def _claim_one():
+    db = SessionLocal()
+    try:
+        run_id = claim_next_run(db, WORKER_ID)
+    finally:
+        db.close()
+    if run_id is not None:
+        _own(run_id)
+    return run_id
+
+
+def _claim_resume_one():
+    # The session stays open, holding the run's row lock, until resume_claimed_run_async
+    # commits the transition and closes it.
+    db = SessionLocal()
+    try:
+        run_id = claim_resume_request(db)
+    except Exception:
+        db.close()
+        raise
+    if run_id is None:
+        db.close()
+        return None
+    return db, run_id
+
+
+def _mark_run_error_in_new_session(run_id) -> None:
+    db = SessionLocal()
+    try:
+        _mark_run_error(db, run_id)
+    finally:
+        db.close()
+
+
+def _after_failed_resume_in_new_session(run_id) -> None:
+    db = SessionLocal()
+    try:
+        _after_failed_resume(db, run_id)
+    finally:
+        db.close()
+
+
+def _after_failed_resume(db, run_id) -> None:
+    # Failed before the transition (e.g. the manifest changed): the run stays waiting for
+    # an operator and its request is dropped. Failed after it: as any crashed run.
+    _mark_run_error(db, run_id)
+    drop_resume_request(db, run_id)
+
+
+def _mark_run_error(db, run_id) -> None:
+    # A crashed run must not stay `running` forever; record it as a terminal error.
+    db.rollback()
+    dag_run = db.get(models.DagRun, run_id)
+    if dag_run is not None and dag_run.status == "running":
+        dag_run.status = "error"
+        dag_run.ended_at = datetime.datetime.now(datetime.timezone.utc)
+        record_run_events(db, run_id, [run_event("error")])
+        db.commit()
+
+
+def worker_loop(stop: threading.Event, wake: threading.Event, poll_seconds: float) -> None:
+    while not stop.is_set():
+        try:
+            claimed = work_once()
+        except Exception:
+            logger.exception("worker iteration failed")
+            claimed = False
+        if not claimed:
+            wake.wait(poll_seconds)
+            wake.clear()
+
+
+async def _execute_async(run_id, semaphore: asyncio.Semaphore) -> None:
+    # _claim_one has already taken ownership for the heartbeat.
+    logger.info("executing run %s", run_id)
+    try:
+        await execute_claimed_run_async(run_id, semaphore)
+    except Exception:
+        logger.exception("run %s raised during execution", run_id)
+        await asyncio.to_thread(_mark_run_error_in_new_session, run_id)
+    finally:
+        _disown(run_id)
+
+
+async def _resume_async(db, run_id, semaphore: asyncio.Semaphore) -> None:
+    logger.info("resuming run %s", run_id)
+    _own(run_id)
+    try:
+        await resume_claimed_run_async(db, run_id, semaphore, claimed_by=WORKER_ID)
+    except Exception:
+        logger.exception("run %s raised during resume", run_id)
+        await asyncio.to_thread(_after_failed_resume_in_new_session, run_id)
+    finally:
+        _disown(run_id)
+
+
+async def async_worker_loop(
+    stop: threading.Event,
+    wake: threading.Event,
+    concurrency: int,
+    poll_seconds: float,
+) -> None:
+    semaphore = asyncio.Semaphore(default_max_inflight())
+    running: set[asyncio.Task] = set()
+    auto_resume = auto_resume_enabled()
+
+    while not stop.is_set():
+        claimed = False
+        while auto_resume and len(running) < concurrency:
+            try:
+                resume = await asyncio.to_thread(_claim_resume_one)
+            except Exception:
+                logger.exception("resume claim failed")
+                resume = None
+            if resume is None:
+                break
+            claimed = True
+            task = asyncio.create_task(_resume_async(*resume, semaphore))
+            running.add(task)
+            task.add_done_callback(running.discard)
+
+        while len(running) < concurrency:
+            try:
+                run_id = await asyncio.to_thread(_claim_one)
+            except Exception:
+                logger.exception("claim failed")
+                run_id = None
+            if run_id is None:
+                break
+            claimed = True
+            task = asyncio.create_task(_execute_async(run_id, semaphore))
+            running.add(task)
+            task.add_done_callback(running.discard)
+
+        if claimed:
+            await asyncio.sleep(0)
+        else:
+            await asyncio.to_thread(wake.wait, poll_seconds)
+            wake.clear()
+
+    if running:
+        await asyncio.gather(*running)
+
+
+def main() -> None:
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(levelname)-5.5s [%(name)s] %(message)s")
+
+    concurrency = _env_int("RUN_WORKER_CONCURRENCY", 1)
+    poll_seconds = _env_float("RUN_WORKER_POLL_SECONDS", 1.0)
+
+    metrics_port = start_worker_metrics_server()
+    if metrics_port:
+        logger.info("serving metrics on port %d", metrics_port)
+
+    stop = threading.Event()
+    wake = threading.Event()
+
+    def _stop(*_):
+        stop.set()
+        wake.set()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    # Well inside the lease, so one slow heartbeat does not lose it. Heartbeats outlive
+    # `stop`: in-flight runs keep their leases until they finish.
+    heartbeat_seconds = _env_float("RUN_HEARTBEAT_SECONDS", run_lease_seconds() / 4)
+    heartbeat_stop = threading.Event()
+    threading.Thread(
+        target=heartbeat_loop, args=(heartbeat_stop, heartbeat_seconds), name="run-heartbeat", daemon=True
+    ).start()
+
+    if auto_resume_enabled():
+        threading.Thread(
+            target=listen_for_resume_requests, args=(stop, wake), name="resume-listener", daemon=True
+        ).start()
+        logger.info("auto-resume on: listening for resume requests")
+
+    try:
+        if os.getenv("RUN_WORKER_MODE", "thread").strip().lower() == "async":
+            logger.info("started async run worker (concurrency %d)", concurrency)
+            asyncio.run(async_worker_loop(stop, wake, concurrency, poll_seconds))
+            return
+
+        threads = [
+            threading.Thread(target=worker_loop, args=(stop, wake, poll_seconds), name=f"run-worker-{i}", daemon=True)
+            for i in range(concurrency)
+        ]
+        for t in threads:
+            t.start()
+        logger.info("started %d run worker(s)", concurrency)
+
+        # In-flight runs finish before the process exits; queued runs stay queued.
+        for t in threads:
+            t.join()
+    finally:
+        heartbeat_stop.set()
+
+
+if __name__ == "__main__":
+    main()
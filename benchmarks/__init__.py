@@ -0,0 +1,10 @@
+"""
+Performance benchmarks for the execution engine.
+
+    python -m benchmarks --output results.json
+    python -m benchmarks.compare baseline.json results.json
+
+Scenarios run against the database in DATABASE_URL (use a scratch database: benchmark
+manifests and runs are left in place) with a stub LLM of configurable latency. Each
+scenario runs in a fresh process so its peak RSS is its own.
+"""
@@ -0,0 +1,153 @@
+"""
+Run the benchmark suite and write machine-readable results.
+
+    python -m benchmarks --sizes 10,100,1000 --llm-latency-ms 5 --output results.json
+    python -m benchmarks --scenarios execute_manifest --shapes wide --max-workers 8
+
+Tracing is off and the LLM response cache bypassed unless --trace / --cache are given,
+so results measure the engine rather than the exporter or cache hits.
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+from dataclasses import asdict
+from typing import Any, Dict, List
+
+from benchmarks.fixtures import SHAPES
+from benchmarks.harness import ScenarioSpec
+
+ALL_SCENARIOS = ("execute_manifest", "attest_resume", "list_endpoints", "schema_validation")
+
+
+def _run_in_child(spec: Dict[str, Any], env: Dict[str, str]) -> Dict[str, Any]:
+    # Imported here so the environment is in place before app modules read it.
+    os.environ.update(env)
+    from benchmarks.scenarios import SCENARIOS
+
+    return SCENARIOS[spec["scenario"]](ScenarioSpec(**spec)).to_json()
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def build_specs(args: argparse.Namespace) -> List[ScenarioSpec]:
+    common = {
+        "repeat": args.repeat,
+        "max_workers": args.max_workers,
+        "llm_latency_dist": args.llm_latency_dist,
+        "llm_latency_ms": args.llm_latency_ms,
+        "llm_jitter_ms": args.llm_jitter_ms,
+        "seed": args.seed,
+    }
+    specs: List[ScenarioSpec] = []
+    for scenario in args.scenarios:
+        if scenario == "execute_manifest":
+            for shape in args.shapes:
+                for size in args.sizes:
+                    specs.append(ScenarioSpec(scenario, shape=shape, steps=size, **common))
+        elif scenario == "attest_resume":
+            cycles = args.attest_cycles
+            between = args.task_steps_between
+            specs.append(
+                ScenarioSpec(
+                    scenario,
+                    shape="linear",
+                    steps=cycles * (between + 1),
+                    params={"cycles": cycles, "task_steps_between": between},
+                    **common,
+                )
+            )
+        elif scenario == "list_endpoints":
+            specs.append(
+                ScenarioSpec(
+                    scenario,
+                    shape="linear",
+                    steps=args.ledger_run_steps,
+                    params={"ledger_runs": args.ledger_runs},
+                    **common,
+                )
+            )
+        elif scenario == "schema_validation":
+            for size in args.sizes:
+                specs.append(
+                    ScenarioSpec(scenario, steps=size, params={"iterations": args.schema_iterations}, **common)
+                )
+    return specs
+
+
+def _csv(cast):
+    return lambda value: [cast(v) for v in value.split(",") if v]
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", type=_csv(str), default=list(ALL_SCENARIOS))
+    parser.add_argument("--shapes", type=_csv(str), default=list(SHAPES))
+    parser.add_argument("--sizes", type=_csv(int), default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3, help="measured repetitions per scenario")
+    parser.add_argument("--max-workers", type=int, default=1)
+    parser.add_argument("--llm-latency-dist", choices=("fixed", "normal", "longtail"), default="fixed")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--attest-cycles", type=int, default=10)
+    parser.add_argument("--task-steps-between", type=int, default=3)
+    parser.add_argument("--ledger-runs", type=int, default=10000)
+    parser.add_argument("--ledger-run-steps", type=int, default=100)
+    parser.add_argument("--schema-iterations", type=int, default=200, help="validations per repeat")
+    parser.add_argument("--cache", action="store_true", help="leave the LLM response cache enabled")
+    parser.add_argument("--trace", action="store_true", help="enable span export (TRACE_EXPORTER, default file)")
+    parser.add_argument("--output", default="-", help="results file, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    unknown = [s for s in args.scenarios if s not in ALL_SCENARIOS] + [s for s in args.shapes if s not in SHAPES]
+    if unknown:
+        parser.error(f"unknown scenario or shape: {', '.join(unknown)}")
+
+    env = {"LLM_PROVIDER": "stub"}
+    if not args.cache:
+        env["LLM_CACHE_ENABLED"] = "0"
+    env["TRACE_EXPORTER"] = os.getenv("TRACE_EXPORTER", "file") if args.trace else "none"
+
+    # A fresh process per scenario keeps peak RSS and warm caches per scenario.
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for spec in build_specs(args):
+        label = f"{spec.scenario} shape={spec.shape} steps={spec.steps} workers={spec.max_workers}"
+        print(f"running {label}", file=sys.stderr)
+        with ctx.Pool(1) as pool:
+            results.append(pool.apply(_run_in_child, (asdict(spec), env)))
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True, default=str)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Results are matched on (scenario, shape, steps, max_workers). A result regresses when
+its p50 or p99 latency grows, or its throughput drops, by more than the threshold
+percentage. Exits 1 if any result regressed.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+Key = Tuple[str, str | None, int, int]
+
+
+def _key(result: Dict[str, Any]) -> Key:
+    return (result["scenario"], result["shape"], result["steps"], result["max_workers"])
+
+
+def _change_pct(before: float | None, after: float | None) -> float | None:
+    if before is None or after is None or before == 0:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    before_by_key = {_key(r): r for r in baseline["results"]}
+    rows = []
+    for after in candidate["results"]:
+        before = before_by_key.get(_key(after))
+        if before is None:
+            continue
+        changes = {
+            "p50": _change_pct(before["latency_ms"]["p50"], after["latency_ms"]["p50"]),
+            "p99": _change_pct(before["latency_ms"]["p99"], after["latency_ms"]["p99"]),
+            # Throughput regresses downwards; flip the sign so positive is always worse.
+            "ops_per_sec_drop": -(_change_pct(before["ops_per_sec"], after["ops_per_sec"]) or 0.0),
+            "peak_rss_mb": _change_pct(before["peak_rss_mb"], after["peak_rss_mb"]),
+        }
+        regressed = [name for name in ("p50", "p99", "ops_per_sec_drop") if (changes[name] or 0.0) > threshold]
+        rows.append({"key": _key(after), "changes_pct": changes, "regressed": regressed})
+    return rows
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change treated as a regression")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    rows = compare(baseline, candidate, args.threshold)
+    for row in rows:
+        scenario, shape, steps, workers = row["key"]
+        changes = " ".join(
+            f"{name}={value:+.1f}%" for name, value in row["changes_pct"].items() if value is not None
+        )
+        flag = "REGRESSED " + ",".join(row["regressed"]) if row["regressed"] else "ok"
+        print(f"{scenario:<18} {shape or '-':<7} steps={steps:<6} workers={workers:<3} {changes}  {flag}")
+    return 1 if any(row["regressed"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
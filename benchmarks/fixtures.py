@@ -0,0 +1,147 @@
+"""
+Benchmark manifests and ledger seeding.
+
+Manifest shapes, for n steps:
+- linear: a chain, n dependency levels of one step
+- wide:   n independent steps in one level
+- deep:   levels of DEEP_WIDTH steps, each depending on every step of the level above
+"""
+import datetime
+import uuid
+from typing import Any, Dict, List
+from uuid import UUID
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.db import crud, models, schemas
+
+SHAPES = ("linear", "wide", "deep")
+DEEP_WIDTH = 4
+
+_COMPUTE_CONTRACT = {
+    "executor": "bench",
+    "inputs": ["upstream"],
+    "outputs": ["result"],
+    "verification": "operator_attest",
+}
+
+
+def step_specs(shape: str, n: int) -> List[Dict[str, Any]]:
+    if shape == "linear":
+        return [
+            {"step_key": f"s{i}", "depends_on": [f"s{i - 1}"] if i else []}
+            for i in range(n)
+        ]
+    if shape == "wide":
+        return [{"step_key": f"s{i}", "depends_on": []} for i in range(n)]
+    if shape == "deep":
+        specs = []
+        for i in range(n):
+            level, _ = divmod(i, DEEP_WIDTH)
+            above = range((level - 1) * DEEP_WIDTH, level * DEEP_WIDTH) if level else range(0)
+            specs.append({"step_key": f"s{i}", "depends_on": [f"s{j}" for j in above]})
+        return specs
+    raise ValueError(f"unknown shape {shape!r}")
+
+
+def compute_cycle_specs(cycles: int, task_steps_between: int) -> List[Dict[str, Any]]:
+    """A chain where every task_steps_between task steps are followed by a compute step."""
+    specs: List[Dict[str, Any]] = []
+    previous = None
+    for c in range(cycles):
+        for t in range(task_steps_between):
+            key = f"c{c}t{t}"
+            specs.append({"step_key": key, "depends_on": [previous] if previous else []})
+            previous = key
+        key = f"c{c}compute"
+        specs.append(
+            {
+                "step_key": key,
+                "depends_on": [previous] if previous else [],
+                "step_type": "compute",
+                "compute_contract": _COMPUTE_CONTRACT,
+            }
+        )
+        previous = key
+    return specs
+
+
+def create_manifest(db: Session, name: str, specs: List[Dict[str, Any]]) -> UUID:
+    manifest = crud.create_manifest(
+        db,
+        schemas.ManifestCreate(
+            name=f"bench-{name}-{uuid.uuid4().hex[:8]}",
+            description="benchmark fixture",
+            llm_cache_enabled=False,
+        ),
+    )
+    crud.replace_manifest_steps(db, manifest.id, [schemas.ManifestStepCreate(**s) for s in specs])
+    return manifest.id
+
+
+def seed_runs(db: Session, manifest_id: UUID, count: int, batch_size: int = 5000) -> None:
+    """Insert finished runs (without step rows) to give list endpoints a large ledger."""
+    base = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=count)
+    statuses = ("success", "error", "waiting")
+    for start in range(0, count, batch_size):
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "manifest_id": manifest_id,
+                "status": statuses[i % len(statuses)],
+                "created_at": base + datetime.timedelta(seconds=i),
+                "started_at": base + datetime.timedelta(seconds=i),
+                "ended_at": base + datetime.timedelta(seconds=i, milliseconds=500),
+                "initiated_by": f"bench-{i % 10}",
+            }
+            for i in range(start, min(start + batch_size, count))
+        ]
+        db.execute(insert(models.DagRun), rows)
+        db.commit()
+
+
+def extraction_schema() -> Dict[str, Any]:
+    """A representative extract_schema: a list of typed records plus a summary."""
+    return {
+        "type": "object",
+        "required": ["records", "summary"],
+        "additionalProperties": False,
+        "properties": {
+            "summary": {"type": "string", "maxLength": 2000},
+            "records": {"type": "array", "items": {"$ref": "#/$defs/record"}},
+        },
+        "$defs": {
+            "record": {
+                "type": "object",
+                "required": ["id", "name", "amount", "status"],
+                "properties": {
+                    "id": {"type": "integer", "minimum": 0},
+                    "name": {"type": "string", "minLength": 1, "pattern": "^[A-Za-z0-9 _-]+$"},
+                    "amount": {"type": "number", "minimum": 0},
+                    "status": {"enum": ["open", "closed", "pending"]},
+                    "tags": {"type": "array", "items": {"type": "string"}, "uniqueItems": True},
+                    "note": {"type": ["string", "null"]},
+                },
+            }
+        },
+    }
+
+
+def extraction_output(records: int) -> Dict[str, Any]:
+    """An output_json that satisfies extraction_schema(), with `records` records."""
+    statuses = ("open", "closed", "pending")
+    return {
+        "summary": f"{records} records extracted",
+        "records": [
+            {
+                "id": i,
+                "name": f"record {i}",
+                "amount": i * 1.25,
+                "status": statuses[i % len(statuses)],
+                "tags": [f"t{i % 7}", f"g{i % 3}"],
+                "note": None if i % 2 else "checked",
+            }
+            for i in range(records)
+        ],
+    }
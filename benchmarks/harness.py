@@ -0,0 +1,78 @@
+"""
+Measurement helpers shared by the scenarios.
+"""
+import math
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List
+
+
+def percentile(samples: List[float], q: float) -> float | None:
+    """Nearest-rank percentile; q in [0, 100]."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, float | None]:
+    return {
+        "count": len(samples_ms),
+        "mean": sum(samples_ms) / len(samples_ms) if samples_ms else None,
+        "p50": percentile(samples_ms, 50),
+        "p99": percentile(samples_ms, 99),
+        "max": max(samples_ms) if samples_ms else None,
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+@contextmanager
+def timed(samples_ms: List[float]) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        samples_ms.append((time.perf_counter() - started) * 1000)
+
+
+@dataclass
+class ScenarioSpec:
+    scenario: str
+    shape: str | None = None
+    steps: int = 0
+    repeat: int = 3
+    max_workers: int = 1
+    llm_latency_dist: str = "fixed"
+    llm_latency_ms: float = 0.0
+    llm_jitter_ms: float = 0.0
+    seed: int = 0
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class ScenarioResult:
+    scenario: str
+    shape: str | None
+    steps: int
+    max_workers: int
+    wall_seconds: float
+    operations: int
+    ops_per_sec: float
+    latency_ms: Dict[str, float | None]
+    peak_rss_mb: float
+    per_step_ms: float | None = None
+    per_step_overhead_ms: float | None = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def to_json(self) -> Dict[str, Any]:
+        return asdict(self)
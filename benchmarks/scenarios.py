@@ -0,0 +1,250 @@
+"""
+Benchmark scenarios. Each takes a ScenarioSpec and returns a ScenarioResult; runners
+call them in a fresh process (see __main__), after configuring the environment.
+"""
+import time
+from typing import Callable, Dict, List
+
+from benchmarks import fixtures
+from benchmarks.harness import (
+    ScenarioResult,
+    ScenarioSpec,
+    latency_summary,
+    peak_rss_mb,
+    timed,
+)
+
+
+def _install_stub(spec: ScenarioSpec) -> None:
+    from app.core.llm_router import set_llm_client
+    from app.core.stub_llm import StubLLMClient, StubProfile
+
+    profile = StubProfile(
+        latency_dist=spec.llm_latency_dist,
+        latency_ms=spec.llm_latency_ms,
+        latency_stddev_ms=spec.llm_latency_ms / 4 if spec.llm_latency_dist == "normal" else 0.0,
+        jitter_ms=spec.llm_jitter_ms,
+        seed=spec.seed,
+    )
+    set_llm_client(StubLLMClient(profile), provider_name="bench")
+
+
+def _result(spec: ScenarioSpec, wall: float, samples_ms: List[float], operations: int, **extra) -> ScenarioResult:
+    return ScenarioResult(
+        scenario=spec.scenario,
+        shape=spec.shape,
+        steps=spec.steps,
+        max_workers=spec.max_workers,
+        wall_seconds=wall,
+        operations=operations,
+        ops_per_sec=operations / wall if wall > 0 else 0.0,
+        latency_ms=latency_summary(samples_ms),
+        peak_rss_mb=peak_rss_mb(),
+        extra=extra,
+    )
+
+
+def execute_manifest_scenario(spec: ScenarioSpec) -> ScenarioResult:
+    """Whole runs of a task-only manifest; operations are runs."""
+    from app.core.runner import execute_manifest
+    from app.db.session import SessionLocal
+
+    _install_stub(spec)
+    db = SessionLocal()
+    try:
+        manifest_id = fixtures.create_manifest(
+            db, f"{spec.shape}-{spec.steps}", fixtures.step_specs(spec.shape, spec.steps)
+        )
+        # One unmeasured run warms the plan cache, connection pool and imports.
+        execute_manifest(manifest_id, db, initiated_by="bench", max_workers=spec.max_workers)
+
+        samples: List[float] = []
+        started = time.perf_counter()
+        for _ in range(spec.repeat):
+            with timed(samples):
+                execute_manifest(manifest_id, db, initiated_by="bench", max_workers=spec.max_workers)
+        wall = time.perf_counter() - started
+    finally:
+        db.close()
+
+    result = _result(spec, wall, samples, spec.repeat)
+    result.per_step_ms = (wall * 1000) / (spec.repeat * spec.steps)
+    if spec.max_workers == 1 and spec.llm_latency_dist != "longtail":
+        # Sequential: everything beyond the stub's mean latency is engine overhead.
+        result.per_step_overhead_ms = result.per_step_ms - (spec.llm_latency_ms + spec.llm_jitter_ms / 2)
+    return result
+
+
+def attest_resume_scenario(spec: ScenarioSpec) -> ScenarioResult:
+    """
+    Runs that pause at a compute step after every few task steps; each cycle is an
+    attestation through the API followed by resume_run. Operations are cycles.
+    """
+    from fastapi.testclient import TestClient
+    from sqlalchemy import select
+
+    from app.core.runner import execute_manifest, resume_run
+    from app.db import models
+    from app.db.session import SessionLocal
+    from app.main import app
+
+    cycles = spec.params.get("cycles", 10)
+    between = spec.params.get("task_steps_between", 3)
+
+    _install_stub(spec)
+    client = TestClient(app)
+    db = SessionLocal()
+    attest_ms: List[float] = []
+    resume_ms: List[float] = []
+    cycle_ms: List[float] = []
+    try:
+        manifest_id = fixtures.create_manifest(db, "attest", fixtures.compute_cycle_specs(cycles, between))
+        started = time.perf_counter()
+        for _ in range(spec.repeat):
+            run_id = execute_manifest(manifest_id, db, initiated_by="bench", max_workers=spec.max_workers)
+            while True:
+                waiting = db.scalars(
+                    select(models.DagStepRun).filter_by(dag_run_id=run_id, status="WAITING_FOR_ATTESTATION")
+                ).first()
+                if waiting is None:
+                    break
+                with timed(cycle_ms):
+                    with timed(attest_ms):
+                        response = client.post(
+                            f"/api/runs/{run_id}/steps/{waiting.id}/attest",
+                            json={"attested_by": "bench", "outcome": "SUCCESS"},
+                        )
+                        response.raise_for_status()
+                    db.expire_all()
+                    with timed(resume_ms):
+                        resume_run(run_id, db, initiated_by="bench", max_workers=spec.max_workers)
+        wall = time.perf_counter() - started
+    finally:
+        db.close()
+
+    return _result(
+        spec,
+        wall,
+        cycle_ms,
+        len(cycle_ms),
+        attest_latency_ms=latency_summary(attest_ms),
+        resume_latency_ms=latency_summary(resume_ms),
+        cycles_per_run=cycles,
+        task_steps_between=between,
+    )
+
+
+def list_endpoints_scenario(spec: ScenarioSpec) -> ScenarioResult:
+    """
+    Read endpoints over a ledger of spec.params["ledger_runs"] seeded runs plus one
+    executed run of spec.steps steps. Operations are requests.
+    """
+    from fastapi.testclient import TestClient
+
+    from app.core.runner import execute_manifest
+    from app.db.session import SessionLocal
+    from app.main import app
+
+    ledger_runs = spec.params.get("ledger_runs", 10000)
+    pages = spec.params.get("pages", 20)
+
+    _install_stub(spec)
+    client = TestClient(app)
+    db = SessionLocal()
+    try:
+        manifest_id = fixtures.create_manifest(db, "ledger", fixtures.step_specs("linear", spec.steps))
+        fixtures.seed_runs(db, manifest_id, ledger_runs)
+        run_id = execute_manifest(manifest_id, db, initiated_by="bench")
+    finally:
+        db.close()
+
+    by_endpoint: Dict[str, List[float]] = {
+        "list_runs_page": [],
+        "list_runs_filtered": [],
+        "get_run_steps": [],
+        "run_ledger": [],
+    }
+    started = time.perf_counter()
+    for _ in range(spec.repeat):
+        cursor = None
+        for _ in range(pages):
+            params = {"limit": 100}
+            if cursor:
+                params["cursor"] = cursor
+            with timed(by_endpoint["list_runs_page"]):
+                response = client.get("/api/runs", params=params)
+            response.raise_for_status()
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        with timed(by_endpoint["list_runs_filtered"]):
+            client.get(
+                "/api/runs",
+                params={"limit": 100, "status": "error", "manifest_id": str(manifest_id), "include_total": "true"},
+            ).raise_for_status()
+        with timed(by_endpoint["get_run_steps"]):
+            client.get(f"/api/runs/{run_id}/steps").raise_for_status()
+        with timed(by_endpoint["run_ledger"]):
+            response = client.get(f"/api/runs/{run_id}/ledger")
+            response.raise_for_status()
+            ledger_lines = response.text.count("\n")
+    wall = time.perf_counter() - started
+
+    all_samples = [ms for samples in by_endpoint.values() for ms in samples]
+    return _result(
+        spec,
+        wall,
+        all_samples,
+        len(all_samples),
+        ledger_runs=ledger_runs,
+        ledger_lines=ledger_lines,
+        endpoints={name: latency_summary(samples) for name, samples in by_endpoint.items()},
+    )
+
+
+def schema_validation_scenario(spec: ScenarioSpec) -> ScenarioResult:
+    """
+    extract_schema validation of one output_json of spec.steps records with a compiled
+    validator. Operations are validations; no database is used.
+    """
+    from app.core.schema_validation import compile_schema, get_validator
+
+    iterations = spec.params.get("iterations", 200) * spec.repeat
+    schema = fixtures.extraction_schema()
+    output = fixtures.extraction_output(spec.steps)
+
+    compile_ms: List[float] = []
+    with timed(compile_ms):
+        validator = compile_schema(schema)
+    if validator.validate(output):
+        raise RuntimeError("benchmark output does not satisfy its schema")
+
+    lookup_ms: List[float] = []
+    get_validator(schema)
+    for _ in range(iterations):
+        with timed(lookup_ms):
+            get_validator(schema)
+
+    validate_ms: List[float] = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        with timed(validate_ms):
+            validator.validate(output)
+    wall = time.perf_counter() - started
+
+    return _result(
+        spec,
+        wall,
+        validate_ms,
+        len(validate_ms),
+        compile_ms=compile_ms[0],
+        cached_lookup_latency_ms=latency_summary(lookup_ms),
+    )
+
+
+SCENARIOS: Dict[str, Callable[[ScenarioSpec], ScenarioResult]] = {
+    "execute_manifest": execute_manifest_scenario,
+    "attest_resume": attest_resume_scenario,
+    "list_endpoints": list_endpoints_scenario,
+    "schema_validation": schema_validation_scenario,
+}
@@ -0,0 +1,26 @@
+"""run queue
+
+Revision ID: 0003_run_queue
+Revises: 0002_compute_substrate_patchset1
+Create Date: 2024-07-01
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0003_run_queue'
+down_revision = '0002_compute_substrate_patchset1'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Workers poll for the oldest queued run; keep that lookup off the full table.
+    op.create_index(
+        'ix_dag_runs_queued',
+        'dag_runs',
+        ['created_at', 'id'],
+        postgresql_where=sa.text("status = 'queued'"),
+    )
+
+def downgrade():
+    op.drop_index('ix_dag_runs_queued', table_name='dag_runs')
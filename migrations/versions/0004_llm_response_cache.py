@@ -0,0 +1,36 @@
+"""llm response cache
+
+Revision ID: 0004_llm_response_cache
+Revises: 0003_run_queue
+Create Date: 2024-07-08
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy.dialects.postgresql as psql
+
+# revision identifiers, used by Alembic.
+revision = '0004_llm_response_cache'
+down_revision = '0003_run_queue'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('manifests', sa.Column('llm_cache_enabled', sa.Boolean(), nullable=False, server_default=sa.text('true')))
+    op.add_column('llm_call_artifacts', sa.Column('cache_status', sa.Text(), nullable=True))  # "hit" | "miss" | "bypass"
+
+    op.create_table(
+        'llm_response_cache',
+        sa.Column('input_hash', sa.Text(), primary_key=True),
+        sa.Column('response', psql.JSONB(), nullable=False),
+        sa.Column('source_step_run_id', psql.UUID(as_uuid=True), sa.ForeignKey('dag_step_runs.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('last_hit_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('hit_count', sa.Integer(), nullable=False, server_default=sa.text('0')),
+    )
+    op.create_index('ix_llm_response_cache_created_at', 'llm_response_cache', ['created_at'])
+
+def downgrade():
+    op.drop_index('ix_llm_response_cache_created_at', table_name='llm_response_cache')
+    op.drop_table('llm_response_cache')
+    op.drop_column('llm_call_artifacts', 'cache_status')
+    op.drop_column('manifests', 'llm_cache_enabled')
@@ -0,0 +1,26 @@
+"""run list indexes
+
+Revision ID: 0005_run_list_indexes
+Revises: 0004_llm_response_cache
+Create Date: 2024-07-15
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0005_run_list_indexes'
+down_revision = '0004_llm_response_cache'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # GET /api/runs pages on (created_at, id), optionally behind one equality filter.
+    op.create_index('ix_dag_runs_created_at_id', 'dag_runs', ['created_at', 'id'])
+    op.create_index('ix_dag_runs_status_created_at_id', 'dag_runs', ['status', 'created_at', 'id'])
+    op.create_index('ix_dag_runs_manifest_id_created_at_id', 'dag_runs', ['manifest_id', 'created_at', 'id'])
+    op.create_index('ix_dag_runs_initiated_by_created_at_id', 'dag_runs', ['initiated_by', 'created_at', 'id'])
+
+def downgrade():
+    op.drop_index('ix_dag_runs_initiated_by_created_at_id', table_name='dag_runs')
+    op.drop_index('ix_dag_runs_manifest_id_created_at_id', table_name='dag_runs')
+    op.drop_index('ix_dag_runs_status_created_at_id', table_name='dag_runs')
+    op.drop_index('ix_dag_runs_created_at_id', table_name='dag_runs')
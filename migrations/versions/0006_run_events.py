@@ -0,0 +1,33 @@
+"""run events
+
+Revision ID: 0006_run_events
+Revises: 0005_run_list_indexes
+Create Date: 2024-07-22
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy.dialects.postgresql as psql
+
+# revision identifiers, used by Alembic.
+revision = '0006_run_events'
+down_revision = '0005_run_list_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'run_events',
+        sa.Column('id', sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column('dag_run_id', psql.UUID(as_uuid=True), sa.ForeignKey('dag_runs.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('kind', sa.Text(), nullable=False),  # "run" | "step"
+        sa.Column('status', sa.Text(), nullable=False),
+        sa.Column('step_run_id', psql.UUID(as_uuid=True), nullable=True),
+        sa.Column('manifest_step_id', psql.UUID(as_uuid=True), nullable=True),
+        sa.Column('step_key', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index('ix_run_events_dag_run_id_id', 'run_events', ['dag_run_id', 'id'])
+
+def downgrade():
+    op.drop_index('ix_run_events_dag_run_id_id', table_name='run_events')
+    op.drop_table('run_events')
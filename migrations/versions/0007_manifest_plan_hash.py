@@ -0,0 +1,24 @@
+"""manifest plan hash
+
+Revision ID: 0007_manifest_plan_hash
+Revises: 0006_run_events
+Create Date: 2024-07-29
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0007_manifest_plan_hash'
+down_revision = '0006_run_events'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Content hash of the compiled execution plan; NULL until steps are next replaced.
+    op.add_column('manifests', sa.Column('plan_hash', sa.Text(), nullable=True))
+    # Plan a run started from, so resume can detect steps replaced mid-run.
+    op.add_column('dag_runs', sa.Column('plan_hash', sa.Text(), nullable=True))
+
+def downgrade():
+    op.drop_column('dag_runs', 'plan_hash')
+    op.drop_column('manifests', 'plan_hash')
@@ -0,0 +1,33 @@
+"""artifact blob references
+
+Revision ID: 0008_artifact_blobs
+Revises: 0007_manifest_plan_hash
+Create Date: 2024-08-02
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0008_artifact_blobs'
+down_revision = '0007_manifest_plan_hash'
+branch_labels = None
+depends_on = None
+
+# (table, payload column prefix) pairs that can be offloaded to the blob store.
+_BLOB_COLUMNS = (
+    ('prompt_artifacts', 'rendered_prompt'),
+    ('llm_call_artifacts', 'response'),
+    ('parsed_output_artifacts', 'output_text'),
+)
+
+def upgrade():
+    # When set, the payload lives in the content-addressed blob store under this hash
+    # and the inline column is NULL. Existing rows stay inline.
+    for table, prefix in _BLOB_COLUMNS:
+        op.add_column(table, sa.Column(f'{prefix}_sha256', sa.Text(), nullable=True))
+        op.add_column(table, sa.Column(f'{prefix}_bytes', sa.Integer(), nullable=True))
+
+def downgrade():
+    for table, prefix in reversed(_BLOB_COLUMNS):
+        op.drop_column(table, f'{prefix}_bytes')
+        op.drop_column(table, f'{prefix}_sha256')
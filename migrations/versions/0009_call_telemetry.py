@@ -0,0 +1,28 @@
+"""llm call telemetry and step timings
+
+Revision ID: 0009_call_telemetry
+Revises: 0008_artifact_blobs
+Create Date: 2024-08-05
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy.dialects.postgresql as psql
+
+# revision identifiers, used by Alembic.
+revision = '0009_call_telemetry'
+down_revision = '0008_artifact_blobs'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Provider-reported token counts, e.g. {"prompt_tokens": .., "completion_tokens": ..}.
+    op.add_column('llm_call_artifacts', sa.Column('usage', psql.JSONB(), nullable=True))
+    # Time spent waiting for a free provider connection, included in latency_ms.
+    op.add_column('llm_call_artifacts', sa.Column('connect_wait_ms', sa.Integer(), nullable=True))
+    # Per-phase milliseconds: render, cache, llm, parse, policy, persist.
+    op.add_column('dag_step_runs', sa.Column('timings', psql.JSONB(), nullable=True))
+
+def downgrade():
+    op.drop_column('dag_step_runs', 'timings')
+    op.drop_column('llm_call_artifacts', 'connect_wait_ms')
+    op.drop_column('llm_call_artifacts', 'usage')
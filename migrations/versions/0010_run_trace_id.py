@@ -0,0 +1,21 @@
+"""run trace id
+
+Revision ID: 0010_run_trace_id
+Revises: 0009_call_telemetry
+Create Date: 2024-08-08
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0010_run_trace_id'
+down_revision = '0009_call_telemetry'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Trace id of the spans exported for the run; NULL when tracing was disabled.
+    op.add_column('dag_runs', sa.Column('trace_id', sa.Text(), nullable=True))
+
+def downgrade():
+    op.drop_column('dag_runs', 'trace_id')
@@ -0,0 +1,33 @@
+"""run batches
+
+Revision ID: 0011_run_batches
+Revises: 0010_run_trace_id
+Create Date: 2024-08-12
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy.dialects.postgresql as psql
+
+# revision identifiers, used by Alembic.
+revision = '0011_run_batches'
+down_revision = '0010_run_trace_id'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'run_batches',
+        sa.Column('id', psql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('manifest_id', psql.UUID(as_uuid=True), sa.ForeignKey('manifests.id'), nullable=False),
+        sa.Column('initiated_by', sa.Text(), nullable=True),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.add_column('dag_runs', sa.Column('batch_id', psql.UUID(as_uuid=True), sa.ForeignKey('run_batches.id'), nullable=True))
+    # Batch progress is a GROUP BY status over the batch's runs.
+    op.create_index('ix_dag_runs_batch_id_status', 'dag_runs', ['batch_id', 'status'])
+
+def downgrade():
+    op.drop_index('ix_dag_runs_batch_id_status', table_name='dag_runs')
+    op.drop_column('dag_runs', 'batch_id')
+    op.drop_table('run_batches')
@@ -0,0 +1,28 @@
+"""auto resume requests
+
+Revision ID: 0012_auto_resume
+Revises: 0011_run_batches
+Create Date: 2024-08-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0012_auto_resume'
+down_revision = '0011_run_batches'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('dag_runs', sa.Column('resume_requested_at', sa.DateTime(timezone=True), nullable=True))
+    # Workers claim the oldest pending request; the partial index stays as small as the backlog.
+    op.create_index(
+        'ix_dag_runs_resume_requested',
+        'dag_runs',
+        ['resume_requested_at', 'id'],
+        postgresql_where=sa.text("status = 'waiting' and resume_requested_at is not null"),
+    )
+
+def downgrade():
+    op.drop_index('ix_dag_runs_resume_requested', table_name='dag_runs')
+    op.drop_column('dag_runs', 'resume_requested_at')
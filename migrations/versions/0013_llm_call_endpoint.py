@@ -0,0 +1,21 @@
+"""llm call endpoint
+
+Revision ID: 0013_llm_call_endpoint
+Revises: 0012_auto_resume
+Create Date: 2024-08-26
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0013_llm_call_endpoint'
+down_revision = '0012_auto_resume'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Name of the LLM_ROUTER_CONFIG endpoint that served the call; NULL for a single provider.
+    op.add_column('llm_call_artifacts', sa.Column('endpoint', sa.Text(), nullable=True))
+
+def downgrade():
+    op.drop_column('llm_call_artifacts', 'endpoint')
@@ -0,0 +1,32 @@
+"""worker leases on claimed runs
+
+Revision ID: 0014_run_leases
+Revises: 0013_llm_call_endpoint
+Create Date: 2024-09-02
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0014_run_leases'
+down_revision = '0013_llm_call_endpoint'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Worker that claimed the run (host:pid) and its last heartbeat; NULL for runs
+    # executed inline by the API, which are never reclaimed.
+    op.add_column('dag_runs', sa.Column('claimed_by', sa.Text(), nullable=True))
+    op.add_column('dag_runs', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+    # Workers look for running runs whose lease expired; keep that scan to leased runs.
+    op.create_index(
+        'ix_dag_runs_running_heartbeat',
+        'dag_runs',
+        ['heartbeat_at'],
+        postgresql_where=sa.text("status = 'running' and heartbeat_at is not null"),
+    )
+
+def downgrade():
+    op.drop_index('ix_dag_runs_running_heartbeat', table_name='dag_runs')
+    op.drop_column('dag_runs', 'heartbeat_at')
+    op.drop_column('dag_runs', 'claimed_by')
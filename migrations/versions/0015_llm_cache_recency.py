@@ -0,0 +1,25 @@
+"""llm cache recency index
+
+Revision ID: 0015_llm_cache_recency
+Revises: 0014_run_leases
+Create Date: 2024-09-03
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0015_llm_cache_recency'
+down_revision = '0014_run_leases'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Eviction orders entries by last use: the last hit, or the store for unhit entries.
+    op.create_index(
+        'ix_llm_response_cache_last_used',
+        'llm_response_cache',
+        [sa.text('coalesce(last_hit_at, created_at)')],
+    )
+
+def downgrade():
+    op.drop_index('ix_llm_response_cache_last_used', table_name='llm_response_cache')
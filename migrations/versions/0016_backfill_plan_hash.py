@@ -0,0 +1,48 @@
+"""backfill manifest plan hash
+
+Revision ID: 0016_backfill_plan_hash
+Revises: 0015_llm_cache_recency
+Create Date: 2024-09-05
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.plan import PlanError, compile_plan
+
+# revision identifiers, used by Alembic.
+revision = '0016_backfill_plan_hash'
+down_revision = '0015_llm_cache_recency'
+branch_labels = None
+depends_on = None
+
+STEP_COLUMNS = (
+    'id', 'step_key', 'task_id', 'depends_on', 'chaining', 'config',
+    'order_index', 'step_type', 'compute_contract',
+)
+
+def upgrade():
+    # Manifests whose steps predate 0007 have no plan_hash, so their plans were never
+    # cached. Hash them as the app does; ones that do not compile stay NULL and are
+    # rejected when a run is submitted.
+    conn = op.get_bind()
+    manifest_ids = conn.execute(sa.text('select id from manifests where plan_hash is null')).scalars().all()
+    for manifest_id in manifest_ids:
+        steps = conn.execute(
+            sa.text(
+                f"select {', '.join(STEP_COLUMNS)} from manifest_steps "
+                "where manifest_id = :manifest_id order by order_index"
+            ),
+            {'manifest_id': manifest_id},
+        ).mappings().all()
+        try:
+            plan = compile_plan(manifest_id, steps)
+        except PlanError:
+            continue
+        conn.execute(
+            sa.text('update manifests set plan_hash = :plan_hash where id = :id'),
+            {'plan_hash': plan.content_hash, 'id': manifest_id},
+        )
+
+def downgrade():
+    # The hashes are derived data; keeping them is harmless.
+    pass
@@ -0,0 +1,64 @@
+"""complete and check stored task templates
+
+Revision ID: 0017_check_task_templates
+Revises: 0016_backfill_plan_hash
+Create Date: 2024-09-05
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.prompting import compile_template, complete_template
+from app.core.schema_validation import check_schema
+
+# revision identifiers, used by Alembic.
+revision = '0017_check_task_templates'
+down_revision = '0016_backfill_plan_hash'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+def upgrade():
+    # Tasks stored before prompt templates were used as written. A template that shows
+    # the model none of the step's inputs (the task editor's free text, typically) is
+    # completed with the default input and output sections, as the tasks API now does
+    # on write, so stored rows match what runs render.
+    #
+    # Templates and extract schemas stored before they were checked on write may not
+    # compile. Those are left as they are (fixing one is an edit through the tasks API),
+    # but runs using a bad template are now refused and steps with a bad schema fail
+    # policy, so list them here.
+    conn = op.get_bind()
+    rows = conn.execute(sa.text('select id, name, prompt_template, extract_schema from tasks')).all()
+    bad_schemas = 0
+    for task_id, name, template, schema in rows:
+        if template:
+            try:
+                compile_template(template)
+            except ValueError as e:
+                logger.warning('task %s (%s) must be fixed before it can run: %s', task_id, name, e)
+            else:
+                completed = complete_template(template)
+                if completed != template:
+                    conn.execute(
+                        sa.text('update tasks set prompt_template = :template, updated_at = now() where id = :id'),
+                        {'template': completed, 'id': task_id},
+                    )
+                    logger.info('task %s (%s): appended the input section to its prompt_template', task_id, name)
+        if schema is not None:
+            try:
+                check_schema(schema)
+            except ValueError as e:
+                logger.warning('task %s (%s): steps will fail policy until extract_schema is fixed: %s', task_id, name, e)
+                bad_schemas += 1
+    if bad_schemas:
+        logger.warning(
+            '%d task(s) have an extract_schema outside the supported subset; every step using '
+            'them fails policy until it is fixed (RUNBOOK.md, Upgrading)',
+            bad_schemas,
+        )
+
+def downgrade():
+    pass
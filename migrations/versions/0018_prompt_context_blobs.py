@@ -0,0 +1,24 @@
+"""prompt context blob reference
+
+Revision ID: 0018_prompt_context_blobs
+Revises: 0017_check_task_templates
+Create Date: 2024-09-06
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0018_prompt_context_blobs'
+down_revision = '0017_check_task_templates'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # As in 0008: when set, the context JSON lives in the blob store and the inline
+    # column is NULL. Existing rows stay inline.
+    op.add_column('prompt_artifacts', sa.Column('context_sha256', sa.Text(), nullable=True))
+    op.add_column('prompt_artifacts', sa.Column('context_bytes', sa.Integer(), nullable=True))
+
+def downgrade():
+    op.drop_column('prompt_artifacts', 'context_bytes')
+    op.drop_column('prompt_artifacts', 'context_sha256')
@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+from app.core.json_stream import JsonPrefixValidator
+
+VALID = [
+    '{}',
+    '{"a": 1}',
+    '{"a": [1, 2.5, -0.5e10, 3E+2, 0, -0], "b": {"c": null, "d": true, "e": false}}',
+    ' \n{"s": "esc \\" \\\\ \\/ \\b \\f \\n \\r \\t \\u00e9 \\ud83d\\ude00", "": ""}\t ',
+    '{"nested": [[], [{}], [[["x"]]]], "unicode": "é ☃"}',
+    '[1, "two", {"three": 3}]',
+    '"just a string"',
+    '-12.5e-3',
+    '0',
+    'true',
+    'null',
+]
+
+INVALID = [
+    'Sure! Here is the JSON: {"a": 1}',
+    '{"a": 1} trailing',
+    '{"a": 1}{"b": 2}',
+    '{a: 1}',
+    "{'a': 1}",
+    '{"a" 1}',
+    '{"a": 1,}',
+    '[1, 2,]',
+    '{"a": 01}',
+    '{"a": 1.}',
+    '{"a": -}',
+    '{"a": 1e}',
+    '{"a": .5}',
+    '{"a": tru}',
+    '{"a": nul1}',
+    '{"a": "\\x"}',
+    '{"a": "\\u12g4"}',
+    '{"a": "line\nbreak"}',
+    '{"a": [1}',
+    '{"a": 1]',
+    '{"a": NaN}',
+    '[1] 2',
+]
+
+
+def _reject_constant(name):
+    raise ValueError(f"{name} is not JSON")
+
+
+def _loads(text):
+    # json.loads with NaN and Infinity refused, as the JSON grammar does.
+    try:
+        return True, json.loads(text, parse_constant=_reject_constant)
+    except ValueError:
+        return False, None
+
+
+def _feed(text, require_object, chunk_size=None):
+    v = JsonPrefixValidator(require_object=require_object)
+    step = chunk_size or max(1, len(text))
+    for i in range(0, len(text), step):
+        if not v.feed(text[i:i + step]):
+            break
+    return v
+
+
+@pytest.mark.parametrize("require_object", [False, True])
+@pytest.mark.parametrize("text", VALID + INVALID)
+def test_complete_agrees_with_json_loads_on_every_prefix(text, require_object):
+    for end in range(len(text) + 1):
+        prefix = text[:end]
+        ok, value = _loads(prefix)
+        if require_object:
+            ok = ok and isinstance(value, dict)
+        v = _feed(prefix, require_object)
+        assert v.complete == ok, (prefix, v.error)
+        if ok:
+            assert v.error is None
+
+
+@pytest.mark.parametrize("text", VALID)
+def test_prefixes_of_valid_documents_are_accepted(text):
+    for end in range(len(text) + 1):
+        v = _feed(text[:end], require_object=False)
+        assert v.error is None, (text[:end], v.error)
+
+
+@pytest.mark.parametrize("text", INVALID)
+def test_invalid_documents_are_rejected(text):
+    v = _feed(text, require_object=False)
+    assert v.error is not None
+    assert 0 <= v.error_offset < len(text)
+    # Nothing past the reported offset was needed to find the error.
+    assert not JsonPrefixValidator(require_object=False).feed(text[:v.error_offset + 1])
+
+
+@pytest.mark.parametrize("text", INVALID)
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7])
+def test_error_does_not_depend_on_chunking(text, chunk_size):
+    whole = _feed(text, require_object=False)
+    chunked = _feed(text, require_object=False, chunk_size=chunk_size)
+    assert (chunked.error, chunked.error_offset) == (whole.error, whole.error_offset)
+
+
+def test_require_object_rejects_other_documents():
+    v = JsonPrefixValidator()
+    assert not v.feed("Here you go")
+    assert v.error_offset == 0
+    assert v.error == "expected '{' to start a JSON object, got 'H'"
+
+    v = JsonPrefixValidator()
+    assert not v.feed('  [1]')
+    assert v.error_offset == 2
+
+
+def test_feeds_after_an_error_are_ignored():
+    v = JsonPrefixValidator()
+    assert not v.feed('{"a": x')
+    error = (v.error, v.error_offset)
+    assert not v.feed('}')
+    assert (v.error, v.error_offset) == error
+    assert not v.complete
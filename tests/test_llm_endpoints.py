@@ -0,0 +1,119 @@
+import pytest
+
+for _module in ("sqlalchemy", "prometheus_client", "requests", "httpx"):
+    pytest.importorskip(_module)
+
+from app.core import llm_endpoints  # noqa: E402
+from app.core.llm_endpoints import EndpointConfig, EndpointPool  # noqa: E402
+
+
+class ScriptedClient:
+    """Answers with the next status from `statuses` (200 once they run out); None raises."""
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def complete(self, prompt):
+        self.calls += 1
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status is None:
+            raise RuntimeError("boom")
+        return {"raw_text": "{}", "error": None, "http_status": status, "latency_ms": 1}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_endpoints.time, "monotonic", clock)
+    monkeypatch.setenv("LLM_ENDPOINT_EJECT_AFTER", "3")
+    monkeypatch.setenv("LLM_ENDPOINT_EJECT_SECONDS", "30")
+    return clock
+
+
+def _pool(weights, clients=None):
+    clients = clients or {}
+    configs = [
+        EndpointConfig(name=name, base_url=f"http://{name}", api_key="k", model="m", weight=weight)
+        for name, weight in weights.items()
+    ]
+    return EndpointPool("m", configs, client_factory=lambda c: clients.get(c.name) or ScriptedClient())
+
+
+def _names(pool, n):
+    return [pool.complete("p")["endpoint"] for _ in range(n)]
+
+
+def _state(pool, name):
+    return next(s for s in pool.endpoint_states() if s["name"] == name)
+
+
+def test_idle_pool_splits_calls_by_weight_interleaved(clock):
+    pool = _pool({"a": 5, "b": 1, "c": 1})
+    assert _names(pool, 14) == ["a", "a", "b", "a", "c", "a", "a"] * 2
+
+
+def test_equal_weights_alternate(clock):
+    pool = _pool({"a": 1, "b": 1})
+    assert _names(pool, 4) == ["a", "b", "a", "b"]
+
+
+def test_consecutive_failures_eject_then_readmit(clock):
+    a = ScriptedClient([503, 429, None, 503])
+    pool = _pool({"a": 1, "b": 1}, {"a": a})
+
+    assert _names(pool, 6) == ["a", "b", "a", "b", "a", "b"]
+    assert a.calls == 3
+    assert _state(pool, "a")["consecutive_failures"] == 3
+    assert _state(pool, "a")["ejected_for_seconds"] == 30
+
+    clock.now += 29
+    assert _names(pool, 3) == ["b", "b", "b"]
+
+    # Back after the ejection period; a single further failure ejects it again.
+    clock.now += 1
+    assert "a" in _names(pool, 2)
+    assert a.calls == 4
+    assert _state(pool, "a")["ejected_for_seconds"] == 30
+    assert _names(pool, 2) == ["b", "b"]
+
+
+def test_success_resets_the_failure_count(clock):
+    a = ScriptedClient([503, 503, 200, 503, 503])
+    pool = _pool({"a": 1}, {"a": a})
+    _names(pool, 5)
+    assert _state(pool, "a")["consecutive_failures"] == 2
+    assert _state(pool, "a")["ejected_for_seconds"] == 0
+
+
+def test_client_errors_other_than_429_do_not_count(clock):
+    pool = _pool({"a": 1}, {"a": ScriptedClient([400, 404, 422])})
+    _names(pool, 3)
+    assert _state(pool, "a")["consecutive_failures"] == 0
+
+
+def test_exception_becomes_an_error_result(clock):
+    pool = _pool({"a": 1}, {"a": ScriptedClient([None])})
+    result = pool.complete("p")
+    assert result["endpoint"] == "a"
+    assert result["error"] == "RuntimeError: boom"
+    assert result["parsed_json"] is None
+    assert _state(pool, "a")["consecutive_failures"] == 1
+
+
+def test_all_ejected_falls_back_to_the_first_due_back(clock):
+    a = ScriptedClient([503, 503, 503])
+    b = ScriptedClient([503, 503, 503])
+    pool = _pool({"a": 1, "b": 1}, {"a": a, "b": b})
+    _names(pool, 5)  # a is ejected on its third failure, then b takes the fifth call
+    clock.now += 5
+    _names(pool, 1)  # b's third failure ejects it too, due back 5s after a
+    assert _names(pool, 2) == ["a", "a"]
@@ -0,0 +1,155 @@
+import pytest
+
+from app.core.schema_validation import SchemaError, check_schema, compile_schema, get_validator
+
+SCHEMA = {
+    "type": "object",
+    "required": ["name", "tags", "score"],
+    "additionalProperties": False,
+    "properties": {
+        "name": {"type": "string", "minLength": 1, "pattern": "^[a-z]+$"},
+        "tags": {"type": "array", "items": {"type": "string"}, "uniqueItems": True, "maxItems": 3},
+        "score": {"type": "number", "minimum": 0, "exclusiveMaximum": 1},
+        "kind": {"enum": ["a", "b"]},
+        "step": {"type": "integer", "multipleOf": 5},
+        "child": {"$ref": "#/$defs/node"},
+    },
+    "$defs": {
+        "node": {
+            "type": "object",
+            "properties": {"next": {"anyOf": [{"type": "null"}, {"$ref": "#/$defs/node"}]}},
+        }
+    },
+}
+
+
+def _errors(schema, instance):
+    return [(e["path"], e["keyword"]) for e in compile_schema(schema).validate(instance)]
+
+
+def test_valid_instance_has_no_errors():
+    instance = {
+        "name": "abc",
+        "tags": ["x", "y"],
+        "score": 0.5,
+        "kind": "a",
+        "step": 10,
+        "child": {"next": {"next": None}},
+    }
+    assert compile_schema(SCHEMA).validate(instance) == []
+
+
+def test_errors_carry_paths_and_keywords_in_sorted_order():
+    instance = {
+        "name": "ABC",
+        "tags": ["x", "x", 1, "z"],
+        "score": 1,
+        "kind": "c",
+        "step": 7,
+        "child": {"next": {"next": 3}},
+        "extra": True,
+    }
+    assert _errors(SCHEMA, instance) == [
+        ("/child/next", "anyOf"),
+        ("/extra", "additionalProperties"),
+        ("/kind", "enum"),
+        ("/name", "pattern"),
+        ("/score", "exclusiveMaximum"),
+        ("/step", "multipleOf"),
+        ("/tags", "maxItems"),
+        ("/tags", "uniqueItems"),
+        ("/tags/2", "type"),
+    ]
+
+
+def test_missing_required_and_wrong_type():
+    assert _errors(SCHEMA, {"name": "a"}) == [("", "required"), ("", "required")]
+    assert _errors(SCHEMA, []) == [("", "type")]
+
+
+def test_wrong_type_is_reported_once():
+    schema = {"type": "string", "minLength": 3, "pattern": "x", "enum": ["xyz"]}
+    assert compile_schema(schema).validate(5) == [
+        {"path": "", "keyword": "type", "message": "expected string, got integer"}
+    ]
+
+
+def test_json_equality_in_enum_and_const():
+    assert _errors({"enum": [1, "1", [1, {"a": True}]]}, 1.0) == []
+    assert _errors({"enum": [1]}, True) == [("", "enum")]
+    assert _errors({"const": [1, {"a": True}]}, [1, {"a": 1}]) == [("", "const")]
+    assert _errors({"uniqueItems": True}, [1, True, "1"]) == []
+    assert _errors({"uniqueItems": True}, [{"a": [1]}, {"a": [1.0]}]) == [("", "uniqueItems")]
+
+
+def test_combinators():
+    one_of = {"oneOf": [{"type": "integer"}, {"minimum": 0}]}
+    assert _errors(one_of, -1) == []
+    assert _errors(one_of, 1) == [("", "oneOf")]
+    assert _errors({"not": {"type": "null"}}, None) == [("", "not")]
+    assert _errors({"allOf": [{"minimum": 0}, {"maximum": 1}]}, 2) == [("", "maximum")]
+    assert _errors(False, {}) == [("", "false")]
+    assert _errors(True, {}) == []
+
+
+def test_pointer_escapes_property_names():
+    schema = {"properties": {"a/b": {"properties": {"c~d": {"type": "string"}}}}}
+    assert _errors(schema, {"a/b": {"c~d": 1}}) == [("/a~1b/c~0d", "type")]
+
+
+def test_annotations_are_ignored():
+    schema = {"title": "t", "description": "d", "format": "email", "type": "string"}
+    check_schema(schema)
+    assert _errors(schema, "not an email") == []
+
+
+@pytest.mark.parametrize(
+    "schema, problem",
+    [
+        ({"patternProperties": {"^x": {}}}, "/: unsupported keyword(s): patternProperties"),
+        ({"if": {}, "then": {}, "else": {}}, "/: unsupported keyword(s): else, if, then"),
+        ({"properties": {"a": {"prefixItems": []}}}, "/properties/a: unsupported keyword(s): prefixItems"),
+        ({"allOf": [{"dependentRequired": {}}]}, "/allOf/0: unsupported keyword(s): dependentRequired"),
+    ],
+)
+def test_unsupported_keywords_are_rejected(schema, problem):
+    with pytest.raises(SchemaError) as exc:
+        compile_schema(schema)
+    assert str(exc.value) == problem
+
+
+@pytest.mark.parametrize(
+    "schema, problem",
+    [
+        ([], "/: schema must be an object or a boolean"),
+        ({"type": "str"}, "/: type must be one of"),
+        ({"type": []}, "/: type must be one of"),
+        ({"enum": "a"}, "/: enum must be an array"),
+        ({"required": ["a", 1]}, "/: required must be an array of strings"),
+        ({"uniqueItems": 1}, "/: uniqueItems must be a boolean"),
+        ({"pattern": "("}, "/: invalid pattern"),
+        ({"minLength": -1}, "/: minLength must be a non-negative integer"),
+        ({"maxItems": 1.5}, "/: maxItems must be a non-negative integer"),
+        ({"minimum": "0"}, "/: minimum must be a number"),
+        ({"multipleOf": 0}, "/: multipleOf must be greater than 0"),
+        ({"items": [{}]}, "/: items must be a schema"),
+        ({"properties": []}, "/: properties must be an object"),
+        ({"anyOf": []}, "/: anyOf must be a non-empty array"),
+        ({"$ref": "#/$defs/missing"}, "/: unresolvable $ref"),
+        ({"$ref": "http://example.com/s.json"}, "/: unsupported $ref"),
+        ({"properties": {"a": {"type": 1}}}, "/properties/a: type must be one of"),
+    ],
+)
+def test_malformed_schemas_are_rejected(schema, problem):
+    with pytest.raises(SchemaError) as exc:
+        check_schema(schema)
+    assert str(exc.value).startswith(problem)
+
+
+def test_get_validator_reports_bad_schema_instead_of_raising():
+    validator = get_validator({"type": "object", "if": {"required": ["a"]}})
+    assert validator.schema_error == "/: unsupported keyword(s): if"
+
+
+def test_get_validator_caches_by_schema_hash():
+    assert get_validator({"type": "string", "minLength": 2}) is get_validator({"minLength": 2, "type": "string"})